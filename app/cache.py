@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from .config import settings
+
+try:
+    import redis.asyncio as aioredis
+    from redis.asyncio.sentinel import Sentinel
+except ImportError:  # 未安装 redis 时仅使用进程内缓存
+    aioredis = None
+    Sentinel = None
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache:
+    """
+    进程内缓存，支持 TTL 与按最近使用淘汰（LRU）。
+    同时提供同步与异步接口，异步接口与 RedisCache 保持一致，可作为 Redis 的替身。
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any, ttl: float) -> None:
+        self.set(key, value, ttl)
+
+    async def adelete(self, *keys: str) -> None:
+        self.delete(*keys)
+
+    async def adelete_prefix(self, prefix: str) -> None:
+        self.delete_prefix(prefix)
+
+
+class RedisCache:
+    """基于 redis.asyncio 的共享缓存，值为字符串"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def aget(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def aset(self, key: str, value: str, ttl: float) -> None:
+        await self.client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    async def adelete(self, *keys: str) -> None:
+        if keys:
+            await self.client.unlink(*keys)
+
+    async def adelete_prefix(self, prefix: str) -> None:
+        batch: List[str] = []
+        pattern = "".join("\\" + char if char in "*?[]\\" else char for char in prefix) + "*"
+        async for key in self.client.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                await self.client.unlink(*batch)
+                batch = []
+        if batch:
+            await self.client.unlink(*batch)
+
+
+class FallbackCache:
+    """
+    主缓存（Redis）不可用时自动降级到进程内缓存。
+    主缓存出错后在 `retry_interval` 秒内不再访问，之后再尝试恢复。
+    失效操作同时作用于两级缓存，避免恢复后读到降级期间已失效的数据。
+    """
+
+    def __init__(self, primary, fallback: MemoryCache, retry_interval: float = 5.0):
+        self.primary = primary
+        self.fallback = fallback
+        self.retry_interval = retry_interval
+        self.hits = 0
+        self.misses = 0
+        self._down_until = 0.0
+
+    @property
+    def primary_available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _mark_down(self, error: Exception) -> None:
+        logger.warning("缓存服务不可用，%s 秒内降级为进程内缓存: %s", self.retry_interval, error)
+        self._down_until = time.monotonic() + self.retry_interval
+
+    async def aget(self, key: str) -> Optional[Any]:
+        value = None
+        if self.primary_available:
+            try:
+                value = await self.primary.aget(key)
+            except Exception as e:
+                self._mark_down(e)
+                value = await self.fallback.aget(key)
+        else:
+            value = await self.fallback.aget(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def aset(self, key: str, value: Any, ttl: float) -> None:
+        if self.primary_available:
+            try:
+                await self.primary.aset(key, value, ttl)
+                return
+            except Exception as e:
+                self._mark_down(e)
+        await self.fallback.aset(key, value, ttl)
+
+    async def adelete(self, *keys: str) -> None:
+        await self.fallback.adelete(*keys)
+        if self.primary_available:
+            try:
+                await self.primary.adelete(*keys)
+            except Exception as e:
+                self._mark_down(e)
+
+    async def adelete_prefix(self, prefix: str) -> None:
+        await self.fallback.adelete_prefix(prefix)
+        if self.primary_available:
+            try:
+                await self.primary.adelete_prefix(prefix)
+            except Exception as e:
+                self._mark_down(e)
+
+
+def parse_sentinels(value: str) -> List[Tuple[str, int]]:
+    """解析 "host1:26379,host2:26379" 格式的哨兵地址列表"""
+    sentinels = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":")
+        sentinels.append((host, int(port)))
+    return sentinels
+
+
+def create_redis_client():
+    """
+    根据配置创建 Redis 客户端：
+    - 配置了 `redis_sentinels` 时通过哨兵发现主节点（与 conf/redis/sentinel.conf 对应），主从切换后自动重连；
+    - 否则使用 `redis_url` 直连；
+    - 均未配置或未安装 redis 时返回 None。
+    """
+    if aioredis is None:
+        return None
+    options = {
+        "socket_timeout": settings.redis_socket_timeout,
+        "socket_connect_timeout": settings.redis_socket_timeout,
+        "decode_responses": True,
+    }
+    if settings.redis_sentinels:
+        sentinel = Sentinel(
+            parse_sentinels(settings.redis_sentinels),
+            sentinel_kwargs={"socket_timeout": settings.redis_socket_timeout},
+            password=settings.redis_password,
+            db=settings.redis_db,
+            **options,
+        )
+        return sentinel.master_for(settings.redis_master_name)
+    if settings.redis_url:
+        return aioredis.from_url(settings.redis_url, password=settings.redis_password, db=settings.redis_db, **options)
+    return None
+
+
+def create_cache():
+    """创建应用缓存：有 Redis 时为带降级的共享缓存，否则为进程内缓存"""
+    memory = MemoryCache(max_entries=settings.cache_max_entries)
+    client = create_redis_client()
+    if client is None:
+        return memory
+    return FallbackCache(RedisCache(client), memory, retry_interval=settings.redis_retry_interval)
+
+
+cache = create_cache()
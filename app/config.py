@@ -1,8 +1,9 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 from .schemas import DiagnosisRule, MmlStrSetting, MmlNumSetting
-from typing import List, Dict, Any
-import json
+from .rule_data import get_rule_data
+from typing import List
 
 # 获取当前文件的绝对路径
 current_file = Path(__file__).resolve()
@@ -16,19 +17,90 @@ class Settings(BaseSettings):
     app_title: str = "广州移动智能故障诊断系统"
     default_limit: int = 10
     debug_mode: bool = False
+    # MySQL 下关键字检索是否使用 ngram 全文索引（需先执行 migrations/mysql/002）
+    keyword_fulltext: bool = True
+    # 游标分页模式下工单总数的缓存时间（秒）
+    work_order_count_ttl: float = 60.0
+    # 解决方案文档 mtime 检查间隔（秒）
+    solution_check_interval: float = 2.0
+    # 列表接口是否跳过 FastAPI 的二次校验，直接由 pydantic-core 一次性序列化为 JSON
+    fast_json_responses: bool = False
+    # 规则文件 mtime 检查间隔（秒），变化时热加载；0 表示只能通过管理接口重新加载
+    rules_watch_interval: float = 5.0
+    # 是否启用运行指标（请求耗时、诊断步骤耗时、SQL 统计、缓存命中率），启用后在 /metrics 导出；
+    # 指标按进程统计，只在单 worker 部署时准确（见 metrics.py）
+    metrics_enabled: bool = False
+    # 按需剖析单个请求时的采样间隔（秒），见 profiling.py
+    profiling_interval: float = 0.002
+    # 剖析结果保存目录，同一主机上的各 worker 共享；为空时使用系统临时目录下的 gdcm-profiles
+    profiling_dir: str = ""
+    # 启动预热时主库异步连接池预先建立的连接数
+    warmup_connections: int = 5
+    # 退出前等待进行中的诊断完成的最长时间（秒）
+    drain_timeout: float = 30.0
+    # 管理接口令牌，请求头 X-Admin-Token 需与之一致；未配置时管理接口不可用
+    admin_token: str | None = None
+
+    # 连接池配置，未设置时按数据库类型取默认值（见 database.POOL_DEFAULTS）
+    db_pool_size: int | None = None
+    db_max_overflow: int | None = None
+    # 连接最长使用时间（秒），应小于数据库或中间代理的空闲断开时间
+    db_pool_recycle: int | None = None
+    # 连接池耗尽时等待空闲连接的最长时间（秒）
+    db_pool_timeout: float | None = None
+    # 只读副本连接串，逗号分隔；配置后列表、详情与诊断等只读接口优先使用副本
+    database_read_urls: str | None = None
+    # 副本建连超时（秒），以及副本不可用后再次尝试前的等待时间（秒）
+    db_replica_connect_timeout: float = 2.0
+    db_replica_retry_interval: float = 10.0
+
+    # 缓存配置：未配置 Redis 时使用进程内缓存
+    cache_enabled: bool = True
+    cache_max_entries: int = 10000
+    cache_work_order_ttl: float = 300.0
+    cache_work_order_list_ttl: float = 30.0
+    # 进程内诊断结果缓存（按规则版本、工单修订号与网元光功率代数区分），见 services/diagnosis_memo.py
+    diagnosis_memo_enabled: bool = True
+    diagnosis_memo_max_entries: int = 20000
+    diagnosis_memo_ttl: float = 300.0
+    # Redis 直连地址，如 redis://127.0.0.1:6379
+    redis_url: str | None = None
+    # Redis 哨兵地址，如 127.0.0.1:26379,127.0.0.2:26379；配置后优先于 redis_url
+    redis_sentinels: str | None = None
+    redis_master_name: str = "mymaster"
+    redis_password: str | None = None
+    redis_db: int = 0
+    redis_socket_timeout: float = 0.2
+    # Redis 出错后降级为进程内缓存的时长（秒）
+    redis_retry_interval: float = 5.0
+
+    # 大模型：模型名称以 gemini 开头时使用 Gemini，否则使用 DeepSeek
+    llm_model: str = "deepseek-chat"
+    # 单次 HTTP 请求超时与重试次数（由模型客户端处理）
+    llm_timeout: float = 60.0
+    llm_max_retries: int = 2
+    # 异步推理的总时限（含排队），超时抛出 TimeoutError
+    llm_deadline: float = 120.0
+    # 各服务商的最大并发数与令牌桶限流（每秒请求数、突发容量），速率为 0 表示不限流
+    llm_deepseek_max_concurrency: int = 8
+    llm_deepseek_rate: float = 5.0
+    llm_deepseek_burst: float = 10.0
+    llm_gemini_max_concurrency: int = 4
+    llm_gemini_rate: float = 2.0
+    llm_gemini_burst: float = 4.0
+    # 大模型推理结果缓存：按提示词、模型与规则版本缓存
+    llm_cache_enabled: bool = True
+    llm_cache_ttl: float = 3600.0
+    llm_cache_max_entries: int = 1000
 
     # 读取根目录下的 .env
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
     
-    # 过渡数据，用于构建其他列表
-    json_rules: List[Dict[str, Any]] = json.load(open(project_root / "app" / 'files' / 'rules' / 'rules.json', 'r', encoding='utf-8')) 
-    json_mml_num: List[Dict[str, Any]] = json.load(open(project_root / "app" / 'files' / 'data' / 'mml_num.json', 'r', encoding='utf-8'))
-    json_mml_str: List[Dict[str, Any]] = json.load(open(project_root / "app" / 'files' / 'data' /'mml_str.json', 'r', encoding='utf-8'))
-    
-    # 解析后的列表
-    diagnosis_rule_list: List[DiagnosisRule] = [DiagnosisRule(**item) for item in json_rules]
-    mml_num_list: List[MmlNumSetting] = [MmlNumSetting(**item) for item in json_mml_num]
-    mml_str_list: List[MmlStrSetting] = [MmlStrSetting(**item) for item in json_mml_str]
+    # 启动时从 JSON 源文件解析的列表（见 rule_data.py，与规则注册表共用同一次加载）；
+    # 运行期热加载后以 services/rule_registry.py 中的当前版本为准
+    diagnosis_rule_list: List[DiagnosisRule] = Field(default_factory=lambda: get_rule_data().diagnosis_rules)
+    mml_num_list: List[MmlNumSetting] = Field(default_factory=lambda: get_rule_data().mml_num)
+    mml_str_list: List[MmlStrSetting] = Field(default_factory=lambda: get_rule_data().mml_str)
 
     def get_active_database_url(self) -> str:
         """
@@ -48,4 +120,8 @@ class Settings(BaseSettings):
             return self.database_url
         raise ValueError("未找到有效的数据库配置，请检查 .env 中的数据库连接串设置")
 
+    def get_read_database_urls(self) -> List[str]:
+        """只读副本连接串列表，未配置时为空"""
+        return [url.strip() for url in (self.database_read_urls or "").split(",") if url.strip()]
+
 settings = Settings()
@@ -1,25 +1,323 @@
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
+
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    "postgresql": "psycopg",
+    "mysql": "aiomysql",
+    "sqlite": "aiosqlite",
+}
+
+# 各数据库的连接池默认值，可由 Settings.db_pool_* 覆盖
+# MySQL 的 wait_timeout 与中间代理通常会断开长时间空闲的连接，回收时间设得更短
+POOL_DEFAULTS = {
+    "postgresql": {"pool_size": 10, "max_overflow": 20, "pool_recycle": 1800, "pool_timeout": 10.0},
+    "mysql": {"pool_size": 10, "max_overflow": 20, "pool_recycle": 900, "pool_timeout": 10.0},
+}
+
+
+class PoolStats:
+    """连接池的取连接等待统计（含新建连接的耗时）"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+
+class _TimedPoolMixin:
+    """记录每次从连接池取连接的等待时间与超时次数"""
+
+    stats: PoolStats
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return record
+
+    def recreate(self):
+        # engine.dispose() 会重建连接池，统计沿用
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
 
-def create_db_engine(url: str, echo: bool = False):
+# 名称 -> 同步引擎（异步引擎登记其 sync_engine），用于汇总连接池统计
+_engines: Dict[str, Engine] = {}
+
+
+def pool_options(url: str) -> dict:
+    """
+    按数据库类型生成连接池参数，Settings 中显式配置的值优先。
+    SQLite（测试与基准）保持 SQLAlchemy 默认连接池。
+    """
+    defaults = POOL_DEFAULTS.get(make_url(url).get_backend_name())
+    if defaults is None:
+        return {}
+    overrides = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+    return {key: value if overrides[key] is None else overrides[key] for key, value in defaults.items()}
+
+
+def create_db_engine(url: str, echo: bool = False, name: Optional[str] = None):
     """
     创建数据库引擎，自动兼容 MySQL 与 PostgreSQL。
-    - 当检测到 `mysql+` 方言时，为连接添加 `pool_pre_ping=True` 并保持 SQLAlchemy 2.0 默认设置；
-    - 其他方言（如 `postgresql+psycopg`）保持原样。
+    - 所有方言都开启 `pool_pre_ping=True`，避免使用已被服务端断开的连接；
+    - MySQL 与 PostgreSQL 按 `pool_options` 配置连接池大小、回收时间与等待超时；
+    - 指定 name 时登记该引擎，连接池统计见 `db_stats`。
     """
     engine_kwargs = {
         "echo": echo,
         "pool_pre_ping": True,
+        **pool_options(url),
     }
-    return create_engine(url, **engine_kwargs)
+    if "pool_size" in engine_kwargs:
+        engine_kwargs["poolclass"] = TimedQueuePool
+    engine = create_engine(url, **engine_kwargs)
+    if name:
+        _engines[name] = engine
+    return engine
+
+
+def to_async_url(url: str) -> str:
+    """
+    将同步连接串转换为对应的异步驱动连接串。
+    - PostgreSQL 统一使用 psycopg (3) 的异步模式；
+    - MySQL 使用 aiomysql；
+    - SQLite 使用 aiosqlite（仅用于测试与基准）。
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"不支持的数据库类型: {backend}")
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str, echo: bool = False, name: Optional[str] = None):
+    """创建异步数据库引擎，连接串会先转换为异步驱动，连接池配置同 `create_db_engine`"""
+    engine_kwargs = {
+        "echo": echo,
+        "pool_pre_ping": True,
+        **pool_options(url),
+    }
+    if "pool_size" in engine_kwargs:
+        engine_kwargs["poolclass"] = TimedAsyncQueuePool
+    engine = create_async_engine(to_async_url(url), **engine_kwargs)
+    if name:
+        _engines[name] = engine.sync_engine
+    return engine
+
+
+def pool_stats(name: str, engine: Engine) -> dict:
+    """
+    单个连接池的状态：
+    - saturation：已借出连接数 / 连接池上限（pool_size + max_overflow），接近 1 时请求开始排队；
+    - wait_avg_ms / wait_max_ms：取连接的平均与最长等待时间；timeouts：等待超时次数。
+    """
+    pool = engine.pool
+    stats: Optional[PoolStats] = getattr(pool, "stats", None)
+    result = {"name": name, "pool": type(pool).__name__}
+    if not isinstance(pool, QueuePool):
+        return result
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    result.update({
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "saturation": round(checked_out / capacity, 3) if capacity else None,
+    })
+    if stats is not None:
+        result.update({
+            "checkouts": stats.checkouts,
+            "wait_avg_ms": round(stats.wait_total / stats.checkouts * 1000, 3) if stats.checkouts else 0.0,
+            "wait_max_ms": round(stats.wait_max * 1000, 3),
+            "timeouts": stats.timeouts,
+        })
+    return result
 
 
-engine = create_db_engine(settings.get_active_database_url(), echo=settings.debug_mode)
+def db_stats() -> List[dict]:
+    """各已登记连接池的状态"""
+    return [pool_stats(name, engine) for name, engine in _engines.items()]
+
+
+def dispose_after_fork() -> None:
+    """
+    多进程部署时在子进程 fork 之后调用：丢弃从父进程继承的连接池（不关闭连接，避免影响父进程），
+    子进程使用时重新建立自己的连接。
+    """
+    for engine in _engines.values():
+        engine.dispose(close=False)
+
+
+def _ping(engine: Engine) -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def _aping(engine) -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def warm_up(connections: int) -> None:
+    """
+    预先建立数据库连接：主库异步连接池并发建立 connections 个连接，同步连接池与各只读副本各建立一个。
+    主库不可用时抛出异常；副本不可用时暂时摘除，不影响结果。
+    """
+    await asyncio.gather(*(_aping(async_engine) for _ in range(max(connections, 1))))
+    await asyncio.to_thread(_ping, engine)
+    for replica in read_router.replicas:
+        try:
+            await asyncio.wait_for(_aping(replica.engine), read_router.connect_timeout)
+        except (exc.SQLAlchemyError, OSError, TimeoutError) as e:
+            replica.mark_down(time.monotonic())
+            logger.warning("预热时只读副本 %s 不可用: %s", replica.name, e)
+
+
+class ReadReplica:
+    """
+    只读副本。建连失败后标记为不可用，retry_interval 秒内不再尝试。
+    """
+
+    def __init__(self, name: str, url: str, retry_interval: float, echo: bool = False):
+        self.name = name
+        self.url = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_async_db_engine(url, echo=echo, name=name)
+        self.sessionmaker = async_sessionmaker(bind=self.engine, autoflush=False, expire_on_commit=False)
+        self.retry_interval = retry_interval
+        self.healthy = True
+        self.retry_at = 0.0
+        self.failures = 0
+        self.sessions = 0
+
+    def available(self, now: float) -> bool:
+        return self.healthy or now >= self.retry_at
+
+    def mark_down(self, now: float) -> None:
+        self.healthy = False
+        self.retry_at = now + self.retry_interval
+        self.failures += 1
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "healthy": self.healthy,
+            "failures": self.failures,
+            "sessions": self.sessions,
+        }
+
+
+class ReadRouter:
+    """
+    只读会话路由：在可用副本间轮询，取会话时先建立连接（连接池 pre-ping 即健康检查），
+    失败的副本暂时摘除；没有可用副本时回退到主库。
+    副本存在复制延迟，刚写入的数据可能稍后才可见，写入及写后立即读取的场景应使用主库会话。
+    """
+
+    def __init__(self, replicas: List[ReadReplica], primary: async_sessionmaker, connect_timeout: float):
+        self.replicas = replicas
+        self.primary = primary
+        self.connect_timeout = connect_timeout
+        self.fallbacks = 0
+        self._counter = itertools.count()
+
+    async def session(self) -> AsyncSession:
+        if self.replicas:
+            start = next(self._counter)
+            for offset in range(len(self.replicas)):
+                replica = self.replicas[(start + offset) % len(self.replicas)]
+                if not replica.available(time.monotonic()):
+                    continue
+                session = replica.sessionmaker()
+                try:
+                    await asyncio.wait_for(session.connection(), self.connect_timeout)
+                except (exc.SQLAlchemyError, OSError, TimeoutError) as e:
+                    await session.close()
+                    replica.mark_down(time.monotonic())
+                    logger.warning("只读副本 %s 不可用，%ss 后重试: %s", replica.name, replica.retry_interval, e)
+                    continue
+                if not replica.healthy:
+                    logger.info("只读副本 %s 已恢复", replica.name)
+                replica.healthy = True
+                replica.sessions += 1
+                return session
+            self.fallbacks += 1
+        return self.primary()
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [replica.stats() for replica in self.replicas],
+            "primary_fallbacks": self.fallbacks,
+        }
+
+
+engine = create_db_engine(settings.get_active_database_url(), echo=settings.debug_mode, name="primary")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 当前数据库方言名称，如 postgresql / mysql / sqlite
+dialect_name = engine.dialect.name
+
+async_engine = create_async_db_engine(settings.get_active_database_url(), echo=settings.debug_mode,
+                                      name="primary-async")
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+read_router = ReadRouter(
+    [
+        ReadReplica(f"replica-{index}", url, settings.db_replica_retry_interval, echo=settings.debug_mode)
+        for index, url in enumerate(settings.get_read_database_urls())
+    ],
+    AsyncSessionLocal,
+    settings.db_replica_connect_timeout,
+)
+
 
 class Base(DeclarativeBase):
     """SQLAlchemy 基类，用于声明 ORM 模型。"""
@@ -33,3 +331,18 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """获取异步数据库会话，自动管理连接的创建与关闭。"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """获取只读异步会话：优先使用只读副本，副本不可用或未配置时使用主库。"""
+    db = await read_router.session()
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -0,0 +1,22 @@
+-- 退服分类持久化：由 GJ00008 派生的生成列，写入时由数据库自动计算
+-- 规则族与 data_service.resolve_rule_name 一致：包含“基站”为 TF-001，包含“小区”为 TF-002
+ALTER TABLE work_order
+    ADD COLUMN is_outage TINYINT(1)
+        GENERATED ALWAYS AS (`GJ00008` LIKE '%退服%') STORED,
+    ADD COLUMN rule_family VARCHAR(16)
+        GENERATED ALWAYS AS (
+            CASE WHEN `GJ00008` LIKE '%基站%' THEN 'TF-001'
+                 WHEN `GJ00008` LIKE '%小区%' THEN 'TF-002'
+            END
+        ) STORED;
+
+CREATE INDEX ix_work_order_outage_created_time_id
+    ON work_order (is_outage, created_time, work_order_id);
+CREATE INDEX ix_work_order_rule_family
+    ON work_order (rule_family);
+-- 已被 ix_work_order_outage_created_time_id 取代
+DROP INDEX ix_work_order_created_time_id ON work_order;
+
+-- 工单号关键字检索：ngram 全文索引，配合 MATCH ... AGAINST 使用（见 settings.keyword_fulltext）
+CREATE FULLTEXT INDEX ix_work_order_id_search
+    ON work_order (work_order_id) WITH PARSER ngram;
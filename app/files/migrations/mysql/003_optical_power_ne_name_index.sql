@@ -0,0 +1,3 @@
+-- 按网元批量加载光功率读数
+CREATE INDEX ix_optical_power_ne_name
+    ON optical_power (ne_name);
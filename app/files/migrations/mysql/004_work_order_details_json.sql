@@ -0,0 +1,3 @@
+-- details 的解析结果，由应用在写入时生成；已有数据执行 python -m app.manage backfill-details 回填
+-- 注意：MySQL 的 JSON 类型会按键名重新排序对象字段
+ALTER TABLE work_order ADD COLUMN details_json JSON NULL;
@@ -0,0 +1,3 @@
+-- 工单列表键集分页：按 (created_time, work_order_id) 倒序翻页
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_work_order_created_time_id
+    ON work_order (created_time, work_order_id);
@@ -0,0 +1,25 @@
+-- 退服分类持久化：由 GJ00008 派生的生成列，写入时由数据库自动计算
+-- 规则族与 data_service.resolve_rule_name 一致：包含“基站”为 TF-001，包含“小区”为 TF-002
+ALTER TABLE work_order
+    ADD COLUMN IF NOT EXISTS is_outage boolean
+        GENERATED ALWAYS AS ("GJ00008" LIKE '%退服%') STORED,
+    ADD COLUMN IF NOT EXISTS rule_family varchar(16)
+        GENERATED ALWAYS AS (
+            CASE WHEN "GJ00008" LIKE '%基站%' THEN 'TF-001'
+                 WHEN "GJ00008" LIKE '%小区%' THEN 'TF-002'
+            END
+        ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_work_order_outage_created_time_id
+    ON work_order (is_outage, created_time, work_order_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_work_order_rule_family
+    ON work_order (rule_family);
+-- 已被 ix_work_order_outage_created_time_id 取代
+DROP INDEX CONCURRENTLY IF EXISTS ix_work_order_created_time_id;
+
+-- 工单号关键字检索：LIKE '%kw%' 通过三元组 GIN 索引命中
+-- gin_trgm_ops 依赖 pg_trgm 扩展，须先于索引创建（需要 CREATE 权限；云数据库可能需由管理员预先安装）。
+-- 通过 Base.metadata.create_all 建表时（bench/datagen.py、全新环境），models.py 在 before_create 事件中执行同一语句。
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_work_order_id_search
+    ON work_order USING gin (work_order_id gin_trgm_ops);
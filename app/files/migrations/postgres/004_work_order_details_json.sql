@@ -0,0 +1,3 @@
+-- details 的解析结果，由应用在写入时生成；已有数据执行 python -m app.manage backfill-details 回填
+-- 使用 json 而非 jsonb，以保留字段原有顺序
+ALTER TABLE work_order ADD COLUMN IF NOT EXISTS details_json json;
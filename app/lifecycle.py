@@ -0,0 +1,113 @@
+"""
+服务生命周期：启动预热、就绪状态与退出前的排空。
+
+- /health 只表示进程存活；/ready 在预热完成且未进入排空时返回 200，供负载均衡与滚动发布判断；
+- 预热（数据库连接池、共享缓存连接）在后台进行，失败时按间隔重试，完成前 /ready 返回 503；
+- 收到 SIGTERM / SIGINT 后立即进入排空：/ready 返回 503，服务器停止接收新连接并等待进行中的请求完成，
+  退出前再等待仍在执行的诊断（最多 drain_timeout 秒）。
+"""
+import asyncio
+import logging
+import signal
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+        self.in_flight = 0
+        self.warmup_seconds: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+
+    @asynccontextmanager
+    async def track(self):
+        """统计进行中的诊断，排空时等待其完成"""
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def begin_drain(self) -> None:
+        if not self.draining:
+            logger.info("开始排空，进行中的诊断 %s 个", self.in_flight)
+        self.draining = True
+
+    async def drain(self, timeout: float) -> bool:
+        """进入排空并等待进行中的诊断完成，超时返回 False"""
+        self.begin_drain()
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self.in_flight:
+            logger.warning("排空超时，仍有 %s 个诊断未完成", self.in_flight)
+            return False
+        return True
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready and not self.draining,
+            "warmed_up": self.ready,
+            "draining": self.draining,
+            "in_flight_diagnoses": self.in_flight,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_error": self.warmup_error,
+        }
+
+
+lifecycle = Lifecycle()
+
+
+async def warm_up() -> None:
+    """建立数据库连接池中的连接，并建立共享缓存（Redis）连接"""
+    from .cache import cache
+    from .database import warm_up as warm_up_database
+    from .services.cache_service import KEY_PREFIX
+
+    await warm_up_database(settings.warmup_connections)
+    await cache.aget(f"{KEY_PREFIX}warmup")
+
+
+async def warm_up_until_ready(retry_interval: float = 5.0) -> None:
+    """预热成功后标记就绪；失败时记录原因并在 retry_interval 秒后重试"""
+    started = time.perf_counter()
+    while not lifecycle.draining:
+        try:
+            await warm_up()
+        except Exception as e:
+            lifecycle.warmup_error = str(e)
+            logger.warning("预热失败，%ss 后重试: %s", retry_interval, e)
+            await asyncio.sleep(retry_interval)
+            continue
+        lifecycle.warmup_seconds = round(time.perf_counter() - started, 3)
+        lifecycle.warmup_error = None
+        lifecycle.ready = True
+        logger.info("预热完成，耗时 %ss", lifecycle.warmup_seconds)
+        return
+
+
+def install_drain_signal_handlers() -> None:
+    """
+    在服务器已安装的 SIGTERM / SIGINT 处理函数之前先进入排空，使 /ready 立即返回 503。
+    只能在主线程调用（uvicorn 与 gunicorn 的 uvicorn worker 均在主线程执行 lifespan）。
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            lifecycle.begin_drain()
+            previous(signum, frame)
+
+        signal.signal(sig, handler)
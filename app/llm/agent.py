@@ -1,49 +1,203 @@
+import asyncio
+import hashlib
 import os
+import re
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
 
-from langchain.agents import create_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.tools import tool
-from langchain_deepseek import ChatDeepSeek
-from langchain_core.messages import HumanMessage
-
+# langchain 及各模型 SDK 导入耗时较长，在首次调用时才加载，不影响服务启动
+from .. import metrics
+from ..metrics import STEP_DURATION
+from ..cache import MemoryCache
+from ..config import settings
 from ..models import WorkOrder
+from .limits import GEMINI, get_limiter, provider_of
 
 
 GEMINI_2_5_PRO = "gemini-2.5-pro"
 GEMINI_2_5_FLASH = "gemini-2.5-flash"
 GEMINI_3_PRO = "gemini-3-pro"
+DEEPSEEK_CHAT = "deepseek-chat"
 
 os.environ["GOOGLE_API_KEY"] = os.getenv("GEMINI_API_KEY_1", "")
 
-def get_agent(tools: list):
-    """Get the agent."""
-    # llm = ChatGoogleGenerativeAI(
-    #     model=GEMINI_2_5_PRO,
-    #     google_api_key=os.environ.get("GEMINI_API_KEY_1"),
-    #     convert_system_message_to_human=True,
-    # )
-
-    llm = ChatDeepSeek(
-        model="deepseek-chat",
+# 每个模型只创建一个客户端（复用 HTTP 连接），每个 (模型, 工具集) 只创建一个 agent
+_chat_models: Dict[str, Any] = {}
+_agents: Dict[Tuple[str, tuple], Any] = {}
+_pool_lock = threading.Lock()
+_chat_model_factory: Optional[Callable[[str], Any]] = None
+
+# 推理结果缓存：相同提示词、模型与规则版本直接返回
+response_cache = MemoryCache(max_entries=settings.llm_cache_max_entries)
+
+
+def create_chat_model(model: str):
+    """按模型名称创建对应服务商的客户端（gemini-* 使用 Gemini，其余使用 DeepSeek）"""
+    if provider_of(model) == GEMINI:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=os.environ.get("GEMINI_API_KEY_1"),
+            temperature=0,
+            timeout=settings.llm_timeout,
+            max_retries=settings.llm_max_retries,
+        )
+
+    from langchain_deepseek import ChatDeepSeek
+
+    return ChatDeepSeek(
+        model=model,
         api_key=os.environ.get("DEEPSEEK_API_KEY"),
         temperature=0,
         max_tokens=None,
-        timeout=None,
-        max_retries=2,
-        # other params...
+        timeout=settings.llm_timeout,
+        max_retries=settings.llm_max_retries,
     )
-    return create_agent(model=llm, tools=tools)
+
+
+def set_chat_model_factory(factory: Optional[Callable[[str], Any]]) -> None:
+    """替换模型客户端的创建方式（测试时注入本地假模型），同时清空已池化的客户端与 agent"""
+    global _chat_model_factory
+    with _pool_lock:
+        _chat_model_factory = factory
+        _chat_models.clear()
+        _agents.clear()
+    response_cache.clear()
+
+
+def preload(model: Optional[str] = None) -> None:
+    """
+    预先导入 langchain 与模型 SDK，不创建客户端。
+    多进程部署时在 fork 之前调用，各 worker 共享已导入的模块；HTTP 连接仍由各 worker 自行建立。
+    """
+    import langchain.agents  # noqa: F401
+    import langchain_core.messages  # noqa: F401
+
+    if provider_of(model or settings.llm_model) == GEMINI:
+        import langchain_google_genai  # noqa: F401
+    else:
+        import langchain_deepseek  # noqa: F401
+
+
+def get_chat_model(model: str):
+    """按模型名称获取池化的客户端"""
+    with _pool_lock:
+        llm = _chat_models.get(model)
+        if llm is None:
+            llm = (_chat_model_factory or create_chat_model)(model)
+            _chat_models[model] = llm
+        return llm
+
+
+def get_agent(tools: list, model: Optional[str] = None):
+    """Get the agent."""
+    from langchain.agents import create_agent
+
+    model = model or settings.llm_model
+    key = (model, tuple(tools))
+    agent = _agents.get(key)
+    if agent is None:
+        llm = get_chat_model(model)
+        with _pool_lock:
+            agent = _agents.get(key)
+            if agent is None:
+                agent = create_agent(model=llm, tools=tools)
+                _agents[key] = agent
+    return agent
+
+
+def normalize_prompt(prompt: str) -> str:
+    """合并连续空白并去除首尾空白，仅空白不同的提示词视为相同"""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def response_key(prompt: str, model: str, rule_version: Optional[str]) -> str:
+    digest = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+    return f"{model}:{rule_version or ''}:{digest}"
+
+
+def _current_rule_version() -> str:
+    from ..services.rule_registry import rule_registry
+
+    return rule_registry.current.tag
+
+
+def _cache_key(prompt: str, model: str, rule_version: Optional[str]) -> Optional[str]:
+    if not settings.llm_cache_enabled:
+        return None
+    return response_key(prompt, model, rule_version or _current_rule_version())
+
 
 def inference(
     prompt: str,
     fetch_static_data,
     numeric_mock,
     string_mock,
+    model: Optional[str] = None,
+    rule_version: Optional[str] = None,
 ) -> str:
     """Use agent to answer the question."""
+    from langchain_core.messages import HumanMessage
+
+    model = model or settings.llm_model
+    key = _cache_key(prompt, model, rule_version)
+    if key is not None:
+        cached = response_cache.get(key)
+        metrics.record_cache("llm", cached is not None)
+        if cached is not None:
+            return cached
+
     tools = [fetch_static_data, numeric_mock, string_mock]
-    agent = get_agent(tools=tools)
+    agent = get_agent(tools=tools, model=model)
     # The prompt now contains all the context, so we can pass it directly.
     # We need to wrap the input in a HumanMessage for the Gemini API.
-    result = agent.invoke({"messages": [HumanMessage(content=prompt)]})
+    with metrics.timer(STEP_DURATION, "llm"):
+        result = agent.invoke({"messages": [HumanMessage(content=prompt)]})
+    if key is not None:
+        response_cache.set(key, result, settings.llm_cache_ttl)
+    return result
+
+
+async def ainference(
+    prompt: str,
+    fetch_static_data,
+    numeric_mock,
+    string_mock,
+    model: Optional[str] = None,
+    rule_version: Optional[str] = None,
+    timeout: Optional[float] = None,
+):
+    """
+    `inference` 的异步版本：
+    - 每个服务商的并发数与请求速率受 limits.py 中的信号量和令牌桶限制；
+    - timeout（默认 settings.llm_deadline）覆盖排队与调用的总时长，超时抛出 TimeoutError。
+    """
+    from langchain_core.messages import HumanMessage
+
+    model = model or settings.llm_model
+    key = _cache_key(prompt, model, rule_version)
+    if key is not None:
+        cached = response_cache.get(key)
+        metrics.record_cache("llm", cached is not None)
+        if cached is not None:
+            return cached
+
+    agent = get_agent(tools=[fetch_static_data, numeric_mock, string_mock], model=model)
+    limiter = get_limiter(provider_of(model))
+
+    async def run():
+        async with limiter.slot():
+            return await agent.ainvoke({"messages": [HumanMessage(content=prompt)]})
+
+    deadline = timeout if timeout is not None else settings.llm_deadline
+    try:
+        # 耗时包含排队等待
+        with metrics.timer(STEP_DURATION, "llm"):
+            result = await asyncio.wait_for(run(), deadline)
+    except TimeoutError:
+        limiter.timeouts += 1
+        raise TimeoutError(f"大模型调用超过 {deadline} 秒未完成")
+    if key is not None:
+        response_cache.set(key, result, settings.llm_cache_ttl)
     return result
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+from ..config import settings
+
+DEEPSEEK = "deepseek"
+GEMINI = "gemini"
+
+
+def provider_of(model: str) -> str:
+    """根据模型名称确定服务商"""
+    return GEMINI if model.startswith("gemini") else DEEPSEEK
+
+
+class TokenBucket:
+    """
+    令牌桶限流：每秒补充 rate 个令牌，最多积累 capacity 个。
+    rate <= 0 表示不限流。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        # 持锁等待，保证先到先得
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class ProviderLimiter:
+    """
+    单个服务商的并发与速率限制。
+    waiting 为排队等待的调用数（队列深度），in_flight 为正在执行的调用数。
+    """
+
+    def __init__(self, name: str, max_concurrency: int, rate: float, burst: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(rate, burst)
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.timeouts = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @asynccontextmanager
+    async def slot(self):
+        """获取一个执行名额：先等待并发名额，再等待令牌"""
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            await self.bucket.acquire()
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+        finally:
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.name,
+            "max_concurrency": self.max_concurrency,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+        }
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        if provider == GEMINI:
+            limiter = ProviderLimiter(
+                GEMINI, settings.llm_gemini_max_concurrency, settings.llm_gemini_rate, settings.llm_gemini_burst
+            )
+        else:
+            limiter = ProviderLimiter(
+                DEEPSEEK, settings.llm_deepseek_max_concurrency, settings.llm_deepseek_rate, settings.llm_deepseek_burst
+            )
+        _limiters[provider] = limiter
+    return limiter
+
+
+def reset_limiters() -> None:
+    _limiters.clear()
+
+
+def llm_stats() -> list[dict]:
+    """各服务商的排队深度与执行情况"""
+    return [limiter.stats() for limiter in _limiters.values()]
@@ -1,15 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from . import metrics, profiling
 from .config import settings
-from .routers import api
+from .lifecycle import install_drain_signal_handlers, lifecycle, warm_up_until_ready
+from .routers import admin, api
+from .services.rule_registry import rule_registry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    启动时开启规则文件监视并在后台预热（完成后 /ready 返回 200）；
+    退出时先排空进行中的诊断，再停止监视
+    """
+    rule_registry.start_watcher(settings.rules_watch_interval)
+    install_drain_signal_handlers()
+    warmup = asyncio.create_task(warm_up_until_ready())
+    yield
+    await lifecycle.drain(settings.drain_timeout)
+    warmup.cancel()
+    rule_registry.stop_watcher()
+
 
 def create_app() -> FastAPI:
     """工厂函数：创建并配置 App"""
     app = FastAPI(
         title=settings.app_title,
         description="API 接口文档",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan,
     )
     app.include_router(api.router)
+    app.include_router(admin.router)
+    metrics.install(app)
+    profiling.install(app)
 
     return app
 
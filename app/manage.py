@@ -0,0 +1,117 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from .database import SessionLocal
+
+project_root = Path(__file__).resolve().parent.parent
+
+# 在全新解释器中计时导入，输出导入耗时（秒）
+_STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def backfill_details(args: argparse.Namespace) -> None:
+    """回填 work_order.details_json"""
+    from .services.data_service import backfill_details_json
+
+    with SessionLocal() as db:
+        updated = backfill_details_json(db, batch_size=args.batch_size, only_missing=not args.all)
+    print(f"已回填 {updated} 条工单的 details_json")
+
+
+def ingest(args: argparse.Namespace) -> None:
+    """从 CSV / JSON Lines 批量导入工单或光功率读数"""
+    import asyncio
+
+    from .database import engine
+    from .services.ingest_service import after_ingest, detect_format, ingest_file, new_result
+
+    fmt = args.format or detect_format(args.path)
+    result = new_result(args.kind)
+    try:
+        with open(args.path, "rb") as stream:
+            ingest_file(engine, args.kind, stream, fmt, batch_size=args.batch_size, result=result)
+    finally:
+        # 共享缓存（Redis）中的旧数据一并失效；中途失败时已提交的批次同样需要处理
+        asyncio.run(after_ingest(result))
+    print(
+        f"{result.table}: 写入 {result.rows} 行，跳过 {result.skipped} 行，"
+        f"{result.batches} 批，耗时 {result.seconds}s（{result.rows_per_second} 行/秒）"
+    )
+
+
+def _parse_importtime(stderr: str, top: int) -> list[tuple[int, str]]:
+    """解析 -X importtime 输出，返回累计耗时（微秒）最高的模块"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative), name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def startup_time(args: argparse.Namespace) -> None:
+    """多次启动新解释器，统计导入应用模块的耗时"""
+    imports, totals = [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT.format(module=args.module)],
+            cwd=project_root, capture_output=True, text=True, check=True,
+        )
+        totals.append(time.perf_counter() - start)
+        imports.append(float(result.stdout.strip().splitlines()[-1]))
+    print(f"import {args.module}: 最小 {min(imports) * 1000:.0f}ms, 中位数 {statistics.median(imports) * 1000:.0f}ms")
+    print(f"解释器总耗时: 最小 {min(totals) * 1000:.0f}ms, 中位数 {statistics.median(totals) * 1000:.0f}ms")
+
+    if args.top:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+            cwd=project_root, capture_output=True, text=True, check=True,
+        )
+        print(f"累计导入耗时最高的 {args.top} 个模块:")
+        for cumulative, name in _parse_importtime(result.stderr, args.top):
+            print(f"  {cumulative / 1000:8.1f}ms  {name}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="运维命令")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill = subparsers.add_parser("backfill-details", help="解析并回填 work_order.details_json")
+    backfill.add_argument("--batch-size", type=int, default=1000, help="每批处理的工单数")
+    backfill.add_argument("--all", action="store_true", help="重新解析全部工单，而不仅是未回填的")
+    backfill.set_defaults(handler=backfill_details)
+
+    load = subparsers.add_parser("ingest", help="从 CSV / JSON Lines 批量导入工单或光功率读数")
+    load.add_argument("kind", choices=["work-orders", "optical-power"], help="导入的数据类型")
+    load.add_argument("path", help="数据文件路径（.csv 首行为列名，.jsonl 每行一个对象）")
+    load.add_argument("--format", choices=["csv", "jsonl"], help="文件格式，默认按扩展名判断")
+    load.add_argument("--batch-size", type=int, default=5000, help="每批写入的行数")
+    load.set_defaults(handler=ingest)
+
+    startup = subparsers.add_parser("startup-time", help="测量应用冷启动（模块导入）耗时")
+    startup.add_argument("--module", default="app.main", help="要导入的模块")
+    startup.add_argument("--runs", type=int, default=5, help="重复次数")
+    startup.add_argument("--top", type=int, default=10, help="列出累计导入耗时最高的模块数，0 表示不列出")
+    startup.set_defaults(handler=startup_time)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""
+运行指标：请求耗时、诊断各步骤耗时、每个请求的 SQL 次数与耗时以及缓存命中率，
+以 Prometheus 文本格式在 /metrics 导出。
+
+未启用（METRICS_ENABLED=false，默认）时，各埋点的 `timer` 返回空上下文，
+`install` 不注册中间件与 SQL 事件，开销可以忽略。
+指标量少且格式简单，这里直接实现所需的 Counter / Histogram，不引入 prometheus_client。
+
+指标保存在进程内：gunicorn 多 worker 部署时，每次抓取 /metrics 只得到恰好处理该请求的 worker 的数据，
+各 worker 的计数不会合并，直方图与计数器会随抓取落到不同 worker 而来回跳变。
+需要准确指标时以单 worker 运行（WEB_CONCURRENCY=1，通过多实例横向扩展并分别抓取）；
+gunicorn.conf.py 在启用指标且 worker 数大于 1 时于启动日志中给出警告。
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import settings
+
+ENABLED = settings.metrics_enabled
+
+# 秒级延迟的默认桶
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 每个请求的 SQL 条数
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# (名称, 类型, 说明, [(名称后缀, 标签, 值)])
+Family = Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """单调递增计数器，标签值按 labelnames 顺序以位置参数传入"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def collect(self) -> Family:
+        with self._lock:
+            items = list(self._values.items())
+        return self.name, "counter", self.documentation, [
+            ("", dict(zip(self.labelnames, labels)), value) for labels, value in items
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """直方图：每组标签保存各桶计数、总和与次数，导出时转换为累计桶"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # 标签 -> [各桶计数..., +Inf 桶计数, 总和]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def collect(self) -> Family:
+        samples = []
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in items:
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                samples.append(("_bucket", {**base, "le": _format_value(float(bound))}, cumulative))
+            samples.append(("_sum", base, series[-1]))
+            samples.append(("_count", base, cumulative))
+        return self.name, "histogram", self.documentation, samples
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+_NULL_TIMER = nullcontext()
+
+
+def timer(histogram: Histogram, *labels: str):
+    """记录 with 块的耗时；未启用指标时返回共享的空上下文"""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(histogram, labels)
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "接口耗时（按路由模板）", ("method", "route", "status"),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "单个请求执行的 SQL 条数", ("route",), buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "单个请求内 SQL 执行总耗时", ("route",),
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "单条 SQL 执行耗时（按语句类型）", ("operation",),
+)
+# 诊断步骤：fetch 查询工单；rule 单条规则整体；mock 取 MML 值（含 optical_power）；
+# optical_power 光功率读数查询与判定；solution 读取解决方案；template 模板替换；llm 大模型调用
+STEP_DURATION = Histogram(
+    "diagnosis_step_duration_seconds", "诊断各步骤耗时", ("step",),
+)
+RULE_DURATION = Histogram(
+    "diagnosis_rule_duration_seconds", "单条规则耗时（按规则族与规则序号）", ("family", "rule"),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "缓存读取次数", ("cache", "result"),
+)
+
+METRICS: List = [
+    REQUEST_DURATION,
+    REQUEST_DB_QUERIES,
+    REQUEST_DB_DURATION,
+    DB_QUERY_DURATION,
+    STEP_DURATION,
+    RULE_DURATION,
+    CACHE_REQUESTS,
+]
+
+# 导出时调用的采集函数，返回若干 Family（如连接池、大模型队列的当前状态）
+_collectors: List[Callable[[], Iterable[Family]]] = []
+
+
+def register_collector(collector: Callable[[], Iterable[Family]]) -> None:
+    _collectors.append(collector)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    if ENABLED:
+        CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def render() -> str:
+    """生成 Prometheus 文本格式（text/plain; version=0.0.4）"""
+    families = [metric.collect() for metric in METRICS]
+    for collector in _collectors:
+        families.extend(collector())
+    lines = []
+    for name, kind, documentation, samples in families:
+        lines.append(f"# HELP {name} {_escape(documentation)}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    """单个请求内的 SQL 统计，通过 ContextVar 在请求处理链路（含线程池与 greenlet）中共享"""
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_started"].pop()
+    elapsed = time.perf_counter() - started
+    DB_QUERY_DURATION.observe(elapsed, statement.lstrip().split(None, 1)[0].upper() if statement else "")
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def _handle_error(exception_context):
+    # 出错时 after_cursor_execute 不会触发，弹出对应的开始时间
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("metrics_started"):
+        conn.info["metrics_started"].pop()
+
+
+class MetricsMiddleware:
+    """
+    ASGI 中间件：记录每个 HTTP 请求的耗时与 SQL 统计。
+    路由标签使用匹配到的路由模板（如 /api/v1/work-order/{work_id}），未匹配的请求归为 unmatched，避免标签基数失控。
+    流式响应的耗时包含整个响应体的发送时间。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_DURATION.observe(elapsed, scope["method"], path, str(status))
+            REQUEST_DB_QUERIES.observe(stats.queries, path)
+            REQUEST_DB_DURATION.observe(stats.db_seconds, path)
+
+
+def _cache_families() -> Iterable[Family]:
+    """由 cache_requests_total 计算各缓存的命中率"""
+    totals: Dict[str, List[float]] = {}
+    for _, labels, value in CACHE_REQUESTS.collect()[3]:
+        entry = totals.setdefault(labels["cache"], [0, 0])
+        entry[0 if labels["result"] == "hit" else 1] += value
+    yield "cache_hit_ratio", "gauge", "缓存命中率", [
+        ("", {"cache": cache}, hits / (hits + misses)) for cache, (hits, misses) in totals.items() if hits + misses
+    ]
+
+
+def _pool_families() -> Iterable[Family]:
+    from .database import db_stats
+
+    pools = [stats for stats in db_stats() if "size" in stats]
+    gauges = [
+        ("db_pool_checked_out", "已借出的连接数", "checked_out"),
+        ("db_pool_saturation", "已借出连接数 / 连接池上限", "saturation"),
+    ]
+    for name, documentation, key in gauges:
+        yield name, "gauge", documentation, [
+            ("", {"pool": stats["name"]}, stats[key]) for stats in pools if stats[key] is not None
+        ]
+    timed = [stats for stats in pools if "checkouts" in stats]
+    yield "db_pool_checkouts_total", "counter", "从连接池取连接的次数", [
+        ("", {"pool": stats["name"]}, stats["checkouts"]) for stats in timed
+    ]
+    yield "db_pool_checkout_wait_seconds_max", "gauge", "取连接的最长等待时间", [
+        ("", {"pool": stats["name"]}, stats["wait_max_ms"] / 1000) for stats in timed
+    ]
+    yield "db_pool_timeouts_total", "counter", "取连接等待超时次数", [
+        ("", {"pool": stats["name"]}, stats["timeouts"]) for stats in timed
+    ]
+
+
+def _llm_families() -> Iterable[Family]:
+    from .llm.limits import llm_stats
+
+    providers = llm_stats()
+    for key, kind, documentation in (
+        ("waiting", "gauge", "排队等待的大模型调用数"),
+        ("in_flight", "gauge", "执行中的大模型调用数"),
+        ("completed", "counter", "已完成的大模型调用数"),
+        ("timeouts", "counter", "超时的大模型调用数"),
+    ):
+        name = f"llm_{key}_total" if kind == "counter" else f"llm_{key}"
+        yield name, kind, documentation, [("", {"provider": stats["provider"]}, stats[key]) for stats in providers]
+
+
+def install(app) -> None:
+    """注册中间件、SQL 事件、采集函数与 /metrics 路由；未启用指标时不做任何事"""
+    if not ENABLED:
+        return
+    from fastapi import Response
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+    if not _collectors:
+        for collector in (_cache_families, _pool_families, _llm_families):
+            register_collector(collector)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics() -> Response:
+        return Response(content=render(), media_type="text/plain; version=0.0.4; charset=utf-8")
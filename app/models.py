@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DDL, Column, Integer, String, DateTime, Index, Boolean, Computed, JSON, case, column, event
+from sqlalchemy.orm import Mapped, mapped_column, validates
 from datetime import datetime
+from typing import Any
 from .database import Base
+from .schemas import parse_details
 
 
 class OpticalPower(Base):
@@ -12,7 +14,7 @@ class OpticalPower(Base):
 
     # optical_power_id 是主键
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    ne_name: Mapped[str] = mapped_column(String)
+    ne_name: Mapped[str] = mapped_column(String, index=True)
     slot_id: Mapped[str] = mapped_column(String)
     board_name: Mapped[str] = mapped_column(String)
     port : Mapped[str] = mapped_column(String)
@@ -27,6 +29,19 @@ class WorkOrder(Base):
     对应数据库中的 work_order 表
     """
     __tablename__ = "work_order"
+    __table_args__ = (
+        # 退服工单列表与键集分页：按 (created_time, work_order_id) 倒序翻页
+        Index("ix_work_order_outage_created_time_id", "is_outage", "created_time", "work_order_id"),
+        # 工单号关键字检索：PostgreSQL 使用 pg_trgm，MySQL 使用 ngram 全文索引
+        Index(
+            "ix_work_order_id_search",
+            "work_order_id",
+            postgresql_using="gin",
+            postgresql_ops={"work_order_id": "gin_trgm_ops"},
+            mysql_prefix="FULLTEXT",
+            mysql_with_parser="ngram",
+        ),
+    )
 
     # work_order_id 是主键
     work_order_id: Mapped[str] = mapped_column(String, primary_key=True)
@@ -91,7 +106,51 @@ class WorkOrder(Base):
     # 详情
     details: Mapped[str] = mapped_column(String)
 
+    # 详情的解析结果（写入 details 时同步生成），读取时无需重复解析
+    details_json: Mapped[Any | None] = mapped_column(JSON, nullable=True)
+
+    # 是否退服告警（由 GJ00008 派生，数据库写入时自动计算）
+    is_outage: Mapped[bool | None] = mapped_column(
+        Boolean, Computed(column("GJ00008").like("%退服%"), persisted=True)
+    )
+
+    # 规则族（由 GJ00008 派生：基站 -> TF-001，小区 -> TF-002，与 data_service.resolve_rule_name 一致）
+    rule_family: Mapped[str | None] = mapped_column(
+        String(16),
+        Computed(
+            case(
+                (column("GJ00008").like("%基站%"), "TF-001"),
+                (column("GJ00008").like("%小区%"), "TF-002"),
+                else_=None,
+            ),
+            persisted=True,
+        ),
+        index=True,
+    )
+
 
 
     # 如果表里还有其他字段，但你不需要用到，可以不在这里定义。
-    # 但如果有写入需求，建议定义完整。
\ No newline at end of file
+    # 但如果有写入需求，建议定义完整。
+
+    @validates("details")
+    def _sync_details_json(self, key, value):
+        """details 变化时同步更新解析结果；无法解析为字典时置空，读取时回退到原始文本"""
+        parsed = parse_details(value)
+        self.details_json = parsed if isinstance(parsed, dict) else None
+        return value
+
+    @property
+    def parsed_details(self):
+        """优先返回已持久化的解析结果，未回填的旧数据返回原始 details"""
+        if self.details_json is not None:
+            return self.details_json
+        return self.details
+
+
+# ix_work_order_id_search 的 gin_trgm_ops 依赖 pg_trgm 扩展：通过 create_all 建表（基准数据、全新环境）时先创建扩展
+event.listen(
+    WorkOrder.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
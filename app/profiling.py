@@ -0,0 +1,297 @@
+"""
+按需剖析单个请求：请求头 `X-Profile: 1`（或查询参数 `profile=1`）并携带有效的管理令牌时，
+对该请求进行采样剖析并记录其执行的 SQL，结果以折叠栈（flamegraph.pl / speedscope 可直接读取）
+保存到剖析目录（`profiling_dir`），响应头 `X-Profile-Id` 返回剖析编号，可通过管理接口 /api/v1/admin/profiles/{id} 获取。
+
+- 剖析目录为同一主机上各 gunicorn worker 共享的本地目录，任一 worker 都能读取其他 worker 保存的结果；
+
+- 只对诊断、工单列表与工单详情接口生效；
+- 采样线程只记录事件循环线程中属于该请求的调用栈（以中间件所在帧为界），
+  请求挂起等待 I/O 时记为 (suspended)，同一时间其他请求的执行不会计入；
+  流式接口在子任务中生成的内容以及线程池中执行的代码不在采样范围内；
+- 未要求剖析的请求只多一次请求头检查；SQL 监听只在有剖析进行时注册。
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILED_PATHS = ("/api/v1/diagnosis", "/api/v1/work-orders", "/api/v1/work-order/")
+
+# 剖析结果的保存时间（秒），保存新结果时清理过期文件
+PROFILE_TTL = 3600.0
+# 单个剖析最多记录的 SQL 条数
+MAX_STATEMENTS = 500
+
+SUSPENDED = "(suspended)"
+
+project_root = Path(__file__).resolve().parent.parent
+
+
+# 剖析编号为 16 位十六进制，读取前校验，避免拼接出剖析目录之外的路径
+PROFILE_ID_PATTERN = re.compile(r"[0-9a-f]{16}")
+
+
+def profile_dir() -> Path:
+    """剖析目录：未配置时使用系统临时目录下的 gdcm-profiles"""
+    return Path(settings.profiling_dir or Path(tempfile.gettempdir()) / "gdcm-profiles")
+
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    if not PROFILE_ID_PATTERN.fullmatch(profile_id):
+        return None
+    return profile_dir() / f"{profile_id}.json"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    for marker in ("site-packages/", str(project_root) + "/"):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """
+    采样线程：每隔 interval 秒读取目标线程的调用栈，只保留 root 帧（请求所在的中间件帧）之上的部分，
+    以折叠栈计数。
+    """
+
+    def __init__(self, thread_id: int, root, interval: float):
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _label(self, code_frame) -> str:
+        code = code_frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code_frame)
+        return label
+
+    def sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        stack: List[str] = []
+        while frame is not None and frame is not self.root:
+            stack.append(self._label(frame))
+            frame = frame.f_back
+        if frame is None:
+            # 事件循环正在执行其他任务或空闲，本请求处于挂起状态
+            stack = [SUSPENDED]
+        stack.append(self._label(self.root))
+        self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+# 当前请求记录的 SQL；为 None 时不记录
+_statements: ContextVar[Optional[List[dict]]] = ContextVar("profile_statements", default=None)
+
+_listeners_lock = threading.Lock()
+_active_sessions = 0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _statements.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    statements = _statements.get()
+    if statements is None or not conn.info.get("profile_started"):
+        return
+    elapsed = time.perf_counter() - conn.info["profile_started"].pop()
+    if len(statements) < MAX_STATEMENTS:
+        statements.append({
+            "statement": statement,
+            "parameters": repr(parameters)[:500],
+            "executemany": executemany,
+            "duration_ms": round(elapsed * 1000, 3),
+        })
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("profile_started"):
+        conn.info["profile_started"].pop()
+
+
+def _set_listeners(active: bool) -> None:
+    """第一个剖析开始时注册 SQL 监听，最后一个结束时移除"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    global _active_sessions
+    with _listeners_lock:
+        _active_sessions += 1 if active else -1
+        if active and _active_sessions == 1:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Engine, "handle_error", _handle_error)
+        elif not active and _active_sessions == 0:
+            event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.remove(Engine, "handle_error", _handle_error)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _requested(scope) -> bool:
+    if _header(scope, b"x-profile") in ("1", "true"):
+        return True
+    query = scope.get("query_string", b"")
+    return b"profile=" in query and any(part in (b"profile=1", b"profile=true") for part in query.split(b"&"))
+
+
+def _authorized(scope) -> bool:
+    token = _header(scope, b"x-admin-token")
+    return bool(settings.admin_token and token and hmac.compare_digest(token, settings.admin_token))
+
+
+def _write_profile(profile_id: str, profile: dict) -> None:
+    """先写临时文件再改名，读取方不会读到写了一半的结果；顺带删除过期的剖析结果"""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    expired_before = time.time() - PROFILE_TTL
+    for path in directory.glob("*.json"):
+        try:
+            if path.stat().st_mtime < expired_before:
+                path.unlink()
+        except FileNotFoundError:
+            pass  # 其他 worker 已清理
+    target = profile_path(profile_id)
+    spool = directory / f".{profile_id}.{os.getpid()}.tmp"
+    spool.write_text(json.dumps(profile, ensure_ascii=False), encoding="utf-8")
+    os.replace(spool, target)
+
+
+def _read_profile(profile_id: str) -> Optional[dict]:
+    path = profile_path(profile_id)
+    if path is None:
+        return None
+    try:
+        if path.stat().st_mtime < time.time() - PROFILE_TTL:
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+async def store_profile(profile_id: str, profile: dict) -> None:
+    await asyncio.to_thread(_write_profile, profile_id, profile)
+
+
+async def load_profile(profile_id: str) -> Optional[dict]:
+    return await asyncio.to_thread(_read_profile, profile_id)
+
+
+class ProfilingMiddleware:
+    """ASGI 中间件：对要求剖析的请求启动采样线程与 SQL 记录，完成后保存结果"""
+
+    def __init__(self, app, interval: float):
+        self.app = app
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(PROFILED_PATHS) or not _requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _authorized(scope):
+            await _reject(send)
+            return
+
+        profile_id = uuid.uuid4().hex[:16]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        statements: List[dict] = []
+        token = _statements.set(statements)
+        _set_listeners(True)
+        sampler = Sampler(threading.get_ident(), sys._getframe(), self.interval)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - started
+            _set_listeners(False)
+            _statements.reset(token)
+            profile = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 3),
+                "interval_ms": self.interval * 1000,
+                "samples": sum(sampler.samples.values()),
+                "sql_count": len(statements),
+                "sql_ms": round(sum(item["duration_ms"] for item in statements), 3),
+                "sql": statements,
+                "folded": sampler.folded(),
+            }
+            try:
+                await store_profile(profile_id, profile)
+            except Exception as e:
+                logger.error("保存剖析结果 %s 失败: %s", profile_id, e)
+
+
+async def _reject(send) -> None:
+    body = json.dumps({"detail": "管理令牌无效"}, ensure_ascii=False).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 401,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def install(app) -> None:
+    """配置了管理令牌时注册剖析中间件，否则不做任何事"""
+    if settings.admin_token:
+        app.add_middleware(ProfilingMiddleware, interval=settings.profiling_interval)
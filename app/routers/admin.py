@@ -0,0 +1,197 @@
+import csv
+import hmac
+import json
+import tempfile
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from .. import profiling
+from ..config import settings
+from ..database import db_stats, engine, read_router
+from ..services import cache_service, ingest_service
+from ..services.diagnosis_memo import diagnosis_memo
+from ..llm.limits import llm_stats
+from ..schemas import IngestResponse, RuleVersionResponse
+from ..services.rule_registry import RuleSet, rule_registry
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None, description="管理令牌")) -> None:
+    """校验管理令牌；未配置 admin_token 时管理接口不可用"""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="管理接口未启用")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=401, detail="管理令牌无效")
+
+
+router = APIRouter(prefix="/api/v1/admin", dependencies=[Depends(require_admin)])
+
+
+def _rule_version(rule_set: RuleSet, reloaded: bool = False) -> RuleVersionResponse:
+    return RuleVersionResponse(
+        version=rule_set.version,
+        rule_version=rule_set.tag,
+        digest=rule_set.digest,
+        loaded_at=rule_set.loaded_at,
+        families=list(rule_set.plans),
+        reloaded=reloaded,
+    )
+
+
+@router.get("/rules", response_model=RuleVersionResponse, description="查看当前生效的规则版本")
+def get_rules() -> RuleVersionResponse:
+    """
+    查看当前生效的规则版本
+
+    :return: 规则版本信息
+    :rtype: RuleVersionResponse
+    """
+    return _rule_version(rule_registry.current)
+
+
+@router.post("/rules/reload", response_model=RuleVersionResponse, description="重新加载规则与 MML 配置")
+async def reload_rules(
+    force: bool = Query(default=False, description="内容未变化时也重新编译并切换版本"),
+) -> RuleVersionResponse:
+    """
+    重新加载规则与 MML 配置。解析与编译在线程池中完成，成功后原子切换；
+    校验失败时返回 422，继续使用当前版本。
+
+    :param force: 内容未变化时也切换版本
+    :type force: bool
+    :return: 切换后的规则版本信息
+    :rtype: RuleVersionResponse
+    """
+    try:
+        rule_set, reloaded = await run_in_threadpool(rule_registry.reload, force)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"规则加载失败: {e}")
+    return _rule_version(rule_set, reloaded)
+
+
+@router.get("/llm", response_model=list[dict], description="查看大模型调用的排队与并发情况")
+def get_llm_stats() -> list[dict]:
+    """
+    查看各服务商的排队深度、执行中调用数与超时次数
+
+    :return: 各服务商统计
+    :rtype: list[dict]
+    """
+    return llm_stats()
+
+
+@router.get("/db", response_model=dict, description="查看数据库连接池与只读副本状态")
+def get_db_stats() -> dict:
+    """
+    查看各连接池的借出数、饱和度与取连接等待时间，以及只读副本的健康状态与回退主库次数
+
+    :return: 连接池与副本状态
+    :rtype: dict
+    """
+    return {"pools": db_stats(), **read_router.stats()}
+
+
+@router.post("/ingest/{kind}", response_model=IngestResponse, description="批量导入工单或光功率读数")
+async def ingest(
+    kind: Literal["work-orders", "optical-power"],
+    request: Request,
+    format: Literal["csv", "jsonl"] = Query(default="jsonl", description="请求体格式：csv（首行为列名）或 jsonl"),
+    batch_size: int = Query(default=ingest_service.DEFAULT_BATCH_SIZE, ge=100, le=50000, description="每批写入的行数"),
+) -> IngestResponse:
+    """
+    批量导入。请求体直接为文件内容，先流式写入临时文件（超过阈值落盘），
+    再在线程池中按批写入数据库，结束后（包括中途失败）清除已提交批次影响的缓存。
+
+    :param kind: 导入类型，work-orders 或 optical-power
+    :type kind: str
+    :param request: 请求对象，请求体为 CSV 或 JSON Lines
+    :type request: Request
+    :param format: 请求体格式
+    :type format: str
+    :param batch_size: 每批写入的行数
+    :type batch_size: int
+    :return: 导入统计
+    :rtype: IngestResponse
+    """
+    result = ingest_service.new_result(kind)
+    with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        try:
+            await run_in_threadpool(ingest_service.ingest_file, engine, kind, spool, format, batch_size, result)
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            raise HTTPException(status_code=400, detail=f"数据格式错误: {e}")
+        finally:
+            # 中途失败时之前的批次已提交，同样需要清除缓存
+            await ingest_service.after_ingest(result)
+    return IngestResponse(
+        table=result.table,
+        rows=result.rows,
+        skipped=result.skipped,
+        batches=result.batches,
+        seconds=result.seconds,
+        rows_per_second=result.rows_per_second,
+    )
+
+
+@router.get("/diagnosis-memo", response_model=dict, description="查看进程内诊断结果缓存的命中情况")
+def get_diagnosis_memo_stats() -> dict:
+    """
+    查看当前进程诊断结果缓存的条目数、命中 / 未命中次数与失效次数
+
+    :return: 缓存统计
+    :rtype: dict
+    """
+    return diagnosis_memo.stats()
+
+
+@router.post("/diagnosis-memo/invalidate", response_model=dict, description="使指定工单或网元的诊断结果失效")
+async def invalidate_diagnosis_memo(
+    work_order_id: Optional[str] = Query(default=None, description="工单号"),
+    ne_name: Optional[str] = Query(default=None, description="网元名称，其光功率数据已变化"),
+) -> dict:
+    """
+    外部系统直接修改工单或光功率数据后调用，指定工单号时同时清除共享缓存中的工单详情。
+    未指定工单号与网元时清空全部诊断结果。
+
+    :param work_order_id: 工单号
+    :type work_order_id: str
+    :param ne_name: 网元名称
+    :type ne_name: str
+    :return: 失效后的缓存统计
+    :rtype: dict
+    """
+    if work_order_id:
+        diagnosis_memo.invalidate_work_order(work_order_id)
+        await cache_service.invalidate_work_order(work_order_id)
+    if ne_name:
+        diagnosis_memo.invalidate_ne([ne_name])
+    if not work_order_id and not ne_name:
+        diagnosis_memo.clear()
+    return diagnosis_memo.stats()
+
+
+@router.get("/profiles/{profile_id}", description="获取单个请求的剖析结果")
+async def get_profile(
+    profile_id: str,
+    format: Literal["json", "folded"] = Query(default="json", description="json 含 SQL 与折叠栈；folded 仅折叠栈文本"),
+) -> Response:
+    """
+    获取剖析结果。剖析由带 `X-Profile: 1` 与管理令牌的诊断 / 工单请求触发，编号见其响应头 X-Profile-Id。
+    折叠栈可直接交给 flamegraph.pl 或 speedscope 生成火焰图。
+
+    :param profile_id: 剖析编号
+    :type profile_id: str
+    :param format: 返回格式
+    :type format: str
+    :return: 剖析结果
+    :rtype: Response
+    """
+    profile = await profiling.load_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="剖析结果不存在或已过期")
+    if format == "folded":
+        return Response(content=profile["folded"], media_type="text/plain; charset=utf-8")
+    return Response(content=json.dumps(profile, ensure_ascii=False), media_type="application/json")
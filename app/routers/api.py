@@ -1,14 +1,21 @@
 from pathlib import Path
-from fastapi import APIRouter, HTTPException, Query, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+import json
 import math
 
-from ..database import get_db
-from ..services import data_service
-from ..schemas import PaginatedResponse, InferenceResponse, WorkOrderDTO
-from ..models import WorkOrder
+from ..database import get_async_read_db
+from ..lifecycle import lifecycle
+from ..services import data_service, optical_power_service
+from ..services.solution_store import solution_store, is_not_modified
+from ..services import cache_service
+from ..services.rule_registry import rule_registry
+from ..schemas import (
+    PaginatedResponse, InferenceResponse, WorkOrderDTO, DiagnosisBatchRequest, DiagnosisBatchResponse, WhatIfResponse,
+)
 from ..config import settings
 # 获取当前文件的绝对路径
 current_file = Path(__file__).resolve()
@@ -16,6 +23,12 @@ project_root = current_file.parent.parent
 
 router = APIRouter(prefix="/api/v1")
 
+
+def _json_response(body: str) -> Response:
+    """返回已序列化的 JSON 字符串，跳过 response_model 的再次校验"""
+    return Response(content=body, media_type="application/json")
+
+
 @router.get("/health", response_model=dict, description="检查服务健康状态")
 def health() -> dict:
     """
@@ -26,29 +39,55 @@ def health() -> dict:
     """
     return {"status": "healthy"}
 
+
+@router.get("/ready", response_model=dict, description="检查服务是否就绪（预热完成且未在排空）")
+def ready(response: Response) -> dict:
+    """
+    检查服务是否就绪：预热完成前与排空期间返回 503，负载均衡据此摘除或加入实例
+
+    :param response: 响应对象，用于设置状态码
+    :type response: Response
+    :return: 就绪状态
+    :rtype: dict
+    """
+    status = lifecycle.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
 @router.get("/solution", response_model=str, description="获取解决方案文件内容")
-def solution(code: str = Query(description="解决方案代码", default="FA00006")) -> str:
+def solution(
+    request: Request,
+    code: str = Query(description="解决方案代码", default="FA00006"),
+) -> Response:
     """
-    获取解决方案文件内容
+    获取解决方案文件内容，支持 ETag / Last-Modified 条件请求
     
-    :param code: Description
+    :param request: 请求对象，用于读取 If-None-Match / If-Modified-Since
+    :type request: Request
+    :param code: 解决方案代码
     :type code: str
-    :return: Description
-    :rtype: str
+    :return: 解决方案内容（JSON 字符串），未修改时返回 304
+    :rtype: Response
     """
-    file_path = project_root / "files" / "solutions" / (code + ".md")
-    if not file_path.exists():
+    document = solution_store.get(code)
+    if document is None:
         raise HTTPException(status_code=404, detail="解决方案文件未找到")
-    with open(file_path, "r", encoding="utf-8") as file:
-        content = file.read()
-    return content
+    headers = {
+        "ETag": document.etag,
+        "Last-Modified": document.last_modified,
+        "Cache-Control": "no-cache",
+    }
+    if is_not_modified(document, request.headers):
+        return Response(status_code=304, headers=headers)
+    return Response(content=document.body, media_type="application/json", headers=headers)
 
 @router.get("/diagnosis", response_model=InferenceResponse, description="执行故障诊断")
-def diagnosis(
+async def diagnosis(
     work_order_id: str = Query(description="工单号", default="CMCC-GD-GZCL-20250429-009158"),
     rule_index: int = Query(description="在哪一步呈现故障", default=3, gt=0),
     err_index: int = Query(description="错误索引", default=1, gt=0 ),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ) -> InferenceResponse:
     """
     执行推理
@@ -59,38 +98,183 @@ def diagnosis(
     :type rule_index: int
     :param err_index: 错误索引
     :type err_index: int
-    :param db: 数据库连接
-    :type db: Session
+    :param db: 数据库连接（只读副本优先）
+    :type db: AsyncSession
     :return: 推理结果
     :rtype: InferenceResponse
     """
+    # 整个请求使用同一规则版本，热加载不影响进行中的推理
+    rule_set = rule_registry.current
+    # 诊断结果不做路由级缓存：DiagnosisMemo 按工单修订号与光功率代数区分，工单须先从数据库读取
     try:
-        inference_list = data_service.exec(
-            work_order_id=work_order_id,
-            err_index=err_index,
-            rule_index=rule_index,
-            db=db,
-        )
-        return InferenceResponse(
+        async with lifecycle.track():
+            inference_list = await data_service.aexec(
+                work_order_id=work_order_id,
+                err_index=err_index,
+                rule_index=rule_index,
+                db=db,
+                rule_set=rule_set,
+            )
+        response = InferenceResponse(
             data=inference_list,
             success=True,
             error="",
+            rule_version=rule_set.tag,
         )
+        return _json_response(response.model_dump_json())
     except Exception as e:
-        return InferenceResponse(
+        response = InferenceResponse(
             data=[],
             success=False,
             error=str(e),
+            rule_version=rule_set.tag,
         )
+        if settings.fast_json_responses:
+            return _json_response(response.model_dump_json())
+        return response
+
+
+@router.get("/diagnosis/stream", description="流式执行故障诊断（NDJSON 或 SSE）")
+async def diagnosis_stream(
+    work_order_id: str = Query(description="工单号", default="CMCC-GD-GZCL-20250429-009158"),
+    rule_index: int = Query(description="在哪一步呈现故障", default=3, gt=0),
+    err_index: int = Query(description="错误索引", default=1, gt=0 ),
+    format: Literal["ndjson", "sse"] = Query(default="ndjson", description="输出格式：ndjson 或 sse"),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> StreamingResponse:
+    """
+    流式执行推理，每条规则推理完成后立即推送
+    
+    事件类型：
+    - inference：单条推理结果（Inference）；
+    - end：推理完成，附带结果条数与规则版本；
+    - error：推理过程中出错，附带错误信息。
+    
+    :param work_order_id: 工单号
+    :type work_order_id: str
+    :param rule_index: 在哪一步呈现故障
+    :type rule_index: int
+    :param err_index: 错误索引
+    :type err_index: int
+    :param format: 输出格式
+    :type format: str
+    :param db: 数据库连接（只读副本优先）
+    :type db: AsyncSession
+    :return: 流式响应
+    :rtype: StreamingResponse
+    """
+    item = await data_service.aget_work_order(db, work_order_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="未找到该工单")
+
+    rule_set = rule_registry.current
+    readings = await data_service.aload_optical_power(db, [item], rule_set)
+    inferences = data_service.iter_diagnosis(
+        item, rule_index, err_index, data_service.get_rule_name(item), rule_set
+    )
+
+    def encode(event: str, payload: str) -> str:
+        if format == "sse":
+            return f"event: {event}\ndata: {payload}\n\n"
+        return f'{{"event":"{event}","data":{payload}}}\n'
+
+    async def stream():
+        count = 0
+        try:
+            async with lifecycle.track():
+                # 逐条放到线程池中执行，线程池继承当前上下文中预加载的光功率读数
+                with optical_power_service.preloaded(readings):
+                    async for inference in iterate_in_threadpool(inferences):
+                        count += 1
+                        yield encode("inference", inference.model_dump_json())
+        except Exception as e:
+            yield encode("error", json.dumps({"error": str(e)}, ensure_ascii=False))
+            return
+        yield encode("end", json.dumps({"count": count, "rule_version": rule_set.tag}))
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(stream(), media_type=media_type, headers=headers)
+
+
+@router.post("/diagnosis/batch", response_model=DiagnosisBatchResponse, description="批量执行故障诊断")
+async def diagnosis_batch(
+    request: DiagnosisBatchRequest,
+    db: AsyncSession = Depends(get_async_read_db),
+) -> DiagnosisBatchResponse:
+    """
+    批量执行推理，工单通过一次 IN 查询加载，并按规则族分组推理
+    
+    :param request: 批量诊断请求，包含 (work_order_id, rule_index, err_index) 列表
+    :type request: DiagnosisBatchRequest
+    :param db: 数据库连接（只读副本优先）
+    :type db: AsyncSession
+    :return: 逐条推理结果，顺序与请求一致
+    :rtype: DiagnosisBatchResponse
+    """
+    rule_set = rule_registry.current
+    try:
+        async with lifecycle.track():
+            results = await data_service.aexec_batch(request.items, db, rule_set)
+        return DiagnosisBatchResponse(success=True, error="", results=results, rule_version=rule_set.tag)
+    except Exception as e:
+        return DiagnosisBatchResponse(success=False, error=str(e), results=[], rule_version=rule_set.tag)
+
+
+@router.get("/diagnosis/what-if", response_model=WhatIfResponse, description="遍历全部故障组合执行诊断（假设分析）")
+async def diagnosis_what_if(
+    work_order_id: str = Query(description="工单号", default="CMCC-GD-GZCL-20250429-009158"),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> WhatIfResponse:
+    """
+    对同一工单遍历规则族全部有区别的 (rule_index, err_index) 组合，结论取自规则加载时预先计算的矩阵，
+    超出 MML 配置条数的 err_index 与最后一条结果相同，不再重复列出
+
+    :param work_order_id: 工单号
+    :type work_order_id: str
+    :param db: 数据库连接（只读副本优先）
+    :type db: AsyncSession
+    :return: 各组合的推理结果
+    :rtype: WhatIfResponse
+    """
+    rule_set = rule_registry.current
+    try:
+        async with lifecycle.track():
+            result = await data_service.aexec_what_if(work_order_id, db, rule_set)
+    except Exception as e:
+        return WhatIfResponse(success=False, error=str(e), rule_version=rule_set.tag)
+    if result is None:
+        raise HTTPException(status_code=404, detail="未找到该工单")
+    rule_family, cells = result
+    return WhatIfResponse(success=True, rule_family=rule_family, cells=cells, rule_version=rule_set.tag)
+
+
+def _dump_page(result: dict, selected: Optional[tuple]) -> str:
+    """
+    一次性构建分页响应模型并由 pydantic-core 序列化为 JSON，
+    与 FastAPI 按 response_model 校验后再 json.dumps 的输出一致；指定字段时工单只输出所选字段
+    """
+    page = PaginatedResponse.model_validate(result)
+    if selected is None:
+        return page.model_dump_json()
+    return page.model_dump_json(include={"items": {"__all__": set(selected)}, **{
+        name: True for name in PaginatedResponse.model_fields if name != "items"
+    }})
 
 
 @router.get("/work-orders", response_model=PaginatedResponse, description="获取工单列表")
-def get_work_orders(
+async def get_work_orders(
     # 接收 page 和 size，而不是原来的 limit
     page: int = Query(default=1, ge=1, description="页码，从1开始"),
     size: int = Query(default= settings.default_limit, ge=1, le=100, description="每页显示条数"),
     keyword: str = Query(default= None, description="关键字，用于模糊匹配工单标题和描述"),
-    db: Session = Depends(get_db),
+    paging: Literal["offset", "cursor"] = Query(default="offset", description="分页模式：offset 按页码，cursor 按游标"),
+    cursor: Optional[str] = Query(default=None, description="游标模式下的下一页游标，取自上一页的 next_cursor"),
+    with_total: bool = Query(default=True, description="游标模式下是否返回总数（总数按 TTL 缓存）"),
+    fields: Optional[str] = Query(
+        default=None, description="只返回指定字段，逗号分隔；summary 表示列表页精简视图（不含 details）"
+    ),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """
     获取工单列表
@@ -101,18 +285,52 @@ def get_work_orders(
     :type size: int
     :param keyword: 关键字，用于模糊匹配工单标题和描述
     :type keyword: str
-    :param db: 数据库连接
-    :type db: Session
+    :param paging: 分页模式，传入 cursor 参数时自动使用游标模式
+    :type paging: str
+    :param cursor: 下一页游标
+    :type cursor: str
+    :param with_total: 游标模式下是否返回总数
+    :type with_total: bool
+    :param fields: 需要返回的字段，例如 work_order_id,GJ00008 或 summary；只查询对应列
+    :type fields: str
+    :param db: 数据库连接（只读副本优先）
+    :type db: AsyncSession
     :return: 工单列表
     :rtype: PaginatedResponse
     """
     try:
+        selected = data_service.resolve_fields(fields)
+
+        if paging == "cursor" or cursor:
+            # 游标模式：按 (created_time, work_order_id) 键集翻页，不执行 OFFSET
+            total, items, next_cursor = await data_service.aget_work_orders_by_cursor(
+                db, limit=size, keyword=keyword, cursor=cursor, with_total=with_total, fields=selected
+            )
+            result = {
+                "total": total,
+                "page": page,
+                "size": size,
+                "total_pages": math.ceil(total / size) if total is not None else None,
+                "items": items,
+                "next_cursor": next_cursor,
+            }
+            if selected is not None or settings.fast_json_responses:
+                return _json_response(_dump_page(result, selected))
+            return result
+
+        # 第一页访问最频繁，整页缓存
+        cache_key = cache_service.work_order_list_key(size, keyword, selected) if page == 1 else None
+        if cache_key is not None:
+            cached = await cache_service.get_cached(cache_key)
+            if cached is not None:
+                return _json_response(cached)
+
         # 1. 计算数据库需要的 offset (跳过的条数)
         skip = (page - 1) * size
 
         # 2. 调用 Service 获取数据
-        total, items = data_service.get_work_orders(
-            db, skip=skip, limit=size, keyword=keyword
+        total, items = await data_service.aget_work_orders(
+            db, skip=skip, limit=size, keyword=keyword, fields=selected
         )
 
         # 3. 计算总页数
@@ -120,37 +338,50 @@ def get_work_orders(
         total_pages = math.ceil(total / size)
 
         # 4. 返回符合 PaginatedResponse 结构的数据
-        return {
+        result = {
             "total": total,
             "page": page,
             "size": size,
             "total_pages": total_pages,
             "items": items,
         }
+        if cache_key is not None or selected is not None or settings.fast_json_responses:
+            body = _dump_page(result, selected)
+            if cache_key is not None:
+                await cache_service.set_cached(cache_key, body, settings.cache_work_order_list_ttl)
+            return _json_response(body)
+        return result
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
 
 
 @router.get("/work-order/{work_id}", response_model=WorkOrderDTO, description="获取指定工单详情")
-def get_work_order(
+async def get_work_order(
     work_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ) -> WorkOrderDTO:
     """
     获取指定工单详情
     
     :param work_id: 工单号
     :type work_id: str
-    :param db: 数据库连接
-    :type db: Session
+    :param db: 数据库连接（只读副本优先）
+    :type db: AsyncSession
     :return: 单条工单数据
     :rtype: WorkOrderDTO
     """
-    stmt = select(WorkOrder).where(WorkOrder.work_order_id == work_id)
-    item = db.execute(stmt).scalar_one_or_none()
+    cache_key = cache_service.work_order_key(work_id)
+    cached = await cache_service.get_cached(cache_key)
+    if cached is not None:
+        return _json_response(cached)
+
+    item = await data_service.aget_work_order(db, work_id)
     if item is None:
         raise HTTPException(status_code=404, detail="未找到该工单")
 
-    # 4. 返回符合 PaginatedResponse 结构的数据
-    return item
+    body = WorkOrderDTO.model_validate(item).model_dump_json()
+    await cache_service.set_cached(cache_key, body, settings.cache_work_order_ttl)
+    return _json_response(body)
@@ -0,0 +1,70 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Tuple
+
+from .schemas import DiagnosisRule, MmlNumSetting, MmlStrSetting
+
+# 获取当前文件的绝对路径
+current_file = Path(__file__).resolve()
+project_root = current_file.parent.parent
+
+RULES_FILE = project_root / "app" / "files" / "rules" / "rules.json"
+MML_NUM_FILE = project_root / "app" / "files" / "data" / "mml_num.json"
+MML_STR_FILE = project_root / "app" / "files" / "data" / "mml_str.json"
+
+SOURCE_FILES = (RULES_FILE, MML_NUM_FILE, MML_STR_FILE)
+
+
+@dataclass(frozen=True)
+class RuleData:
+    """解析后的规则与 MML 配置"""
+    diagnosis_rules: List[DiagnosisRule]
+    mml_num: List[MmlNumSetting]
+    mml_str: List[MmlStrSetting]
+
+
+def _read_json(path: Path) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_sources() -> RuleData:
+    """直接读取 JSON 源文件并构建 pydantic 模型"""
+    return RuleData(
+        diagnosis_rules=[DiagnosisRule(**item) for item in _read_json(RULES_FILE)],
+        mml_num=[MmlNumSetting(**item) for item in _read_json(MML_NUM_FILE)],
+        mml_str=[MmlStrSetting(**item) for item in _read_json(MML_STR_FILE)],
+    )
+
+
+def source_digest() -> str:
+    """
+    规则校验值：源 JSON 文件内容的 SHA-256，作为规则版本标识，规则或 MML 配置变化时产生新版本。
+    只取决于规则数据本身，升级依赖或修改代码不会改变规则版本。
+    """
+    digest = hashlib.sha256()
+    for path in SOURCE_FILES:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def load_versioned_rule_data() -> Tuple[str, RuleData]:
+    """加载规则与 MML 配置并返回 (校验值, 数据)，校验值同时作为规则版本标识"""
+    return source_digest(), parse_sources()
+
+
+def load_rule_data() -> RuleData:
+    return load_versioned_rule_data()[1]
+
+
+@lru_cache(maxsize=1)
+def get_versioned_rule_data() -> Tuple[str, RuleData]:
+    """进程内只加载一次，启动时 Settings 与规则注册表共用"""
+    return load_versioned_rule_data()
+
+
+def get_rule_data() -> RuleData:
+    return get_versioned_rule_data()[1]
@@ -2,7 +2,7 @@ from typing import List # 导入 List
 from typing import Optional # 导入 Optional
 from datetime import datetime
 from typing import Optional, Any, Dict, Union
-from pydantic import BaseModel, ConfigDict, field_validator, Field 
+from pydantic import AliasChoices, BaseModel, ConfigDict, field_validator, Field 
 from typing import Optional, Any, Dict, Union
 import json
 
@@ -56,6 +56,10 @@ class InferenceResponse(BaseModel):
         ..., 
         description="推理结果数据", 
     )   
+    rule_version: Optional[str] = Field(
+        default=None,
+        description="推理所用的规则版本（规则内容校验值前缀）",
+    )
 
 
 class Inference(BaseModel):
@@ -87,6 +91,207 @@ class Inference(BaseModel):
 
     
 
+class DiagnosisBatchItem(BaseModel):
+    """批量诊断中的单个请求"""
+    work_order_id: str = Field(
+        ..., 
+        description="工单号", 
+        examples=["CMCC-GD-GZCL-20250429-009158"]
+    )
+    rule_index: int = Field(
+        default=3, 
+        gt=0,
+        description="在哪一步呈现故障", 
+    )
+    err_index: int = Field(
+        default=1, 
+        gt=0,
+        description="错误索引", 
+    )
+
+
+class DiagnosisBatchRequest(BaseModel):
+    """批量诊断请求"""
+    items: List[DiagnosisBatchItem] = Field(
+        ..., 
+        min_length=1,
+        max_length=1000,
+        description="待诊断的工单列表，最多 1000 条", 
+    )
+
+
+class DiagnosisBatchResult(BaseModel):
+    """批量诊断中单个工单的结果"""
+    work_order_id: str = Field(..., description="工单号")
+    rule_index: int = Field(..., description="在哪一步呈现故障")
+    err_index: int = Field(..., description="错误索引")
+    success: bool = Field(..., description="是否成功执行")
+    error: str = Field(default="", description="错误标识")
+    data: List[Inference] = Field(default_factory=list, description="推理结果数据")
+
+
+class DiagnosisBatchResponse(BaseModel):
+    """批量诊断响应，results 与请求 items 顺序一致"""
+    success: bool = Field(..., description="批量请求是否成功执行")
+    error: str = Field(default="", description="错误标识")
+    results: List[DiagnosisBatchResult] = Field(default_factory=list, description="逐条诊断结果")
+    rule_version: Optional[str] = Field(default=None, description="整批推理所用的规则版本")
+
+
+class WhatIfCell(BaseModel):
+    """假设分析中单个 (rule_index, err_index) 组合的推理结果"""
+    rule_index: int = Field(..., description="在哪一步呈现故障")
+    err_index: int = Field(..., description="错误索引")
+    data: List[Inference] = Field(default_factory=list, description="推理结果数据")
+
+
+class WhatIfResponse(BaseModel):
+    """假设分析响应：工单在规则族全部有区别的组合下的推理结果"""
+    success: bool = Field(..., description="是否成功执行")
+    error: str = Field(default="", description="错误标识")
+    rule_family: Optional[str] = Field(default=None, description="工单所属规则族")
+    cells: List[WhatIfCell] = Field(default_factory=list, description="按 rule_index、err_index 排列的推理结果")
+    rule_version: Optional[str] = Field(default=None, description="推理所用的规则版本")
+
+
+class IngestResponse(BaseModel):
+    """批量导入统计"""
+    table: str = Field(..., description="写入的表")
+    rows: int = Field(..., description="写入（含更新）的行数")
+    skipped: int = Field(default=0, description="缺少主键等原因跳过的行数")
+    batches: int = Field(default=0, description="写入批次数")
+    seconds: float = Field(..., description="耗时（秒）")
+    rows_per_second: float = Field(default=0.0, description="写入速率（行/秒）")
+
+
+class RuleVersionResponse(BaseModel):
+    """当前生效的规则版本"""
+    version: int = Field(..., description="本进程内的规则版本号，每次切换递增")
+    rule_version: str = Field(..., description="规则版本（内容校验值前缀），与诊断响应中的 rule_version 对应")
+    digest: str = Field(..., description="规则内容校验值")
+    loaded_at: float = Field(..., description="加载时间（Unix 时间戳）")
+    families: List[str] = Field(default_factory=list, description="规则族名称")
+    reloaded: bool = Field(default=False, description="本次请求是否切换了版本")
+
+
+def parse_semicolon_string(text: str) -> Optional[Dict[str, str]]:
+    """
+    解析分号分隔的字符串。
+    如果无法解析或解析为空，返回 None (表示保留原文)。
+    """
+    if not text:
+        return None
+
+    try:
+        # 1. 保护转义字符
+        temp_semi = "§§SEMI§§"
+        temp_colon = "§§COLON§§"
+        safe_text = text.replace(r"\;", temp_semi).replace(r"\:", temp_colon)
+
+        # 2. 分割
+        items = safe_text.split(';')
+        result = {}
+
+        valid_item_count = 0
+        for item in items:
+            item = item.strip()
+            if not item: continue
+
+            if ':' in item:
+                k, v = item.split(':', 1)
+                clean_val = v.replace(temp_semi, ";").replace(temp_colon, ":").strip()
+                result[k.strip()] = clean_val
+                valid_item_count += 1
+            else:
+                # 如果只有 key 没有 value (如 "deployment:LTE;someFlag")
+                # 我们也把它存下来，或者你可以选择忽略
+                result[item.replace(temp_semi, ";")] = ""
+
+        # 如果完全没有解析出任何有效键值对（比如就是一个纯文本描述），返回 None
+        if not result:
+            return None
+
+        return result
+
+    except Exception:
+        return None
+
+
+def parse_details(v):
+    """
+    主解析逻辑：尽最大努力解析，失败则回退到原始值
+    """
+    # 如果本身不是字符串（已经是字典或None），直接返回
+    if not v or not isinstance(v, str):
+        return v
+
+    try:
+        # === 第一层：解析外部的 Key: Value 换行结构 ===
+        parsed_data = {}
+        lines = v.split('\n')
+        current_key = None
+
+        for line in lines:
+            line = line.strip()
+            if not line: continue
+
+            # 判断是否为新 Key
+            separator = "：" if "：" in line else ":"
+            is_new_key = False
+            if separator in line:
+                potential_key, _ = line.split(separator, 1)
+                potential_key = potential_key.strip()
+                # 简单的启发式规则：Key 不太可能包含引号或大括号，且长度通常有限
+                if '"' not in potential_key and '{' not in potential_key and len(potential_key) < 30:
+                    is_new_key = True
+
+            if is_new_key:
+                key, value = line.split(separator, 1)
+                current_key = key.strip()
+                parsed_data[current_key] = value.strip()
+            else:
+                # 拼接断行
+                if current_key:
+                    parsed_data[current_key] += "\n" + line
+
+        # 如果第一层解析结果为空（说明格式完全不对），直接返回原始字符串 v
+        if not parsed_data:
+            return v
+
+        # === 第二层：解析 "告警原文" JSON ===
+        if "告警原文" in parsed_data:
+            try:
+                # 尝试解析 JSON
+                alarm_content = json.loads(parsed_data["告警原文"], strict=False)
+
+                # 只有解析成功且是字典时，才继续处理 deeper logic
+                if isinstance(alarm_content, dict):
+
+                    # === 第三层：解析 "addInfo" 分号结构 ===
+                    if "addInfo" in alarm_content:
+                        original_add_info = alarm_content["addInfo"]
+                        if isinstance(original_add_info, str):
+                            # 调用辅助函数
+                            parsed_add_info = parse_semicolon_string(original_add_info)
+                            # 【关键逻辑】只有解析出了有效内容，才替换；否则保留原字符串
+                            if parsed_add_info:
+                                alarm_content["addInfo"] = parsed_add_info
+
+                    # 将处理过的对象赋值回去
+                    parsed_data["告警原文"] = alarm_content
+
+            except Exception:
+                # json.loads 失败，或者后续处理出错
+                # 捕获所有异常，不做任何修改，保留 "告警原文" 为原始字符串
+                pass
+
+        return parsed_data
+
+    except Exception:
+        # 如果最外层的分割逻辑都崩了，直接返回原始字符串
+        return v
+
+
 class WorkOrderDTO(BaseModel):
     """单条工单数据 (保持不变)"""
     work_order_id: str = Field(
@@ -184,8 +389,10 @@ class WorkOrderDTO(BaseModel):
     )
     
     # 这是一个联合类型，描述需要写清楚
+    # 从 ORM 对象读取时优先使用 parsed_details（已持久化的解析结果），没有时回退到原始 details
     details: Optional[Union[Dict[str, Any], str]] = Field(
         default=None, 
+        validation_alias=AliasChoices("parsed_details", "details"),
         description="告警详情 (会自动解析为JSON对象，如果解析失败则返回原始字符串)",
         examples=[{
             "告警网管": "FMC",
@@ -201,77 +408,10 @@ class WorkOrderDTO(BaseModel):
     @classmethod
     def parse_details_to_json(cls, v):
         """
-        主解析逻辑：尽最大努力解析，失败则回退到原始值
+        主解析逻辑：尽最大努力解析，失败则回退到原始值。
+        已持久化解析结果（details_json）的工单直接得到字典，不再重复解析。
         """
-        # 如果本身不是字符串（已经是字典或None），直接返回
-        if not v or not isinstance(v, str):
-            return v
-        
-        try:
-            # === 第一层：解析外部的 Key: Value 换行结构 ===
-            parsed_data = {}
-            lines = v.split('\n')
-            current_key = None
-            
-            for line in lines:
-                line = line.strip()
-                if not line: continue
-                
-                # 判断是否为新 Key
-                separator = "：" if "：" in line else ":"
-                is_new_key = False
-                if separator in line:
-                    potential_key, _ = line.split(separator, 1)
-                    potential_key = potential_key.strip()
-                    # 简单的启发式规则：Key 不太可能包含引号或大括号，且长度通常有限
-                    if '"' not in potential_key and '{' not in potential_key and len(potential_key) < 30:
-                        is_new_key = True
-
-                if is_new_key:
-                    key, value = line.split(separator, 1)
-                    current_key = key.strip()
-                    parsed_data[current_key] = value.strip()
-                else:
-                    # 拼接断行
-                    if current_key:
-                        parsed_data[current_key] += "\n" + line
-            
-            # 如果第一层解析结果为空（说明格式完全不对），直接返回原始字符串 v
-            if not parsed_data:
-                return v
-
-            # === 第二层：解析 "告警原文" JSON ===
-            if "告警原文" in parsed_data:
-                try:
-                    # 尝试解析 JSON
-                    alarm_content = json.loads(parsed_data["告警原文"], strict=False)
-                    
-                    # 只有解析成功且是字典时，才继续处理 deeper logic
-                    if isinstance(alarm_content, dict):
-                        
-                        # === 第三层：解析 "addInfo" 分号结构 ===
-                        if "addInfo" in alarm_content:
-                            original_add_info = alarm_content["addInfo"]
-                            if isinstance(original_add_info, str):
-                                # 调用辅助函数
-                                parsed_add_info = cls._parse_semicolon_string(original_add_info)
-                                # 【关键逻辑】只有解析出了有效内容，才替换；否则保留原字符串
-                                if parsed_add_info:
-                                    alarm_content["addInfo"] = parsed_add_info
-                        
-                        # 将处理过的对象赋值回去
-                        parsed_data["告警原文"] = alarm_content
-                        
-                except Exception:
-                    # json.loads 失败，或者后续处理出错
-                    # 捕获所有异常，不做任何修改，保留 "告警原文" 为原始字符串
-                    pass
-
-            return parsed_data
-
-        except Exception:
-            # 如果最外层的分割逻辑都崩了，直接返回原始字符串
-            return v
+        return parse_details(v)
 
     @staticmethod
     def _parse_semicolon_string(text: str) -> Optional[Dict[str, str]]:
@@ -279,49 +419,15 @@ class WorkOrderDTO(BaseModel):
         解析分号分隔的字符串。
         如果无法解析或解析为空，返回 None (表示保留原文)。
         """
-        if not text:
-            return None
-        
-        try:
-            # 1. 保护转义字符
-            temp_semi = "§§SEMI§§"
-            temp_colon = "§§COLON§§"
-            safe_text = text.replace(r"\;", temp_semi).replace(r"\:", temp_colon)
-            
-            # 2. 分割
-            items = safe_text.split(';')
-            result = {}
-            
-            valid_item_count = 0
-            for item in items:
-                item = item.strip()
-                if not item: continue
-                
-                if ':' in item:
-                    k, v = item.split(':', 1)
-                    clean_val = v.replace(temp_semi, ";").replace(temp_colon, ":").strip()
-                    result[k.strip()] = clean_val
-                    valid_item_count += 1
-                else:
-                    # 如果只有 key 没有 value (如 "deployment:LTE;someFlag")
-                    # 我们也把它存下来，或者你可以选择忽略
-                    result[item.replace(temp_semi, ";")] = ""
-            
-            # 如果完全没有解析出任何有效键值对（比如就是一个纯文本描述），返回 None
-            if not result:
-                return None
-                
-            return result
-            
-        except Exception:
-            return None
+        return parse_semicolon_string(text)
     
 class PaginatedResponse(BaseModel):
     """
     [新增] 分页响应结构
     """
-    total: int          # 总记录数
-    page: int           # 当前页码
-    size: int           # 每页大小
-    total_pages: int    # 总页数
-    items: List[WorkOrderDTO] # 数据列表
\ No newline at end of file
+    total: Optional[int]        # 总记录数（游标模式下未请求总数时为空）
+    page: int                   # 当前页码
+    size: int                   # 每页大小
+    total_pages: Optional[int]  # 总页数
+    items: List[WorkOrderDTO]   # 数据列表
+    next_cursor: Optional[str] = None  # 下一页游标（仅游标模式，无更多数据时为空）
\ No newline at end of file
@@ -0,0 +1,51 @@
+from typing import Optional, Sequence
+
+from .. import metrics
+from ..cache import cache
+from ..config import settings
+
+# 所有缓存键的统一前缀，便于与其他应用共用 Redis
+KEY_PREFIX = "gdcm:"
+
+
+def work_order_key(work_order_id: str) -> str:
+    return f"{KEY_PREFIX}work_order:{work_order_id}"
+
+
+def work_order_list_key(size: int, keyword: Optional[str], fields: Optional[Sequence[str]] = None) -> str:
+    """工单列表仅缓存第一页，不同字段投影分别缓存"""
+    projection = ",".join(fields) if fields else "*"
+    return f"{KEY_PREFIX}work_orders:page1:{size}:{projection}:{keyword or ''}"
+
+
+async def get_cached(key: str) -> Optional[str]:
+    """读取缓存的 JSON 字符串，未启用缓存或未命中时返回 None"""
+    if not settings.cache_enabled:
+        return None
+    value = await cache.aget(key)
+    # 按键类型（work_order / work_orders）统计命中率
+    metrics.record_cache(key[len(KEY_PREFIX):].split(":", 1)[0], value is not None)
+    return value
+
+
+async def set_cached(key: str, value: str, ttl: float) -> None:
+    if not settings.cache_enabled or ttl <= 0:
+        return
+    await cache.aset(key, value, ttl)
+
+
+async def invalidate_work_order(work_order_id: str) -> None:
+    """工单写入后调用：清除该工单详情以及列表缓存"""
+    await cache.adelete(work_order_key(work_order_id))
+    await invalidate_work_order_lists()
+
+
+async def invalidate_work_order_lists() -> None:
+    """工单新增或删除后调用：清除全部列表缓存"""
+    await cache.adelete_prefix(f"{KEY_PREFIX}work_orders:")
+
+
+async def invalidate_all_work_orders() -> None:
+    """批量导入工单后调用：清除全部工单详情与列表缓存"""
+    await cache.adelete_prefix(f"{KEY_PREFIX}work_order:")
+    await invalidate_work_order_lists()
@@ -1,94 +1,328 @@
-import re
+import base64
+import json
+import time
+from functools import lru_cache
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func  # 👈 别忘了导入 func
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy import select, func, and_, or_, update, bindparam  # 👈 别忘了导入 func
 from pathlib import Path
-from langchain.tools import tool
-from typing import List
+from typing import Iterable, Iterator, List
 from ..services.mock_service import mock_numerical_value, mock_string_value
 from ..models import WorkOrder
-from ..schemas import Inference, RuleContent
+from ..schemas import Inference, DiagnosisBatchItem, DiagnosisBatchResult, WhatIfCell, WorkOrderDTO, parse_details
 from ..config import settings
+from ..database import dialect_name
+from .mml_registry import OPTICAL_POWER_KEY
+from .outcome_matrix import Outcome, make_outcome
+from .rule_compiler import CompiledStep, CompiledTemplate, RulePlan, compile_template
+from .rule_registry import RuleSet, rule_registry
+from .static_data_service import fetch_static_data
+from .solution_store import solution_store
+from .diagnosis_memo import diagnosis_memo
+from . import optical_power_service
+from .. import metrics
+from ..metrics import RULE_DURATION, STEP_DURATION
 
 # 获取当前文件的绝对路径
 current_file = Path(__file__).resolve()
 project_root = current_file.parent.parent
-pattern = r'(?<![A-Z0-9])(?:GJ|JT)\d{5}(?![A-Z0-9])'
 
 def exec(
-    work_order_id: str, rule_index, err_index: float, db: Session
+    work_order_id: str, rule_index, err_index: float, db: Session, rule_set: RuleSet | None = None
 ) -> List[Inference]:
 
     stmt = select(WorkOrder).where(WorkOrder.work_order_id == work_order_id)
-    item = db.execute(stmt).scalar_one_or_none()
+    with metrics.timer(STEP_DURATION, "fetch"):
+        item = db.execute(stmt).scalar_one_or_none()
 
-    rule_name = None
+    rule_set = rule_set or rule_registry.current
+    rule_name = get_rule_name(item)
+    readings = load_optical_power(db, [item], rule_set)
+    with optical_power_service.preloaded(readings):
+        return digonisis(item, rule_index, err_index, rule_name, rule_set)
 
-    if "小区" in item.GJ00008:
-        rule_name = "TF-002"
-        
-    if "基站" in item.GJ00008:
-        rule_name = "TF-001"
-    
-    return digonisis(item, rule_index, err_index, rule_name)
 
+async def aexec(
+    work_order_id: str, rule_index, err_index: float, db: AsyncSession, rule_set: RuleSet | None = None
+) -> List[Inference]:
+    """
+    `exec` 的异步版本：异步查询工单及其网元的光功率数据（同一只读会话），
+    预加载后规则推理不再访问数据库，直接在事件循环中执行
+    """
+
+    with metrics.timer(STEP_DURATION, "fetch"):
+        item = await aget_work_order(db, work_order_id)
+
+    rule_set = rule_set or rule_registry.current
+    rule_name = get_rule_name(item)
+    readings = await aload_optical_power(db, [item], rule_set)
+    with optical_power_service.preloaded(readings):
+        return digonisis(item, rule_index, err_index, rule_name, rule_set)
+
+
+def resolve_rule_name(alarm_name: str | None) -> str | None:
+    """
+    根据告警标准名（GJ00008）确定规则族：
+    包含“基站”为 TF-001，包含“小区”为 TF-002，两者都包含时以“基站”为准。
+    """
+    if not alarm_name:
+        return None
+    if "基站" in alarm_name:
+        return "TF-001"
+    if "小区" in alarm_name:
+        return "TF-002"
+    return None
 
-def digonisis(work_order: WorkOrder, rule_index, err_index: float, rule_name) -> List[Inference]: 
-    
+
+def get_rule_name(work_order: WorkOrder) -> str | None:
+    """优先使用数据库中持久化的规则族，未计算时按 GJ00008 推导"""
+    return getattr(work_order, "rule_family", None) or resolve_rule_name(work_order.GJ00008)
+
+
+def get_rule_plan(rule_name: str | None, rule_set: RuleSet | None = None) -> RulePlan | None:
+    """按名称获取预编译的规则族执行计划，未指定 rule_set 时使用当前生效的规则版本"""
     if rule_name is None:
+        return None
+    return (rule_set or rule_registry.current).plans.get(rule_name)
+
+
+def digonisis(
+    work_order: WorkOrder, rule_index, err_index: float, rule_name, rule_set: RuleSet | None = None
+) -> List[Inference]:
+
+    rule_set = rule_set or rule_registry.current
+    plan = get_rule_plan(rule_name, rule_set)
+    if plan is None:
         return []
-    
-    result : List[Inference] = []
-    rule_contents : List[RuleContent] = []
-    for item in settings.diagnosis_rule_list:
-        if item.name ==  rule_name:
-            rule_contents = item.rules
-            break 
-    
-
-    if rule_index < 1:
-        rule_index = 1
-
-    if rule_index > len(rule_contents):
-        rule_index = len(rule_contents)
-    
-    for rule in rule_contents:
-        if rule.id > rule_index:
-            break
-        inference = Inference(
-            descriptions="", conclusion="", solution_code="", solution_content="", error="", curr_rules=[], name= ""
-        )
-    
+    return _run_plan(plan, work_order, rule_index, err_index, rule_set)
+
+
+def _run_plan(
+    plan: RulePlan, work_order: WorkOrder, rule_index, err_index: float, rule_set: RuleSet
+) -> List[Inference]:
+    """执行规则族；启用诊断结果缓存时，相同输入直接返回缓存结果"""
+    if not settings.diagnosis_memo_enabled:
+        return list(_iter_plan(plan, work_order, rule_index, err_index, rule_set))
+    key = diagnosis_memo.key(plan, work_order, rule_index, err_index, rule_set)
+    cached = diagnosis_memo.get(key)
+    if cached is not None:
+        return cached
+    result = list(_iter_plan(plan, work_order, rule_index, err_index, rule_set))
+    diagnosis_memo.set(key, result)
+    return result
+
+
+def iter_diagnosis(
+    work_order: WorkOrder, rule_index, err_index: float, rule_name, rule_set: RuleSet | None = None
+) -> Iterator[Inference]:
+    """逐条产出推理结果，每条规则推理完成后立即返回，供流式接口使用"""
+    rule_set = rule_set or rule_registry.current
+    plan = get_rule_plan(rule_name, rule_set)
+    if plan is None:
+        return iter(())
+    return _iter_plan(plan, work_order, rule_index, err_index, rule_set)
+
+
+def _iter_plan(
+    plan: RulePlan, work_order: WorkOrder, rule_index, err_index: float, rule_set: RuleSet
+) -> Iterator[Inference]:
+    rule_index = plan.clamp_index(rule_index)
+    # 与工单无关的结论取自规则加载时预先计算的矩阵，只有光功率等动态数据需要实时计算
+    matrix = rule_set.matrices.get(plan.name)
+    cell = matrix.lookup(rule_index, err_index) if matrix is not None else None
+    for position, step in enumerate(plan.steps_until(rule_index)):
         status = 0
-        if rule.id == rule_index:
+        if step.id == rule_index:
             status = err_index
 
-        mock = rule.mock
-        content = None
-        if mock.type == "num":
-            content = mock_numerical_value(mock.name, status, work_order)
+        # 在 yield 之前结束计时，不计入调用方处理结果的时间
+        with metrics.timer(RULE_DURATION, plan.name, str(step.id)):
+            outcome = cell[position] if cell is not None else None
+            if outcome is None:
+                outcome = _resolve_outcome(step, status, work_order, rule_set)
+
+            with metrics.timer(STEP_DURATION, "template"):
+                inference = step.render(
+                    work_order,
+                    conclusion=outcome.conclusion,
+                    solution_code=outcome.solution_code,
+                    solution_content=outcome.resolve_content(),
+                )
+        yield inference
+
+
+def _resolve_outcome(step: CompiledStep, status: float, work_order: WorkOrder, rule_set: RuleSet) -> Outcome:
+    """实时计算单条规则的结论（模拟数据与解决方案内容）"""
+    with metrics.timer(STEP_DURATION, "mock"):
+        if step.mock_type == "num":
+            content = mock_numerical_value(step.mock_name, status, work_order, rule_set)
         else:
-            content = mock_string_value(mock.name, status, work_order)
-
-        inference.conclusion = content.conclusion
-        inference.name = mock.name
-        inference.solution_code = content.solution
-        inference.solution_content = get_solution(content.solution)
-        inference.descriptions = replace_text_codes(work_order, rule.descriptions) 
-        inference.curr_rules = replace_rules(work_order, rule.curr_rules)
-        result.append(inference)
-    return result
+            content = mock_string_value(step.mock_name, status, work_order, rule_set)
+
+    with metrics.timer(STEP_DURATION, "solution"):
+        return make_outcome(content.conclusion, content.solution)
+
+
+def what_if(work_order: WorkOrder, rule_name, rule_set: RuleSet | None = None) -> List[WhatIfCell]:
+    """
+    遍历规则族全部有区别的 (rule_index, err_index) 组合，供假设分析界面使用。
+    每条规则的模板只渲染一次；需要实时计算的规则按 (规则, status) 只计算一次。
+    """
+    rule_set = rule_set or rule_registry.current
+    plan = get_rule_plan(rule_name, rule_set)
+    matrix = rule_set.matrices.get(rule_name)
+    if plan is None or matrix is None:
+        return []
+
+    rendered: dict[int, Inference] = {}
+    resolved: dict[tuple[int, float], Outcome] = {}
+    cells = []
+    for rule_index, err_index, cell in matrix.sweep():
+        data = []
+        for position, (step, outcome) in enumerate(zip(plan.steps_until(rule_index), cell)):
+            if outcome is None:
+                status = err_index if step.id == rule_index else 0
+                outcome = resolved.get((position, status))
+                if outcome is None:
+                    outcome = resolved[(position, status)] = _resolve_outcome(step, status, work_order, rule_set)
+            inference = rendered.get(position)
+            if inference is None:
+                inference = rendered[position] = step.render(work_order, "", "", "")
+            data.append(inference.model_copy(update={
+                "conclusion": outcome.conclusion,
+                "solution_code": outcome.solution_code,
+                "solution_content": outcome.resolve_content(),
+            }))
+        cells.append(WhatIfCell(rule_index=rule_index, err_index=err_index, data=data))
+    return cells
+
+
+async def aexec_what_if(
+    work_order_id: str, db: AsyncSession, rule_set: RuleSet | None = None
+) -> tuple[str | None, List[WhatIfCell]] | None:
+    """加载工单（及其网元的光功率数据）后执行 `what_if`，返回 (规则族, 结果)；工单不存在时返回 None"""
+    rule_set = rule_set or rule_registry.current
+    with metrics.timer(STEP_DURATION, "fetch"):
+        order = await aget_work_order(db, work_order_id)
+    if order is None:
+        return None
+    rule_name = get_rule_name(order)
+    readings = await aload_optical_power(db, [order], rule_set)
+    with optical_power_service.preloaded(readings):
+        return rule_name, what_if(order, rule_name, rule_set)
+
+
+# 批量诊断时 IN 查询的单批工单数
+BATCH_FETCH_SIZE = 500
+
+
+def _batch_fetch_stmts(items: List[DiagnosisBatchItem]):
+    work_order_ids = list(dict.fromkeys(item.work_order_id for item in items))
+    for start in range(0, len(work_order_ids), BATCH_FETCH_SIZE):
+        chunk = work_order_ids[start:start + BATCH_FETCH_SIZE]
+        yield select(WorkOrder).where(WorkOrder.work_order_id.in_(chunk))
+
+
+def _diagnose_batch(
+    items: List[DiagnosisBatchItem], orders: dict[str, WorkOrder], rule_set: RuleSet | None = None
+) -> List[DiagnosisBatchResult]:
+    """
+    对已加载的工单按规则族分组后逐条推理，单条失败不影响其他工单。
+    返回结果与 items 顺序一致。
+    """
+    rule_set = rule_set or rule_registry.current
+    results: List[DiagnosisBatchResult | None] = [None] * len(items)
+    groups: dict[str | None, list] = {}
+    for position, item in enumerate(items):
+        order = orders.get(item.work_order_id)
+        if order is None:
+            results[position] = DiagnosisBatchResult(
+                **item.model_dump(), success=False, error="未找到该工单"
+            )
+            continue
+        groups.setdefault(get_rule_name(order), []).append((position, item, order))
+
+    for rule_name, members in groups.items():
+        plan = get_rule_plan(rule_name, rule_set)
+        for position, item, order in members:
+            try:
+                data = _run_plan(plan, order, item.rule_index, item.err_index, rule_set) if plan is not None else []
+                results[position] = DiagnosisBatchResult(**item.model_dump(), success=True, data=data)
+            except Exception as e:
+                results[position] = DiagnosisBatchResult(**item.model_dump(), success=False, error=str(e))
+    return results
+
+
+def _optical_power_ne_names(orders: Iterable[WorkOrder], rule_set: RuleSet) -> List[str]:
+    """需要光功率数据（数值型 DT00008 规则）的工单所属网元"""
+    ne_names = []
+    for order in orders:
+        plan = get_rule_plan(get_rule_name(order), rule_set)
+        if plan is not None and any(step.mock_type == "num" and step.mock_name == OPTICAL_POWER_KEY for step in plan.steps):
+            ne_names.append(order.ne_name)
+    return ne_names
+
+
+def load_optical_power(db: Session, orders: Iterable[WorkOrder], rule_set: RuleSet):
+    """
+    一次查询加载这些工单推理所需的光功率读数，诊断须在 `optical_power_service.preloaded` 中使用，
+    规则不涉及光功率时不查询
+    """
+    return optical_power_service.load_readings(db, _optical_power_ne_names(orders, rule_set))
+
+
+async def aload_optical_power(db: AsyncSession, orders: Iterable[WorkOrder], rule_set: RuleSet):
+    """`load_optical_power` 的异步版本"""
+    return await optical_power_service.aload_readings(db, _optical_power_ne_names(orders, rule_set))
+
+
+def exec_batch(
+    items: List[DiagnosisBatchItem], db: Session, rule_set: RuleSet | None = None
+) -> List[DiagnosisBatchResult]:
+    """批量诊断：使用 IN 查询一次性加载全部工单及其网元的光功率数据，整批使用同一规则版本"""
+    rule_set = rule_set or rule_registry.current
+    orders: dict[str, WorkOrder] = {}
+    for stmt in _batch_fetch_stmts(items):
+        for order in db.execute(stmt).scalars():
+            orders[order.work_order_id] = order
+    readings = load_optical_power(db, orders.values(), rule_set)
+    return _diagnose_preloaded(items, orders, rule_set, readings)
+
+
+def _diagnose_preloaded(
+    items: List[DiagnosisBatchItem], orders: dict[str, WorkOrder], rule_set: RuleSet, readings: dict
+) -> List[DiagnosisBatchResult]:
+    """在预加载的光功率数据下执行 `_diagnose_batch`；在线程池中执行时同样生效"""
+    with optical_power_service.preloaded(readings):
+        return _diagnose_batch(items, orders, rule_set)
+
+
+async def aexec_batch(
+    items: List[DiagnosisBatchItem], db: AsyncSession, rule_set: RuleSet | None = None
+) -> List[DiagnosisBatchResult]:
+    """
+    `exec_batch` 的异步版本：工单与光功率数据在事件循环中异步查询，
+    推理为纯 CPU 计算，批量较大时耗时较长，放到线程池中执行以免阻塞其他请求
+    """
+    rule_set = rule_set or rule_registry.current
+    orders: dict[str, WorkOrder] = {}
+    for stmt in _batch_fetch_stmts(items):
+        for order in (await db.execute(stmt)).scalars():
+            orders[order.work_order_id] = order
+    readings = await aload_optical_power(db, orders.values(), rule_set)
+    return await run_in_threadpool(_diagnose_preloaded, items, orders, rule_set, readings)
 
 
 def get_solution(code: str) -> str:
     if not code.startswith("FA"):
         return code
-    
-    file_path = project_root / "files" / "solutions" / (code + ".md")
-    if not file_path.exists():
+
+    document = solution_store.get(code)
+    if document is None:
         return ""
-    with open(file_path, "r", encoding="utf-8") as file:
-        content = file.read()
-    return content
+    return document.content
 
 def replace_rules(work_order: WorkOrder, rules : List[str]) -> List[str]:
     replaced_rules = []
@@ -100,55 +334,282 @@ def replace_rules(work_order: WorkOrder, rules : List[str]) -> List[str]:
 def replace_text_codes(work_order: WorkOrder, text: str) -> str:
     """
     Replace placeholders in the description with values from the work order.
-    - Replaces DT prefixed placeholders (e.g., {DT00001}) with corresponding work_order attributes.
-    - Identifies JT prefixed placeholders for future use.
+    - Replaces GJ prefixed placeholders (e.g., GJ00008) with corresponding work_order attributes.
+    - Replaces JT prefixed placeholders with static data.
     """
+    return _compile_text(text).render(work_order)
 
-    placeholders = re.findall(pattern, text)
 
-    for placeholder in placeholders:
-        if placeholder.startswith("GJ"):
-            value = getattr(work_order, placeholder, f"{{{placeholder}}}")
-            text = text.replace(placeholder, str(value))    
+@lru_cache(maxsize=1024)
+def _compile_text(text: str) -> CompiledTemplate:
+    return compile_template(text, fetch_static_data)
 
-    for placeholder in placeholders:
-        if placeholder.startswith("JT"):
-            # Future implementation for JT prefixed placeholders
-            value = fetch_static_data(placeholder, "")
-            text = text.replace(placeholder, str(value))
+def _keyword_filter(keyword: str):
+    """
+    工单号关键字过滤。
+    PostgreSQL 的 LIKE '%kw%' 可直接使用 pg_trgm GIN 索引；
+    MySQL 先用 ngram 全文索引缩小范围，再用 LIKE 保证子串匹配语义。
+    """
+    condition = WorkOrder.work_order_id.contains(keyword)
+    if dialect_name == "mysql" and settings.keyword_fulltext and len(keyword) >= 2:
+        phrase = '"' + keyword.replace('"', " ") + '"'
+        condition = match(WorkOrder.work_order_id, against=phrase).in_boolean_mode() & condition
+    return condition
 
-    return text
 
-def get_work_orders(db: Session, skip: int = 0, limit: int = 10, keyword: str = ""):
+def _outage_filter(stmt, keyword: str | None):
+    """退服工单过滤，使用持久化的 is_outage 列"""
+    stmt = stmt.where(WorkOrder.is_outage)
+    if keyword is not None:
+        stmt = stmt.where(_keyword_filter(keyword))
+    return stmt
 
-    count_stmt = (
-        select(func.count())
-        .select_from(WorkOrder)
-        .where(WorkOrder.GJ00008.contains("退服"))
-    )
 
-    if keyword is not None:
-        count_stmt = count_stmt.where(WorkOrder.work_order_id.contains(keyword))
+def _work_order_count_stmt(keyword: str | None):
+    return _outage_filter(select(func.count()).select_from(WorkOrder), keyword)
+
+
+# 列表页精简视图（fields=summary）包含的字段
+WORK_ORDER_SUMMARY_FIELDS = ("work_order_id", "created_time", "GJ00008", "GJ00010", "GJ00014", "order_status")
+
+
+def resolve_fields(fields: str | None) -> tuple[str, ...] | None:
+    """
+    解析 fields 参数：逗号分隔的 WorkOrderDTO 字段名，或 summary 表示精简视图。
+    未指定时返回 None（查询完整 ORM 对象）；包含未知字段时抛出 ValueError。
+    work_order_id 总是包含在结果中。
+    """
+    if fields is None or not fields.strip():
+        return None
+    if fields.strip() == "summary":
+        return WORK_ORDER_SUMMARY_FIELDS
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in WorkOrderDTO.model_fields]
+    if unknown:
+        raise ValueError(f"未知字段: {','.join(unknown)}")
+    return tuple(dict.fromkeys(["work_order_id", *names]))
+
+
+def _select_work_orders(fields: tuple[str, ...] | None, extra: tuple[str, ...] = ()):
+    """按需选择列：未指定字段时查询 ORM 实体，否则只查询所需列（Core 行，不经过 identity map）"""
+    if fields is None:
+        return select(WorkOrder)
+    names = list(dict.fromkeys([*fields, *extra]))
+    columns = []
+    for name in names:
+        if name == "details":
+            columns += [WorkOrder.details_json, WorkOrder.details]
+        else:
+            columns.append(getattr(WorkOrder, name))
+    return select(*columns)
+
+
+def _to_items(rows, fields: tuple[str, ...] | None) -> list:
+    """ORM 模式直接返回实体，投影模式返回仅包含所请求字段的字典"""
+    if fields is None:
+        return list(rows)
+    items = []
+    for row in rows:
+        mapping = row._mapping
+        item = {}
+        for name in fields:
+            if name == "details":
+                item["details"] = mapping["details_json"] if mapping["details_json"] is not None else mapping["details"]
+            else:
+                item[name] = mapping[name]
+        items.append(item)
+    return items
+
+
+def _execute_items(result, fields: tuple[str, ...] | None):
+    return result.scalars().all() if fields is None else result.all()
 
-    total = db.execute(count_stmt).scalar()
+
+def _work_order_list_stmt(skip: int, limit: int, keyword: str | None, fields: tuple[str, ...] | None = None):
+    stmt = _outage_filter(_select_work_orders(fields), keyword)
+    return stmt.offset(skip).limit(limit)
+
+
+def get_work_orders(
+    db: Session, skip: int = 0, limit: int = 10, keyword: str = "", fields: tuple[str, ...] | None = None
+):
+
+    total = db.execute(_work_order_count_stmt(keyword)).scalar()
     if total is None:
         total = 0
 
-    stmt = select(WorkOrder).where(WorkOrder.GJ00008.contains("退服"))
-    if keyword is not None:
-        stmt = stmt.where(WorkOrder.work_order_id.contains(keyword))
-    stmt = stmt.offset(skip).limit(limit)
-    items = db.execute(stmt).scalars().all()
+    result = db.execute(_work_order_list_stmt(skip, limit, keyword, fields))
+    items = _to_items(_execute_items(result, fields), fields)
+    return total, items
+
+
+async def aget_work_orders(
+    db: AsyncSession, skip: int = 0, limit: int = 10, keyword: str = "", fields: tuple[str, ...] | None = None
+):
+    """`get_work_orders` 的异步版本"""
+
+    total = (await db.execute(_work_order_count_stmt(keyword))).scalar()
+    if total is None:
+        total = 0
+
+    result = await db.execute(_work_order_list_stmt(skip, limit, keyword, fields))
+    items = _to_items(_execute_items(result, fields), fields)
     return total, items
 
 
-# @tool(description="Fetch static data based on item name and status")
-def fetch_static_data(item_name: str, param: str):
+def encode_cursor(created_time: str, work_order_id: str) -> str:
+    """将 (created_time, work_order_id) 编码为不透明的游标字符串"""
+    raw = json.dumps([created_time, work_order_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
 
-    # 机房编码
-    if item_name == "JT00012":
-        return {"room_id": "002017032644148100001082", "room_name": "南头机房"}
 
-    # 站点编码
-    if item_name == "JT00013":
-        return {"station_id": "440106040010002750", "station_name": "南头站"}
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """解析游标字符串，格式不正确时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_time, work_order_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError("无效的分页游标") from e
+    if not isinstance(created_time, str) or not isinstance(work_order_id, str):
+        raise ValueError("无效的分页游标")
+    return created_time, work_order_id
+
+
+def _work_order_keyset_stmt(
+    limit: int, keyword: str | None, cursor: str | None, fields: tuple[str, ...] | None = None
+):
+    """
+    按 (created_time, work_order_id) 倒序的键集分页查询。
+    多取一条用于判断是否还有下一页。
+    """
+    stmt = _outage_filter(_select_work_orders(fields, extra=("created_time",)), keyword)
+    if cursor:
+        created_time, work_order_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                WorkOrder.created_time < created_time,
+                and_(WorkOrder.created_time == created_time, WorkOrder.work_order_id < work_order_id),
+            )
+        )
+    return stmt.order_by(WorkOrder.created_time.desc(), WorkOrder.work_order_id.desc()).limit(limit + 1)
+
+
+def _split_keyset_page(rows, limit: int, fields: tuple[str, ...] | None = None):
+    page = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit and page:
+        last = page[-1]
+        next_cursor = encode_cursor(last.created_time, last.work_order_id)
+    return _to_items(page, fields), next_cursor
+
+
+# 游标模式下总数的缓存：keyword -> (过期时间, 总数)
+_count_cache: dict[str | None, tuple[float, int]] = {}
+_COUNT_CACHE_MAX_ENTRIES = 256
+
+
+def _get_cached_count(keyword: str | None) -> int | None:
+    entry = _count_cache.get(keyword)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+
+def clear_count_cache() -> None:
+    """工单批量写入后调用，下次游标分页重新统计总数"""
+    _count_cache.clear()
+
+
+def _set_cached_count(keyword: str | None, total: int) -> None:
+    if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+        _count_cache.clear()
+    _count_cache[keyword] = (time.monotonic() + settings.work_order_count_ttl, total)
+
+
+def get_work_orders_by_cursor(
+    db: Session,
+    limit: int = 10,
+    keyword: str | None = None,
+    cursor: str | None = None,
+    with_total: bool = False,
+    fields: tuple[str, ...] | None = None,
+):
+    """
+    键集分页获取退服工单列表，每页代价与翻页深度无关。
+    返回 (total, items, next_cursor)；total 仅在 with_total 为 True 时返回，且按 TTL 缓存。
+    """
+    rows = _execute_items(db.execute(_work_order_keyset_stmt(limit, keyword, cursor, fields)), fields)
+    items, next_cursor = _split_keyset_page(rows, limit, fields)
+
+    total = None
+    if with_total:
+        total = _get_cached_count(keyword)
+        if total is None:
+            total = db.execute(_work_order_count_stmt(keyword)).scalar() or 0
+            _set_cached_count(keyword, total)
+    return total, items, next_cursor
+
+
+async def aget_work_orders_by_cursor(
+    db: AsyncSession,
+    limit: int = 10,
+    keyword: str | None = None,
+    cursor: str | None = None,
+    with_total: bool = False,
+    fields: tuple[str, ...] | None = None,
+):
+    """`get_work_orders_by_cursor` 的异步版本"""
+    rows = _execute_items(await db.execute(_work_order_keyset_stmt(limit, keyword, cursor, fields)), fields)
+    items, next_cursor = _split_keyset_page(rows, limit, fields)
+
+    total = None
+    if with_total:
+        total = _get_cached_count(keyword)
+        if total is None:
+            total = (await db.execute(_work_order_count_stmt(keyword))).scalar() or 0
+            _set_cached_count(keyword, total)
+    return total, items, next_cursor
+
+
+def get_work_order(db: Session, work_order_id: str) -> WorkOrder | None:
+    stmt = select(WorkOrder).where(WorkOrder.work_order_id == work_order_id)
+    return db.execute(stmt).scalar_one_or_none()
+
+
+async def aget_work_order(db: AsyncSession, work_order_id: str) -> WorkOrder | None:
+    """`get_work_order` 的异步版本"""
+    stmt = select(WorkOrder).where(WorkOrder.work_order_id == work_order_id)
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+
+def backfill_details_json(db: Session, batch_size: int = 1000, only_missing: bool = True) -> int:
+    """
+    为已有工单回填 details_json，按 work_order_id 顺序分批处理。
+    返回写入的工单数。
+    """
+    updated = 0
+    last_id = ""
+    update_stmt = (
+        update(WorkOrder.__table__)
+        .where(WorkOrder.__table__.c.work_order_id == bindparam("b_id"))
+        .values(details_json=bindparam("b_details_json"))
+    )
+    while True:
+        stmt = select(WorkOrder.work_order_id, WorkOrder.details).where(WorkOrder.work_order_id > last_id)
+        if only_missing:
+            stmt = stmt.where(WorkOrder.details_json.is_(None))
+        rows = db.execute(stmt.order_by(WorkOrder.work_order_id).limit(batch_size)).all()
+        if not rows:
+            break
+        last_id = rows[-1].work_order_id
+
+        params = []
+        for row in rows:
+            parsed = parse_details(row.details)
+            if isinstance(parsed, dict):
+                params.append({"b_id": row.work_order_id, "b_details_json": parsed})
+        if params:
+            db.execute(update_stmt, params)
+            db.commit()
+            updated += len(params)
+    return updated
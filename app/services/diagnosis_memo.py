@@ -0,0 +1,127 @@
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from .. import metrics
+from ..cache import MemoryCache
+from ..config import settings
+from ..models import WorkOrder
+from ..schemas import Inference
+from .rule_compiler import RulePlan
+from .rule_registry import RuleSet
+from .solution_store import SolutionDocument, solution_store
+
+# 参与工单修订号计算的列：全部列。details / details_json 虽未被现有规则引用，
+# 但模板可按列名取值，排除后外部只修改这些列时会命中旧结果；摘要计算的开销与工单大小成正比，可以接受
+REVISION_FIELDS = tuple(c.name for c in WorkOrder.__table__.columns)
+
+
+def work_order_revision(work_order: WorkOrder) -> str:
+    """工单修订号：相关字段内容的摘要，工单被修改后自然变化"""
+    raw = "\x1f".join(str(getattr(work_order, name, "")) for name in REVISION_FIELDS)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class DiagnosisMemo:
+    """
+    进程内的诊断结果缓存（LRU + TTL）。
+
+    键由工单号、规则族、rule_index、err_index、规则内容摘要、工单修订号与该网元光功率数据的代数组成：
+    - 规则热加载或工单内容变化后，键随之变化，旧结果不再命中并按 LRU 淘汰；
+    - 光功率数据变化时调用 `invalidate_ne` 为该网元分配新的代数（全进程递增，不会重复使用）；
+    - 命中时检查引用的解决方案文档是否仍为同一版本，文档更新后视为未命中。
+    光功率数据由其他进程（如命令行导入）修改时，本进程只能依靠 TTL 过期。
+
+    网元代数记录在最后一次失效后保留 ttl 秒：此前以旧代数缓存的结果届时均已过期，
+    删除记录（回到代数 0）不会再命中旧结果；保留的记录仍超过 max_entries 时清空全部结果。
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+        self._entries = MemoryCache(max_entries=max_entries)
+        # 网元 -> (代数, 失效时刻)，按失效时刻排序
+        self._ne_generations: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._generation_counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def generation(self, ne_name: str) -> int:
+        record = self._ne_generations.get(ne_name)
+        return record[0] if record is not None else 0
+
+    def key(self, plan: RulePlan, work_order: WorkOrder, rule_index: int, err_index: float, rule_set: RuleSet) -> str:
+        generation = self.generation(work_order.ne_name)
+        return (
+            f"{work_order.work_order_id}:{plan.name}:{plan.clamp_index(rule_index)}:{err_index}:"
+            f"{rule_set.digest[:16]}:{work_order_revision(work_order)}:{generation}"
+        )
+
+    def get(self, key: str) -> Optional[List[Inference]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            inferences, solutions = entry
+            if all(solution_store.get(code) is document for code, document in solutions):
+                self.hits += 1
+                metrics.record_cache("diagnosis_memo", True)
+                return list(inferences)
+            self._entries.delete(key)
+            self.stale += 1
+        self.misses += 1
+        metrics.record_cache("diagnosis_memo", False)
+        return None
+
+    def set(self, key: str, inferences: List[Inference]) -> None:
+        codes = dict.fromkeys(item.solution_code for item in inferences if item.solution_code.startswith("FA"))
+        solutions: Tuple[Tuple[str, Optional[SolutionDocument]], ...] = tuple(
+            (code, solution_store.get(code)) for code in codes
+        )
+        self._entries.set(key, (tuple(inferences), solutions), self.ttl)
+
+    def invalidate_work_order(self, work_order_id: str) -> None:
+        self._entries.delete_prefix(f"{work_order_id}:")
+        self.invalidations += 1
+
+    def invalidate_ne(self, ne_names: Iterable[str]) -> None:
+        """网元光功率数据变化后调用：该网元下全部工单的结果失效"""
+        now = time.monotonic()
+        with self._lock:
+            for ne_name in ne_names:
+                self._ne_generations[ne_name] = (next(self._generation_counter), now)
+                self._ne_generations.move_to_end(ne_name)
+                self.invalidations += 1
+            while self._ne_generations:
+                ne_name, (_, invalidated_at) = next(iter(self._ne_generations.items()))
+                if invalidated_at + self.ttl > now:
+                    break
+                del self._ne_generations[ne_name]
+            if len(self._ne_generations) > self._entries.max_entries:
+                self._entries.clear()
+                self._ne_generations.clear()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        with self._lock:
+            self._ne_generations.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": settings.diagnosis_memo_enabled,
+            "entries": len(self._entries),
+            "max_entries": self._entries.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+            "stale": self.stale,
+            "invalidations": self.invalidations,
+        }
+
+
+diagnosis_memo = DiagnosisMemo(settings.diagnosis_memo_max_entries, settings.diagnosis_memo_ttl)
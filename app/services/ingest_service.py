@@ -0,0 +1,290 @@
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import IO, Dict, Iterable, Iterator, List, Literal, Optional
+
+from sqlalchemy import Engine, column, delete, insert, select, table, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ..models import OpticalPower, WorkOrder
+from ..schemas import parse_details
+from . import cache_service, data_service
+from .diagnosis_memo import diagnosis_memo
+
+IngestFormat = Literal["csv", "jsonl"]
+
+# 单批写入的行数，内存占用与批大小成正比
+DEFAULT_BATCH_SIZE = 5000
+
+# 可写入的列（is_outage / rule_family 为数据库生成列，写入时自动计算）
+WORK_ORDER_COLUMNS = [c.name for c in WorkOrder.__table__.columns if c.computed is None]
+OPTICAL_POWER_COLUMNS = [c.name for c in OpticalPower.__table__.columns if c.name != "id"]
+
+# PostgreSQL COPY 使用的临时表，事务提交后自动清空
+_PG_STAGING_TABLE = "_ingest_work_order"
+
+
+@dataclass
+class IngestResult:
+    table: str
+    rows: int = 0
+    skipped: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    # 光功率导入涉及的网元
+    ne_names: set[str] = field(default_factory=set)
+
+    @property
+    def rows_per_second(self) -> float:
+        return round(self.rows / self.seconds, 1) if self.seconds else 0.0
+
+
+def detect_format(filename: str) -> IngestFormat:
+    """按扩展名判断格式：.csv 为 CSV，其余（.jsonl / .ndjson）为 JSON Lines"""
+    return "csv" if filename.lower().endswith(".csv") else "jsonl"
+
+
+def iter_records(stream: IO[bytes], fmt: IngestFormat) -> Iterator[dict]:
+    """
+    逐行读取 CSV（首行为列名）或 JSON Lines，不将整个文件读入内存。
+    JSON Lines 中不是对象的行（如数组、字符串）抛出 ValueError。
+    """
+    reader = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        yield from csv.DictReader(reader)
+        return
+    for number, line in enumerate(reader, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError(f"第 {number} 行不是 JSON 对象")
+        yield record
+
+
+def _batched(records: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(records)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _text(value) -> str:
+    """非空列缺失时写入空串，与现有数据保持一致"""
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def prepare_work_order(record: dict) -> Optional[dict]:
+    """
+    规整单条工单：只保留表中的列，并在写入前解析 details 生成 details_json。
+    缺少工单号的记录返回 None。
+    """
+    work_order_id = _text(record.get("work_order_id")).strip()
+    if not work_order_id:
+        return None
+    row = {name: _text(record.get(name)) for name in WORK_ORDER_COLUMNS if name != "details_json"}
+    row["work_order_id"] = work_order_id
+    parsed = parse_details(row["details"])
+    row["details_json"] = parsed if isinstance(parsed, dict) else None
+    return row
+
+
+def prepare_optical_power(record: dict) -> Optional[dict]:
+    ne_name = _text(record.get("ne_name")).strip()
+    if not ne_name:
+        return None
+    row = {name: _text(record.get(name)) for name in OPTICAL_POWER_COLUMNS}
+    row["ne_name"] = ne_name
+    return row
+
+
+def _upsert_stmt(dialect: str):
+    """按方言生成以 work_order_id 为键的 upsert 语句"""
+    table_ = WorkOrder.__table__
+    updates = [name for name in WORK_ORDER_COLUMNS if name != "work_order_id"]
+    if dialect == "mysql":
+        stmt = mysql_insert(table_)
+        return stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in updates})
+    if dialect == "postgresql":
+        stmt = pg_insert(table_)
+        return stmt.on_conflict_do_update(
+            index_elements=["work_order_id"], set_={name: stmt.excluded[name] for name in updates}
+        )
+    stmt = sqlite_insert(table_)
+    return stmt.on_conflict_do_update(
+        index_elements=["work_order_id"], set_={name: stmt.excluded[name] for name in updates}
+    )
+
+
+def _copy_upsert(conn, rows: List[dict]) -> None:
+    """
+    PostgreSQL（psycopg）：COPY 写入临时表，再一条 INSERT ... SELECT ... ON CONFLICT 合并到 work_order。
+    比逐行 INSERT 快一个数量级。
+    """
+    conn.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {_PG_STAGING_TABLE} "
+        f"(LIKE work_order INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    ))
+    preparer = conn.dialect.identifier_preparer
+    columns = ", ".join(preparer.quote(name) for name in WORK_ORDER_COLUMNS)
+    raw = conn.connection.driver_connection
+    with raw.cursor() as cursor:
+        with cursor.copy(f"COPY {_PG_STAGING_TABLE} ({columns}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row([
+                    json.dumps(row[name], ensure_ascii=False) if name == "details_json" and row[name] is not None
+                    else row[name]
+                    for name in WORK_ORDER_COLUMNS
+                ])
+    staging = table(_PG_STAGING_TABLE, *[column(name) for name in WORK_ORDER_COLUMNS])
+    stmt = pg_insert(WorkOrder.__table__).from_select(WORK_ORDER_COLUMNS, select(staging))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["work_order_id"],
+        set_={name: stmt.excluded[name] for name in WORK_ORDER_COLUMNS if name != "work_order_id"},
+    )
+    conn.execute(stmt)
+
+
+def _uses_copy(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg"
+
+
+def ingest_work_orders(
+    engine: Engine, records: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE,
+    result: Optional[IngestResult] = None,
+) -> IngestResult:
+    """
+    按批写入工单，已存在的工单号整行更新：
+    - PostgreSQL：COPY + INSERT ... ON CONFLICT；
+    - MySQL：多行 INSERT ... ON DUPLICATE KEY UPDATE；
+    - SQLite：INSERT ... ON CONFLICT（测试与基准）。
+    每批单独提交，失败时已提交的批次保留，其统计累加在调用方传入的 result 中。
+    """
+    result = result if result is not None else IngestResult(table="work_order")
+    started = time.perf_counter()
+    dialect = engine.dialect.name
+    for batch in _batched(records, batch_size):
+        # 同一批内重复的工单号以最后一条为准，避免 ON CONFLICT 同一行更新两次
+        rows: Dict[str, dict] = {}
+        for record in batch:
+            row = prepare_work_order(record)
+            if row is None:
+                result.skipped += 1
+                continue
+            rows[row["work_order_id"]] = row
+        if not rows:
+            continue
+        with engine.begin() as conn:
+            if _uses_copy(engine):
+                _copy_upsert(conn, list(rows.values()))
+            elif dialect == "mysql":
+                # 多行 VALUES 单条语句
+                conn.execute(_upsert_stmt(dialect).values(list(rows.values())))
+            else:
+                conn.execute(_upsert_stmt(dialect), list(rows.values()))
+        result.rows += len(rows)
+        result.batches += 1
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _copy_insert_optical_power(conn, rows: List[dict]) -> None:
+    preparer = conn.dialect.identifier_preparer
+    columns = ", ".join(preparer.quote(name) for name in OPTICAL_POWER_COLUMNS)
+    raw = conn.connection.driver_connection
+    with raw.cursor() as cursor:
+        with cursor.copy(f"COPY optical_power ({columns}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row([row[name] for name in OPTICAL_POWER_COLUMNS])
+
+
+def ingest_optical_power(
+    engine: Engine, records: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE, replace: bool = True,
+    result: Optional[IngestResult] = None,
+) -> IngestResult:
+    """
+    按批写入光功率读数。replace 为 True 时，本次导入中首次出现的网元会先删除其旧读数，
+    即以本次导出为准整体替换每个网元的读数。与工单导入一样每批单独提交。
+    """
+    result = result if result is not None else IngestResult(table="optical_power")
+    started = time.perf_counter()
+    replaced: set[str] = set()
+    for batch in _batched(records, batch_size):
+        rows = []
+        for record in batch:
+            row = prepare_optical_power(record)
+            if row is None:
+                result.skipped += 1
+                continue
+            rows.append(row)
+        if not rows:
+            continue
+        with engine.begin() as conn:
+            result.ne_names.update(row["ne_name"] for row in rows)
+            if replace:
+                fresh = list({row["ne_name"] for row in rows} - replaced)
+                for start in range(0, len(fresh), 1000):
+                    conn.execute(delete(OpticalPower).where(OpticalPower.ne_name.in_(fresh[start:start + 1000])))
+                replaced.update(fresh)
+            if _uses_copy(engine):
+                _copy_insert_optical_power(conn, rows)
+            elif engine.dialect.name == "mysql":
+                conn.execute(insert(OpticalPower).values(rows))
+            else:
+                conn.execute(insert(OpticalPower), rows)
+        result.rows += len(rows)
+        result.batches += 1
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
+
+
+INGESTERS = {
+    "work-orders": ingest_work_orders,
+    "optical-power": ingest_optical_power,
+}
+
+INGEST_TABLES = {
+    "work-orders": WorkOrder.__tablename__,
+    "optical-power": OpticalPower.__tablename__,
+}
+
+
+def new_result(kind: str) -> IngestResult:
+    """按导入类型创建空的统计，传给 `ingest_file` 后逐批累加"""
+    if kind not in INGEST_TABLES:
+        raise ValueError(f"不支持的导入类型: {kind}")
+    return IngestResult(table=INGEST_TABLES[kind])
+
+
+def ingest_file(engine: Engine, kind: str, stream: IO[bytes], fmt: IngestFormat,
+                batch_size: int = DEFAULT_BATCH_SIZE, result: Optional[IngestResult] = None) -> IngestResult:
+    """
+    按类型（work-orders / optical-power）导入文件流。
+    调用方传入 result（见 `new_result`）时，导入中途失败也能从中得到已提交批次的统计，
+    据此调用 `after_ingest` 清除缓存。
+    """
+    ingester = INGESTERS.get(kind)
+    if ingester is None:
+        raise ValueError(f"不支持的导入类型: {kind}")
+    return ingester(engine, iter_records(stream, fmt), batch_size=batch_size, result=result)
+
+
+async def after_ingest(result: IngestResult) -> None:
+    """
+    导入结束（包括中途失败、已有批次提交）后清除受影响的缓存：工单变化清除工单相关缓存，光功率变化清除诊断结果。
+    进程内诊断结果缓存按工单修订号区分，工单变化无需处理；光功率变化使涉及网元的结果失效。
+    """
+    if result.rows == 0:
+        return
+    if result.table == "work_order":
+        data_service.clear_count_cache()
+        await cache_service.invalidate_all_work_orders()
+    else:
+        diagnosis_memo.invalidate_ne(result.ne_names)
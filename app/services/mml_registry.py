@@ -0,0 +1,114 @@
+from typing import Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..schemas import MmlContent, MmlNumSetting, MmlStrSetting
+
+# 光功率：唯一依赖工单（网元光功率数据）的数值型配置，由 optical_power_service 判定
+OPTICAL_POWER_KEY = "DT00008"
+
+# 规则通过（status 为 0）时的结果
+PASSED_CONTENT = MmlContent(id=1, conclusion="", solution="")
+# 未找到配置或配置内容为空时的结果
+UNSET_CONTENT = MmlContent(id=1, conclusion="", solution="模拟数据未设置")
+
+# 数值型配置判定为异常时的结论前缀
+OUT_OF_RANGE_CONCLUSION = "数值超出范围"
+
+
+def range_violations(
+    values: Union[float, Sequence[float], np.ndarray], low: Optional[float] = None, high: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    对单个读数或一组读数一次完成阈值比较，返回 (读数数组, 低于 low 的掩码, 高于 high 的掩码)。
+    未给出的界限不做比较；NaN（无法解析的读数）参与比较结果为 False，不会判定为越限。
+    """
+    readings = np.atleast_1d(np.asarray(values, dtype=np.float64))
+    below = readings < low if low is not None else np.zeros(readings.shape, dtype=bool)
+    above = readings > high if high is not None else np.zeros(readings.shape, dtype=bool)
+    return readings, below, above
+
+
+def evaluate_numeric(
+    values: Union[float, Sequence[float], np.ndarray], setting: MmlNumSetting, labels: Optional[Sequence[str]] = None
+) -> MmlContent:
+    """
+    按 MML 数值配置判定单个读数或一组读数：任一读数低于 low 或高于 high 时判定为异常（err），
+    否则为正常（normal）。labels 与读数一一对应，用于在结论中标明越限的读数。
+    """
+    readings, below, above = range_violations(values, setting.low, setting.high)
+    hits = np.flatnonzero(below | above)
+    if hits.size == 0:
+        return MmlContent(id=1, conclusion="", solution=setting.normal)
+
+    messages = []
+    for index in hits.tolist():
+        label = labels[index] if labels is not None else ""
+        value = float(readings[index])
+        if below[index]:
+            messages.append(f"{label}{value:g} 低于下限 {setting.low}")
+        else:
+            messages.append(f"{label}{value:g} 高于上限 {setting.high}")
+    conclusion = OUT_OF_RANGE_CONCLUSION + "(" + ",".join(messages) + ")"
+    return MmlContent(id=1, conclusion=conclusion, solution=setting.err)
+
+
+# 数值型模拟读数的 status 取值：1 为低于下限，2 及以上为高于上限
+MOCK_STATUSES = (1, 2)
+
+
+def mock_reading(setting: MmlNumSetting, status: float) -> float:
+    """
+    模拟读数：status 为 0 时取区间中点；小于 2 时取刚好低于下限的值，
+    否则取刚好高于上限的值（与结论矩阵按 MOCK_STATUSES 截断 err_index 一致）
+    """
+    if status == 0:
+        return (setting.low + setting.high) / 2
+    if status < 2:
+        return setting.low - 1
+    return setting.high + 1
+
+
+class MmlRegistry:
+    """
+    按 DT 编号索引的 MML 配置，随 RuleSet 一起构建、创建后不再修改。
+    同名配置以首次出现的为准，与原先线性查找的行为一致；
+    字符串型配置的内容预先整理为元组，按 status 直接取值。
+    """
+
+    def __init__(self, mml_num: Iterable[MmlNumSetting] = (), mml_str: Iterable[MmlStrSetting] = ()):
+        self._num: Dict[str, MmlNumSetting] = {}
+        for setting in mml_num:
+            self._num.setdefault(setting.key, setting)
+        self._contents: Dict[str, Tuple[MmlContent, ...]] = {}
+        for setting in mml_str:
+            self._contents.setdefault(setting.key, tuple(setting.contents))
+
+    def __len__(self) -> int:
+        return len(self._num) + len(self._contents)
+
+    def num_setting(self, key: str) -> Optional[MmlNumSetting]:
+        return self._num.get(key)
+
+    def contents(self, key: str) -> Tuple[MmlContent, ...]:
+        """字符串型配置的全部内容，未配置时为空元组"""
+        return self._contents.get(key, ())
+
+    def content(self, key: str, status: float) -> MmlContent:
+        """
+        字符串型配置在 status 下的内容：0 表示通过；
+        其余按 1..n 取第 status 条，超出范围的截断到首条或末条。
+        """
+        if status == 0:
+            return PASSED_CONTENT
+        contents = self._contents.get(key)
+        if not contents:
+            return UNSET_CONTENT
+        return contents[int(min(max(status, 1), len(contents))) - 1]
+
+    def numeric(self, key: str, status: float) -> MmlContent:
+        """与工单无关的数值型配置：按 status 生成模拟读数并判定"""
+        setting = self._num.get(key)
+        if setting is None:
+            return UNSET_CONTENT
+        return evaluate_numeric(mock_reading(setting, status), setting)
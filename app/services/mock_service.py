@@ -1,10 +1,12 @@
-from langchain.tools import tool
 from typing import List
 from sqlalchemy import select, func  # 👈 别忘了导入 func
 from ..schemas import MmlContent
-from ..config import settings
-from ..models import WorkOrder, OpticalPower
-from ..database import get_db
+from ..models import WorkOrder
+from .mml_registry import OPTICAL_POWER_KEY, UNSET_CONTENT
+from .optical_power_service import evaluate_optical_power, get_preloaded
+from .rule_registry import RuleSet, rule_registry
+from .. import metrics
+from ..metrics import STEP_DURATION
 
 from pathlib import Path
 
@@ -13,108 +15,46 @@ current_file = Path(__file__).resolve()
 project_root = current_file.parent.parent
 
 # @tool(description="mock numerical data based on item name and status")
-def mock_numerical_value(item_name: str, status: float, work_order : WorkOrder) -> MmlContent:
+def mock_numerical_value(
+    item_name: str, status: float, work_order : WorkOrder, rule_set: RuleSet | None = None
+) -> MmlContent:
     """
     模拟数字数据
     """
-    
-    if item_name == "DT00008":
-        return _get_optical_power(work_order, status)
+    rule_set = rule_set or rule_registry.current
 
-    items = next(
-        setting for setting in settings.mml_num_list if setting.key == item_name
-    )
-    if len(items) == 0:
-        return None
-    item = items[0]
+    if item_name == OPTICAL_POWER_KEY:
+        return _get_optical_power(work_order, status, rule_set)
 
-
-    
+    return rule_set.mml.numeric(item_name, status)
 
 
 # @tool(description="Generate string data based on item name and status")
-def mock_string_value(item_name: str, status: int, work_order : WorkOrder) -> MmlContent:
+def mock_string_value(
+    item_name: str, status: int, work_order : WorkOrder, rule_set: RuleSet | None = None
+) -> MmlContent:
     """
     模拟字符串
     """
-    try:
-        if status == 0:
-            return MmlContent(id=1, conclusion="", solution="")
-    except Exception as e:
-        return MmlContent(id=1, conclusion="", solution="模拟数据异常：" + str(e))
-
-    item = next(
-        setting for setting in settings.mml_str_list if setting.key == item_name
-    )
-
-    if item is None or len(item.contents) == 0:
-        return MmlContent(id=1, value="", solution="模拟数据未设置")
-
-    contents = item.contents
-
-    if status > len(contents):
-        status = len(contents)
-
-    if status < 1:
-        status = 1
-    return contents[status - 1]
+    return (rule_set or rule_registry.current).mml.content(item_name, status)
 
 
-def _get_optical_power(work_order: WorkOrder, status : float) -> MmlContent:
+def _get_optical_power(work_order: WorkOrder, status : float, rule_set: RuleSet) -> MmlContent:
     """
     获取光模块的光功率值
     """
 
     if status == -1:
         return MmlContent(id=1, conclusion="", solution="")
-    db = get_db()
-    stmt = select(OpticalPower).where(OpticalPower.ne_name == work_order.ne_name)
-    result = db.execute(stmt).scalar()
-    
-    # if the return value is None, then use the default rules
-    if result is None or len(result) == 0:
-        solution = "FA00001"
-        value = "光模块、尾纤、传输故障"
-        if status == 0:
-            solution = "FA00007"
-            value = "RRU端故障"
-        return MmlContent(id=1, conclusion=value, solution=solution)
-    
-    hit = False
-    input_theshold = -1400
-    output_threshold = -800
 
-    messages = List[str]()
-    
-    # loop through all the items to find if any value is out of normal range
-    for item in result:
-        input_power = item.input_power
-        output_power = item.output_power
+    setting = rule_set.mml.num_setting(OPTICAL_POWER_KEY)
+    if setting is None:
+        return UNSET_CONTENT
 
-        if input_power is not None:
-            try:
-                val = float(input_power)
-                if val < input_theshold:
-                    messages.append(item.port + item.board_name + item.slot_id  + "> 输入光功率过低" + str(val) + "dBm")
-            except:
-                pass
+    with metrics.timer(STEP_DURATION, "optical_power"):
+        # 读数由调用方随工单一起加载（见 data_service.load_optical_power），推理过程中不访问数据库
+        found, readings = get_preloaded(work_order.ne_name)
+        if not found:
+            raise RuntimeError("光功率数据未预加载，请在 optical_power_service.preloaded 中执行诊断")
 
-        
-        if output_power is not None:
-            try:
-                val = float(output_power)
-                if val < output_threshold:
-                    messages.append(item.port + item.board_name + item.slot_id  + "> 输出光功率过低" + str(val) + "dBm")
-            except:
-                pass
-        
-    if len(messages) > 0:
-        solution = "FA00001"
-        value = "光模块、尾纤、传输故障"
-        value += "(" + ",".join(messages) + ")"
-        return MmlContent(id=1, conclusion=value, solution=solution)
-    else:
-        solution = "FA00007"
-        value = "RRU端故障"
-        return MmlContent(id=1, conclusion=value, solution=solution)
-        
\ No newline at end of file
+        return evaluate_optical_power(readings, status, setting)
@@ -0,0 +1,166 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models import OpticalPower
+from ..schemas import MmlContent, MmlNumSetting
+from .mml_registry import range_violations
+
+# IN 查询的单批网元数
+FETCH_CHUNK_SIZE = 500
+
+# 光功率无数据或全部正常/异常时的结论
+ERR_CONCLUSION = "光模块、尾纤、传输故障"
+NORMAL_CONCLUSION = "RRU端故障"
+
+
+@dataclass(frozen=True, slots=True)
+class OpticalPowerReadings:
+    """单个网元全部端口的光功率读数，功率值已解析为 float 数组（无法解析的为 NaN）"""
+    ne_name: str
+    ports: List[str]
+    board_names: List[str]
+    slot_ids: List[str]
+    input_power: np.ndarray
+    output_power: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ports)
+
+    def label(self, index: int) -> str:
+        return (self.ports[index] or "") + (self.board_names[index] or "") + (self.slot_ids[index] or "")
+
+
+# 批量诊断时预加载的读数：ne_name -> OpticalPowerReadings
+_preloaded: ContextVar[Optional[Dict[str, OpticalPowerReadings]]] = ContextVar("optical_power_preloaded", default=None)
+
+
+def parse_power(values: Sequence[Optional[str]]) -> np.ndarray:
+    """
+    将字符串形式的光功率解析为 float64 数组。
+    优先整体转换；存在无法解析的值时逐个回退，无法解析的记为 NaN。
+    """
+    cleaned = ["nan" if value is None or value == "" else value for value in values]
+    try:
+        return np.asarray(cleaned, dtype=np.float64)
+    except ValueError:
+        return np.fromiter((_to_float(value) for value in cleaned), dtype=np.float64, count=len(cleaned))
+
+
+def _to_float(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _stmt(ne_names: List[str]):
+    return (
+        select(
+            OpticalPower.ne_name,
+            OpticalPower.port,
+            OpticalPower.board_name,
+            OpticalPower.slot_id,
+            OpticalPower.input_power,
+            OpticalPower.output_power,
+        )
+        .where(OpticalPower.ne_name.in_(ne_names))
+        .order_by(OpticalPower.ne_name, OpticalPower.id)
+    )
+
+
+def _chunks(ne_names: Iterable[str]) -> Iterator[List[str]]:
+    unique = list(dict.fromkeys(name for name in ne_names if name))
+    for start in range(0, len(unique), FETCH_CHUNK_SIZE):
+        yield unique[start:start + FETCH_CHUNK_SIZE]
+
+
+def _build(rows) -> Dict[str, OpticalPowerReadings]:
+    grouped: Dict[str, list] = {}
+    for row in rows:
+        grouped.setdefault(row.ne_name, []).append(row)
+    readings = {}
+    for ne_name, items in grouped.items():
+        readings[ne_name] = OpticalPowerReadings(
+            ne_name=ne_name,
+            ports=[item.port for item in items],
+            board_names=[item.board_name for item in items],
+            slot_ids=[item.slot_id for item in items],
+            input_power=parse_power([item.input_power for item in items]),
+            output_power=parse_power([item.output_power for item in items]),
+        )
+    return readings
+
+
+def load_readings(db: Session, ne_names: Iterable[str]) -> Dict[str, OpticalPowerReadings]:
+    """一次查询加载多个网元的光功率读数（按批次 IN 查询）"""
+    readings: Dict[str, OpticalPowerReadings] = {}
+    for chunk in _chunks(ne_names):
+        readings.update(_build(db.execute(_stmt(chunk)).all()))
+    return readings
+
+
+async def aload_readings(db: AsyncSession, ne_names: Iterable[str]) -> Dict[str, OpticalPowerReadings]:
+    """`load_readings` 的异步版本"""
+    readings: Dict[str, OpticalPowerReadings] = {}
+    for chunk in _chunks(ne_names):
+        readings.update(_build((await db.execute(_stmt(chunk))).all()))
+    return readings
+
+
+@contextmanager
+def preloaded(readings: Dict[str, OpticalPowerReadings]):
+    """在当前上下文中使用预加载的读数，避免逐工单查询"""
+    token = _preloaded.set(readings)
+    try:
+        yield
+    finally:
+        _preloaded.reset(token)
+
+
+def get_preloaded(ne_name: str) -> tuple[bool, Optional[OpticalPowerReadings]]:
+    """返回 (是否已预加载, 读数)；已预加载但无数据时读数为 None"""
+    readings = _preloaded.get()
+    if readings is None:
+        return False, None
+    return True, readings.get(ne_name)
+
+
+def evaluate_optical_power(
+    readings: Optional[OpticalPowerReadings], status: float, setting: MmlNumSetting
+) -> MmlContent:
+    """
+    按 MML 数值配置判定光功率：
+    接收（输入）光功率 < low，或发送（输出）光功率 < high，判定为光模块、尾纤、传输故障（err），
+    否则判定为 RRU 端故障（normal）。
+
+    DT00008 的 low / high 不是同一读数的上下限，而是输入、输出两路光功率各自的下限
+    （mml_num.json 沿用了通用字段名），因此不能直接套用 `evaluate_numeric` 的区间判定；
+    两路读数分别通过同一个 `range_violations` 做整组比较，结论按端口列出过低的一路。
+    """
+    if readings is None or len(readings) == 0:
+        if status == 0:
+            return MmlContent(id=1, conclusion=NORMAL_CONCLUSION, solution=setting.normal)
+        return MmlContent(id=1, conclusion=ERR_CONCLUSION, solution=setting.err)
+
+    _, input_low, _ = range_violations(readings.input_power, low=setting.low)
+    _, output_low, _ = range_violations(readings.output_power, low=setting.high)
+    hits = np.flatnonzero(input_low | output_low)
+    if hits.size == 0:
+        return MmlContent(id=1, conclusion=NORMAL_CONCLUSION, solution=setting.normal)
+
+    messages = []
+    for index in hits.tolist():
+        label = readings.label(index)
+        if input_low[index]:
+            messages.append(label + "> 输入光功率过低" + str(float(readings.input_power[index])) + "dBm")
+        if output_low[index]:
+            messages.append(label + "> 输出光功率过低" + str(float(readings.output_power[index])) + "dBm")
+    conclusion = ERR_CONCLUSION + "(" + ",".join(messages) + ")"
+    return MmlContent(id=1, conclusion=conclusion, solution=setting.err)
@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .mml_registry import MOCK_STATUSES, OPTICAL_POWER_KEY, MmlRegistry
+from .rule_compiler import RulePlan
+from .solution_store import SolutionDocument, solution_store
+
+
+@dataclass(frozen=True, slots=True)
+class Outcome:
+    """
+    单条规则在某一 status 下的结论与解决方案，与工单无关。
+    解决方案内容在构建时读取；文档热更新后 `resolve_content` 返回新内容。
+    """
+    conclusion: str
+    solution_code: str
+    solution_content: str
+    document: Optional[SolutionDocument]
+
+    def resolve_content(self) -> str:
+        """与 `data_service.get_solution` 等价：非 FA 编号原样返回，文档不存在时为空"""
+        if not self.solution_code.startswith("FA"):
+            return self.solution_content
+        document = solution_store.get(self.solution_code)
+        if document is self.document:
+            return self.solution_content
+        return "" if document is None else document.content
+
+
+# 一行中的各条规则结论，None 表示依赖工单数据（如 DT00008 光功率），需在诊断时实时计算
+Cell = Tuple[Optional[Outcome], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class OutcomeMatrix:
+    """
+    一个规则族全部 (rule_index, err_index) 组合的推理结论，规则加载时预先计算。
+    - 行为 rule_index（1..规则数）；列为 err_index，0 表示该规则通过，
+      1..width 对应 MML 配置的各条内容，超出范围的 err_index 按 `MmlRegistry.content` 的规则截断；
+    - 数值型规则的列为 MOCK_STATUSES（低于下限、高于上限）；实时计算的规则宽度记为 1，结论始终为 None。
+    """
+    name: str
+    widths: Tuple[int, ...]
+    cells: Dict[Tuple[int, int], Cell]
+
+    def column(self, rule_index: int, err_index: float) -> Optional[int]:
+        """
+        err_index 对应的列；非整数（含 NaN、inf）或 rule_index 不在矩阵范围内（如规则族没有规则）时
+        返回 None，由调用方按原逻辑实时计算
+        """
+        if not float(err_index).is_integer() or not 1 <= rule_index <= len(self.widths):
+            return None
+        if err_index == 0:
+            return 0
+        return min(max(int(err_index), 1), self.widths[rule_index - 1])
+
+    def lookup(self, rule_index: int, err_index: float) -> Optional[Cell]:
+        """rule_index 须已按 RulePlan.clamp_index 截断"""
+        column = self.column(rule_index, err_index)
+        if column is None:
+            return None
+        return self.cells.get((rule_index, column))
+
+    def sweep(self) -> Iterator[Tuple[int, int, Cell]]:
+        """遍历全部有区别的组合（err_index >= 1），产出 (rule_index, err_index, 结论)"""
+        for rule_index, width in enumerate(self.widths, start=1):
+            for err_index in range(1, width + 1):
+                yield rule_index, err_index, self.cells[(rule_index, err_index)]
+
+
+def make_outcome(conclusion: str, solution_code: str) -> Outcome:
+    """按解决方案编号读取文档内容，构建结论"""
+    if not solution_code.startswith("FA"):
+        return Outcome(conclusion=conclusion, solution_code=solution_code, solution_content=solution_code, document=None)
+    document = solution_store.get(solution_code)
+    content = "" if document is None else document.content
+    return Outcome(conclusion=conclusion, solution_code=solution_code, solution_content=content, document=document)
+
+
+def _step_outcomes(
+    mock_type: str, mock_name: str, mml: MmlRegistry
+) -> Tuple[Optional[Outcome], Optional[Tuple[Outcome, ...]]]:
+    """
+    规则通过（status 为 0）时的结论，以及 status = 1..n 时的结论；
+    光功率依赖工单所属网元的数据，两者均为 None，在诊断时实时计算。
+    """
+    if mock_type == "num":
+        if mock_name == OPTICAL_POWER_KEY:
+            return None, None
+        passed, failed = mml.numeric(mock_name, 0), tuple(mml.numeric(mock_name, status) for status in MOCK_STATUSES)
+    else:
+        passed, failed = mml.content(mock_name, 0), mml.contents(mock_name) or (mml.content(mock_name, 1),)
+    return (
+        make_outcome(passed.conclusion, passed.solution),
+        tuple(make_outcome(content.conclusion, content.solution) for content in failed),
+    )
+
+
+def build_matrix(plan: RulePlan, mml: MmlRegistry) -> OutcomeMatrix:
+    outcomes = [_step_outcomes(step.mock_type, step.mock_name, mml) for step in plan.steps]
+    widths: List[int] = []
+    cells: Dict[Tuple[int, int], Cell] = {}
+    for rule_index in range(1, len(plan.steps) + 1):
+        steps = plan.steps_until(rule_index)
+        passed = [outcomes[position][0] for position in range(len(steps))]
+        failing = steps[-1].id == rule_index if steps else False
+        failed = outcomes[len(steps) - 1][1] if failing else None
+        width = len(failed) if failed else 1
+        widths.append(width)
+        for column in range(width + 1):
+            cell = list(passed)
+            if failing and column > 0:
+                cell[-1] = failed[column - 1] if failed else None
+            cells[(rule_index, column)] = tuple(cell)
+    return OutcomeMatrix(name=plan.name, widths=tuple(widths), cells=cells)
+
+
+def build_matrices(plans: Dict[str, RulePlan], mml: MmlRegistry) -> Dict[str, OutcomeMatrix]:
+    """为每个规则族构建结论矩阵"""
+    return {name: build_matrix(plan, mml) for name, plan in plans.items()}
@@ -0,0 +1,138 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..schemas import DiagnosisRule, Inference, RuleContent
+
+# 规则模板中的占位符：GJ 开头取自工单字段，JT 开头为静态数据
+pattern = re.compile(r'(?<![A-Z0-9])(?:GJ|JT)\d{5}(?![A-Z0-9])')
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTemplate:
+    """
+    预编译的文本模板。
+    `literals` 比 `fields` 多一个元素，渲染时交替拼接：
+    literals[0] + 工单[fields[0]] + literals[1] + ... + literals[-1]
+    JT 静态占位符在编译期已经替换进 literals。
+    """
+    literals: Tuple[str, ...]
+    fields: Tuple[str, ...]
+
+    def render(self, work_order: Any) -> str:
+        """使用工单字段值填充模板"""
+        if not self.fields:
+            return self.literals[0]
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            parts.append(str(getattr(work_order, field, f"{{{field}}}")))
+            parts.append(literal)
+        return "".join(parts)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledStep:
+    """单条规则的执行计划"""
+    id: int
+    name: str
+    mock_type: str
+    mock_name: str
+    descriptions: CompiledTemplate
+    curr_rules: Tuple[CompiledTemplate, ...]
+    skeleton: Inference
+
+    def render(self, work_order: Any, conclusion: str, solution_code: str, solution_content: str) -> Inference:
+        """在预构建的 Inference 骨架上填入工单相关的值"""
+        return self.skeleton.model_copy(update={
+            "conclusion": conclusion,
+            "solution_code": solution_code,
+            "solution_content": solution_content,
+            "descriptions": self.descriptions.render(work_order),
+            "curr_rules": [rule.render(work_order) for rule in self.curr_rules],
+        })
+
+
+@dataclass(frozen=True, slots=True)
+class RulePlan:
+    """一个规则族（如 TF-001）的执行计划"""
+    name: str
+    steps: Tuple[CompiledStep, ...]
+
+    def clamp_index(self, rule_index: int) -> int:
+        """将 rule_index 限制在 [1, 规则数] 范围内"""
+        return min(max(rule_index, 1), len(self.steps))
+
+    def steps_until(self, rule_index: int) -> Tuple[CompiledStep, ...]:
+        """返回需要执行的规则（id 不超过 rule_index），rule_index 会被限制在有效范围内"""
+        rule_index = self.clamp_index(rule_index)
+        result = []
+        for step in self.steps:
+            if step.id > rule_index:
+                break
+            result.append(step)
+        return tuple(result)
+
+
+def compile_template(text: str, static_resolver: Optional[Callable[[str, str], Any]] = None) -> CompiledTemplate:
+    """
+    将模板文本拆分为字面量与占位符片段。
+    - GJ 占位符保留为字段名，渲染时从工单取值；
+    - JT 占位符通过 `static_resolver` 在编译期求值并并入字面量。
+    """
+    literals: List[str] = []
+    fields: List[str] = []
+    buffer = ""
+    position = 0
+    for match in pattern.finditer(text):
+        buffer += text[position:match.start()]
+        position = match.end()
+        placeholder = match.group(0)
+        if placeholder.startswith("GJ"):
+            literals.append(buffer)
+            fields.append(placeholder)
+            buffer = ""
+        elif static_resolver is not None:
+            buffer += str(static_resolver(placeholder, ""))
+        else:
+            buffer += placeholder
+    literals.append(buffer + text[position:])
+    return CompiledTemplate(literals=tuple(literals), fields=tuple(fields))
+
+
+def compile_step(rule: RuleContent, static_resolver: Optional[Callable[[str, str], Any]] = None) -> CompiledStep:
+    """编译单条规则"""
+    skeleton = Inference(
+        name=rule.mock.name,
+        descriptions="",
+        conclusion="",
+        curr_rules=[],
+        solution_content="",
+        solution_code="",
+    )
+    return CompiledStep(
+        id=rule.id,
+        name=rule.name,
+        mock_type=rule.mock.type,
+        mock_name=rule.mock.name,
+        descriptions=compile_template(rule.descriptions, static_resolver),
+        curr_rules=tuple(compile_template(text, static_resolver) for text in rule.curr_rules),
+        skeleton=skeleton,
+    )
+
+
+def compile_rules(
+    rules: List[DiagnosisRule], static_resolver: Optional[Callable[[str, str], Any]] = None
+) -> Dict[str, RulePlan]:
+    """
+    将 rules.json 解析结果编译为按规则族名称索引的执行计划。
+    同名规则族以首次出现的为准，与原先线性查找的行为一致。
+    """
+    plans: Dict[str, RulePlan] = {}
+    for family in rules:
+        if family.name in plans:
+            continue
+        plans[family.name] = RulePlan(
+            name=family.name,
+            steps=tuple(compile_step(rule, static_resolver) for rule in family.rules),
+        )
+    return plans
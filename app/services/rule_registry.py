@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..rule_data import SOURCE_FILES, RuleData, get_versioned_rule_data, load_versioned_rule_data
+from ..schemas import MmlNumSetting, MmlStrSetting
+from .mml_registry import MmlRegistry
+from .outcome_matrix import OutcomeMatrix, build_matrices
+from .rule_compiler import RulePlan, compile_rules
+from .static_data_service import fetch_static_data
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class RuleSet:
+    """
+    某一版本的规则与 MML 配置，创建后不再修改。
+    一次诊断从头到尾使用同一个 RuleSet，热加载不会影响进行中的请求。
+    """
+    version: int
+    digest: str
+    plans: Dict[str, RulePlan]
+    mml_num_list: List[MmlNumSetting]
+    mml_str_list: List[MmlStrSetting]
+    loaded_at: float
+    # 按 DT 编号索引的 MML 配置
+    mml: MmlRegistry = field(default_factory=MmlRegistry)
+    # 规则族名称 -> 预先计算的 (rule_index, err_index) 结论矩阵
+    matrices: Dict[str, OutcomeMatrix] = field(default_factory=dict)
+
+    @property
+    def tag(self) -> str:
+        """对外展示的规则版本：内容校验值前缀，各 worker 加载同一内容时一致"""
+        return self.digest[:12]
+
+
+class RuleRegistry:
+    """
+    规则注册表：持有当前生效的 RuleSet。
+    reload 在调用线程（后台监视线程或管理接口的线程池）中完成解析、校验与编译，
+    成功后整体替换引用；失败时保留当前版本。
+    """
+
+    def __init__(
+        self,
+        static_resolver: Callable[[str, str], object],
+        loader: Callable[[], Tuple[str, RuleData]] = load_versioned_rule_data,
+        initial: Optional[Tuple[str, RuleData]] = None,
+    ):
+        self._static_resolver = static_resolver
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._current = self._build(1, *(initial or loader()))
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def current(self) -> RuleSet:
+        return self._current
+
+    def _build(self, version: int, digest: str, data: RuleData) -> RuleSet:
+        plans = compile_rules(data.diagnosis_rules, self._static_resolver)
+        mml = MmlRegistry(data.mml_num, data.mml_str)
+        return RuleSet(
+            version=version,
+            digest=digest,
+            plans=plans,
+            mml_num_list=list(data.mml_num),
+            mml_str_list=list(data.mml_str),
+            loaded_at=time.time(),
+            mml=mml,
+            matrices=build_matrices(plans, mml),
+        )
+
+    def reload(self, force: bool = False) -> Tuple[RuleSet, bool]:
+        """
+        重新加载规则，返回 (当前 RuleSet, 是否切换了版本)。
+        内容未变化且未指定 force 时不切换；解析或编译失败时抛出异常并保留当前版本。
+        """
+        with self._lock:
+            digest, data = self._loader()
+            if digest == self._current.digest and not force:
+                return self._current, False
+            rule_set = self._build(self._current.version + 1, digest, data)
+            self._current = rule_set
+        logger.info("规则已切换到版本 %s (%s)", rule_set.version, rule_set.tag)
+        return rule_set, True
+
+    def _mtimes(self) -> Tuple[int, ...]:
+        return tuple(_mtime_ns(path) for path in SOURCE_FILES)
+
+    def start_watcher(self, interval: float) -> None:
+        """启动后台线程，按 interval 秒检查规则文件的 mtime，变化时重新加载"""
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="rule-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def _watch(self, interval: float) -> None:
+        mtimes = self._mtimes()
+        while not self._stop.wait(interval):
+            latest = self._mtimes()
+            if latest == mtimes:
+                continue
+            mtimes = latest
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error("规则热加载失败，继续使用版本 %s: %s", self._current.version, e)
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+# 启动时与 Settings 共用已加载的数据，不重复解析
+rule_registry = RuleRegistry(fetch_static_data, initial=get_versioned_rule_data())
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+from ..cache import MemoryCache
+from ..config import settings
+
+# 获取当前文件的绝对路径
+current_file = Path(__file__).resolve()
+project_root = current_file.parent.parent
+
+# 解决方案文档编号：FA 加 5 位数字，同时保证编号不含路径
+CODE_PATTERN = re.compile(r"FA\d{5}")
+
+
+@dataclass(frozen=True, slots=True)
+class SolutionDocument:
+    """已加载到内存中的解决方案文档"""
+    code: str
+    content: str
+    mtime_ns: int
+    etag: str
+    last_modified: str
+    # `/solution` 接口直接返回的 JSON 字符串编码结果
+    body: bytes
+
+
+class SolutionStore:
+    """
+    解决方案文档（FAxxxxx.md）的内存缓存。
+    - 构造时一次性加载目录下全部文档；
+    - 读取时按 `check_interval` 秒的间隔检查文件 mtime，变化后重新加载，文件删除后移除；
+    - 为每个文档预先计算 ETag / Last-Modified，供 HTTP 条件请求使用；
+    - 不符合编号格式的请求直接返回 None；不存在的编号记入有上限的 LRU，
+      同样按 `check_interval` 过期，任意编号的请求不会使内存无限增长。
+    """
+
+    def __init__(self, directory: Path, check_interval: float = 2.0, max_missing: int = 1024):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._documents: Dict[str, SolutionDocument] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._missing = MemoryCache(max_entries=max_missing)
+        self._lock = threading.Lock()
+        self.load_all()
+
+    def load_all(self) -> None:
+        """加载目录下的全部解决方案文档"""
+        if not self.directory.exists():
+            return
+        for file_path in sorted(self.directory.glob("*.md")):
+            if CODE_PATTERN.fullmatch(file_path.stem):
+                self._refresh(file_path.stem)
+
+    def get(self, code: str) -> Optional[SolutionDocument]:
+        """获取解决方案文档，不存在时返回 None"""
+        if not code or not CODE_PATTERN.fullmatch(code):
+            return None
+        document = self._documents.get(code)
+        if document is not None:
+            if time.monotonic() - self._checked_at.get(code, 0.0) < self.check_interval:
+                return document
+        elif self._missing.get(code) is not None:
+            return None
+        return self._refresh(code)
+
+    def codes(self) -> list[str]:
+        """当前已加载的文档编号"""
+        return sorted(self._documents)
+
+    def _refresh(self, code: str) -> Optional[SolutionDocument]:
+        file_path = self.directory / (code + ".md")
+        with self._lock:
+            current = self._documents.get(code)
+            try:
+                mtime_ns = file_path.stat().st_mtime_ns
+                if current is not None and current.mtime_ns == mtime_ns:
+                    self._checked_at[code] = time.monotonic()
+                    return current
+                raw = file_path.read_bytes()
+            except OSError:
+                self._documents.pop(code, None)
+                self._checked_at.pop(code, None)
+                self._missing.set(code, True, self.check_interval)
+                return None
+            content = raw.decode("utf-8")
+            document = SolutionDocument(
+                code=code,
+                content=content,
+                mtime_ns=mtime_ns,
+                etag='"' + hashlib.sha1(raw).hexdigest() + '"',
+                last_modified=formatdate(mtime_ns / 1e9, usegmt=True),
+                body=json.dumps(content, ensure_ascii=False).encode("utf-8"),
+            )
+            self._documents[code] = document
+            self._checked_at[code] = time.monotonic()
+            self._missing.delete(code)
+            return document
+
+
+def is_not_modified(document: SolutionDocument, headers: Mapping[str, str]) -> bool:
+    """
+    判断条件请求是否命中：
+    优先比较 If-None-Match，未携带时再比较 If-Modified-Since（精确到秒）。
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or document.etag in tags or ("W/" + document.etag) in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(document.mtime_ns // 1_000_000_000) <= int(since)
+    return False
+
+
+solution_store = SolutionStore(
+    project_root / "files" / "solutions",
+    check_interval=settings.solution_check_interval,
+)
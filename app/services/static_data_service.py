@@ -0,0 +1,13 @@
+# @tool(description="Fetch static data based on item name and status")
+def fetch_static_data(item_name: str, param: str):
+    """
+    获取静态数据（如 JT00012 机房编码、JT00013 站点编码）
+    """
+
+    # 机房编码
+    if item_name == "JT00012":
+        return {"room_id": "002017032644148100001082", "room_name": "南头机房"}
+
+    # 站点编码
+    if item_name == "JT00013":
+        return {"station_id": "440106040010002750", "station_name": "南头站"}
@@ -0,0 +1,95 @@
+"""
+响应序列化基准：对比 FastAPI 默认路径与单次序列化路径的每条工单耗时。
+
+- default：按 response_model 校验后 dump_python(mode="json")，再由 json.dumps 编码（FastAPI 默认行为）；
+- fast：一次性构建响应模型，由 pydantic-core 直接输出 JSON（settings.fast_json_responses）。
+
+用法：python -m bench.bench_serialization --items 10 100 1000
+"""
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models import WorkOrder
+from app.routers.api import _dump_page
+from app.schemas import InferenceResponse, PaginatedResponse
+from app.services.data_service import get_rule_plan
+
+DETAILS = (
+    "告警网管：FMC\n告警名称：BBU风扇堵转告警\n告警级别：二级告警\n"
+    '告警原文：{"alarmId": "123", "addInfo": "Cause:307;deployment:LTE;Slot:1"}'
+)
+
+
+def make_work_orders(count: int) -> list:
+    orders = []
+    for i in range(count):
+        values = {column.key: f"value-{i}" for column in WorkOrder.__table__.columns if not column.computed}
+        values.update(work_order_id=f"CMCC-GD-BENCH-{i:06d}", created_time="2025-06-28 08:11:58", details=DETAILS)
+        values.pop("details_json")
+        orders.append(WorkOrder(**values))
+    return orders
+
+
+def default_page(adapter: TypeAdapter, result: dict) -> bytes:
+    """模拟 FastAPI：校验 response_model -> 转为 JSON 兼容对象 -> json.dumps"""
+    content = adapter.validate_python(result, from_attributes=True)
+    content = adapter.dump_python(content, mode="json")
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_page(result: dict) -> bytes:
+    return _dump_page(result, None).encode("utf-8")
+
+
+def measure(func, repeat: int) -> float:
+    """返回最优一轮的耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_work_orders(counts, repeat: int) -> None:
+    adapter = TypeAdapter(PaginatedResponse)
+    print(f"{'items':>8} {'default us/item':>16} {'fast us/item':>14} {'speedup':>8}")
+    for count in counts:
+        result = {"total": count, "page": 1, "size": count, "total_pages": 1, "items": make_work_orders(count)}
+        assert json.loads(default_page(adapter, result)) == json.loads(fast_page(result))
+        default = measure(lambda: default_page(adapter, result), repeat) / count * 1e6
+        fast = measure(lambda: fast_page(result), repeat) / count * 1e6
+        print(f"{count:>8} {default:>16.2f} {fast:>14.2f} {default / fast:>7.1f}x")
+
+
+def bench_diagnosis(repeat: int) -> None:
+    adapter = TypeAdapter(InferenceResponse)
+    plan = get_rule_plan("TF-001")
+    order = make_work_orders(1)[0]
+    data = [step.render(order, "结论", "FA00001", "处理建议") for step in plan.steps]
+    response = InferenceResponse(data=data, success=True, error="")
+
+    def default():
+        content = adapter.dump_python(adapter.validate_python(response), mode="json")
+        return json.dumps(jsonable_encoder(content), ensure_ascii=False).encode("utf-8")
+
+    default_time = measure(default, repeat) * 1e6
+    fast_time = measure(lambda: response.model_dump_json().encode("utf-8"), repeat) * 1e6
+    print(f"diagnosis ({len(data)} steps): default {default_time:.1f}us, fast {fast_time:.1f}us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 100, 1000], help="每页工单条数")
+    parser.add_argument("--repeat", type=int, default=20, help="每组重复次数，取最优值")
+    args = parser.parse_args()
+    bench_work_orders(args.items, args.repeat)
+    bench_diagnosis(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+对比两次基准结果（bench/run.py 生成的 JSON），输出各场景 p50/p95/p99 与吞吐量的变化。
+
+用法：python -m bench.compare bench/results/before.json bench/results/after.json
+"""
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def _change(before, after) -> str:
+    if before in (None, 0) or after is None:
+        return "-"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(before: dict, after: dict) -> list[str]:
+    lines = [f"{'scenario':<28}" + "".join(f"{metric:>26}" for metric in METRICS)]
+    for name, result in after["scenarios"].items():
+        base = before["scenarios"].get(name)
+        if base is None:
+            continue
+        cells = [f"{base[m]} -> {result[m]} ({_change(base[m], result[m])})" for m in METRICS]
+        lines.append(f"{name:<28}" + "".join(f"{cell:>26}" for cell in cells))
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+    before = json.loads(Path(args.before).read_text(encoding="utf-8"))
+    after = json.loads(Path(args.after).read_text(encoding="utf-8"))
+    for side, report in (("before", before), ("after", after)):
+        meta = report["meta"]
+        print(f"{side}: {meta['commit']} {meta['database']} rows={meta['rows']} concurrency={meta['concurrency']}")
+    print("\n".join(compare(before, after)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+合成基准数据：生成 work_order 与 optical_power 表数据。
+
+- GJ00008 按真实比例混合：约 60% 为退服告警（基站 / 小区两个规则族），其余为非退服告警；
+- details 为 2~4KB 的告警详情文本（含分号分隔的 addInfo），与生产数据结构一致；
+- 每 5 个工单对应一个网元，每个网元 4 个光口读数，约 5% 的读数为低光功率。
+
+用法：python -m bench.datagen --url sqlite:///bench/data/bench_10k.db --rows 10000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, insert, make_url, select, text
+
+from app.database import Base
+from app.models import OpticalPower, WorkOrder
+from app.schemas import parse_details
+
+# (告警标准名, 权重)
+ALARM_MIX = [
+    ("基站退服告警", 30),
+    ("小区退服告警", 20),
+    ("基站退服且小区不可用告警", 5),
+    ("小区不可用告警", 5),
+    ("BBU风扇堵转告警", 10),
+    ("天馈驻波比异常", 10),
+    ("机框风扇故障", 8),
+    ("光模块接收光功率异常", 7),
+    ("射频单元维护链路异常告警", 5),
+]
+SUPPLIERS = ["华为", "中兴", "爱立信", "诺基亚"]
+CITIES = ["广州", "深圳", "佛山", "东莞", "珠海"]
+BOARDS = ["UMPT", "UBBP", "LMPT", "RRU5258"]
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+ORDER_CHUNK = 2000
+POWER_CHUNK = 5000
+
+
+def parse_rows(value: str) -> int:
+    """支持 10k / 100k / 1m 或纯数字"""
+    return SIZES.get(value.lower()) or int(value)
+
+
+def _details(rng: random.Random, alarm: str, ne_name: str, size: int) -> str:
+    add_info = ";".join(f"Param{i}:{rng.randint(0, 99999)}" for i in range(size // 14))
+    raw = json.dumps(
+        {"alarmId": str(rng.randint(10**8, 10**9)), "alarmName": alarm, "neName": ne_name, "addInfo": add_info},
+        ensure_ascii=False,
+    )
+    return (
+        f"告警网管：FMC\n告警名称：{alarm}\n告警级别：{rng.choice(['一级告警', '二级告警', '三级告警'])}\n"
+        f"告警对象：{ne_name}\n告警原文：{raw}"
+    )
+
+
+def work_order_rows(start: int, count: int, rng: random.Random, base_time: datetime):
+    alarms, weights = zip(*ALARM_MIX)
+    rows = []
+    for i in range(start, start + count):
+        alarm = rng.choices(alarms, weights)[0]
+        city = rng.choice(CITIES)
+        ne_name = f"{city}站点{i // 5:07d}-HLW"
+        created = base_time + timedelta(seconds=i * 30 + rng.randint(0, 29))
+        details = _details(rng, alarm, ne_name, rng.randint(2048, 4096))
+        parsed = parse_details(details)
+        rows.append({
+            "work_order_id": f"CMCC-GD-BENCH-{created:%Y%m%d}-{i:07d}",
+            "created_time": created.strftime("%Y-%m-%d %H:%M:%S"),
+            "GJ00008": alarm,
+            "GJ00010": f"{city}{i // 5:07d}号机房无线1",
+            "GJ00011": rng.choice(SUPPLIERS),
+            "GJ00014": ne_name,
+            "GJ00017": "无线网",
+            "GJ00021": "",
+            "order_subject": f"{ne_name} {alarm}",
+            "order_status": rng.choice(["待处理", "处理中", "已归档"]),
+            "process_region": city,
+            "warning_level": "二级",
+            "network_level_1": "无线网",
+            "network_level_3": "基站",
+            "source_name": "FMC",
+            "city_name_1": city,
+            "city_name_2": city,
+            "ne_name": ne_name,
+            "nms_alarm_id": str(rng.randint(10**8, 10**9)),
+            "details": details,
+            "details_json": parsed if isinstance(parsed, dict) else None,
+        })
+    return rows
+
+
+def optical_power_rows(ne_names, rng: random.Random):
+    rows = []
+    for ne_name in ne_names:
+        for port in range(4):
+            low = rng.random() < 0.05
+            rows.append({
+                "ne_name": ne_name,
+                "slot_id": str(port // 2),
+                "board_name": rng.choice(BOARDS),
+                "port": f"P{port}",
+                "input_power": str(rng.randint(-2500, -1800) if low else rng.randint(-900, -300)),
+                "output_power": str(rng.randint(-600, 300)),
+            })
+    return rows
+
+
+def generate(url: str, rows: int, seed: int = 20250628, reset: bool = False) -> dict:
+    """生成数据；表中已有足够数据且未指定 reset 时跳过"""
+    database = make_url(url).database
+    if url.startswith("sqlite") and database and database != ":memory:":
+        Path(database).parent.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(url)
+    if reset:
+        Base.metadata.drop_all(engine, tables=[WorkOrder.__table__, OpticalPower.__table__])
+    Base.metadata.create_all(engine, tables=[WorkOrder.__table__, OpticalPower.__table__])
+
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(WorkOrder)).scalar()
+    if existing >= rows:
+        engine.dispose()
+        return {"rows": existing, "generated": 0, "seconds": 0.0}
+
+    rng = random.Random(seed + existing)
+    base_time = datetime(2025, 1, 1)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("PRAGMA synchronous = OFF"))
+        for start in range(existing, rows, ORDER_CHUNK):
+            batch = work_order_rows(start, min(ORDER_CHUNK, rows - start), rng, base_time)
+            conn.execute(insert(WorkOrder), batch)
+            ne_names = sorted({row["ne_name"] for row in batch if row["ne_name"]})
+            powers = optical_power_rows(ne_names, rng)
+            for offset in range(0, len(powers), POWER_CHUNK):
+                conn.execute(insert(OpticalPower), powers[offset:offset + POWER_CHUNK])
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE work_order"))
+            conn.execute(text("ANALYZE optical_power"))
+    engine.dispose()
+    return {"rows": rows, "generated": rows - existing, "seconds": round(time.perf_counter() - started, 2)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="数据库连接串（同步驱动），如 postgresql+psycopg://... 或 sqlite:///...")
+    parser.add_argument("--rows", type=parse_rows, default=10_000, help="工单条数：10k / 100k / 1m 或具体数字")
+    parser.add_argument("--seed", type=int, default=20250628)
+    parser.add_argument("--reset", action="store_true", help="先删除并重建 work_order 与 optical_power 表")
+    args = parser.parse_args()
+    print(json.dumps(generate(args.url, args.rows, args.seed, args.reset), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+生产环境多进程配置：gunicorn 主进程预先加载应用（含解析后的规则、MML 配置与解决方案文档），
+再 fork 出多个 uvicorn worker，只读数据通过写时复制在各 worker 间共享。
+
+用法：gunicorn -c gunicorn.conf.py app.main:app（见 start_prod.sh）
+
+环境变量：
+- BIND：监听地址，默认 0.0.0.0:7190；
+- WEB_CONCURRENCY：worker 数，默认 CPU 核数；
+- GRACEFUL_TIMEOUT：滚动重启时等待 worker 排空的秒数，应大于 DRAIN_TIMEOUT；
+- PRELOAD_LLM：是否在主进程预先导入 langchain 与模型 SDK（默认 true）。
+
+运行指标（METRICS_ENABLED）按进程统计，/metrics 只返回处理该次抓取的 worker 的数据；
+需要指标时以 WEB_CONCURRENCY=1 运行，多 worker 时启动日志会给出警告（见 app/metrics.py）。
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:7190")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# 主进程加载应用后再 fork，各 worker 共享已解析的只读数据
+preload_app = True
+
+# 大模型调用可能较慢，超时需大于 LLM_DEADLINE
+timeout = int(os.getenv("TIMEOUT", 180))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 45))
+keepalive = 5
+
+# worker 处理一定数量的请求后重启，避免内存碎片持续增长；加随机抖动避免同时重启
+max_requests = int(os.getenv("MAX_REQUESTS", 20000))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", 2000))
+
+accesslog = os.getenv("ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def when_ready(server):
+    """主进程已加载应用、尚未 fork worker"""
+    if os.getenv("PRELOAD_LLM", "true").lower() in ("1", "true", "yes"):
+        from app.llm.agent import preload
+
+        try:
+            preload()
+        except ImportError as e:
+            server.log.warning("预加载大模型依赖失败: %s", e)
+    from app.config import settings
+
+    if settings.metrics_enabled and server.cfg.workers > 1:
+        server.log.warning(
+            "已启用运行指标，但 worker 数为 %s：指标按进程统计，/metrics 只返回其中一个 worker 的数据，"
+            "需要准确指标时请设置 WEB_CONCURRENCY=1",
+            server.cfg.workers,
+        )
+    # 将已加载的对象移出垃圾回收的跟踪范围，避免 worker 中的 GC 写入这些对象所在的页面而破坏写时复制
+    gc.collect()
+    gc.freeze()
+    server.log.info("应用已预加载，冻结对象 %s 个", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    """worker 中丢弃从主进程继承的数据库连接池"""
+    from app.database import dispose_after_fork
+
+    dispose_after_fork()
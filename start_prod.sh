@@ -0,0 +1,4 @@
+#!/bin/bash
+
+# 生产环境：多进程运行（配置见 gunicorn.conf.py）
+exec gunicorn -c gunicorn.conf.py app.main:app
@@ -0,0 +1,31 @@
+import random
+from datetime import datetime
+
+from bench.datagen import optical_power_rows, parse_rows, work_order_rows
+from bench.run import percentile, summarize
+
+
+class TestBenchDatagen:
+    """测试基准数据生成"""
+
+    def test_work_order_rows(self):
+        rows = work_order_rows(0, 500, random.Random(1), datetime(2025, 1, 1))
+        outage = [row for row in rows if "退服" in row["GJ00008"]]
+        assert 0.4 < len(outage) / len(rows) < 0.8
+        assert all(len(row["details"]) > 2000 and row["details_json"]["告警原文"]["addInfo"] for row in rows)
+        assert len({row["work_order_id"] for row in rows}) == 500
+
+    def test_optical_power_rows_and_sizes(self):
+        rows = optical_power_rows(["NE-A", "NE-B"], random.Random(1))
+        assert len(rows) == 8 and all(float(row["input_power"]) < 0 for row in rows)
+        assert parse_rows("1m") == 1_000_000 and parse_rows("2500") == 2500
+
+
+class TestBenchStats:
+    """测试延迟统计"""
+
+    def test_percentiles(self):
+        values = [float(i) for i in range(1, 101)]
+        assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (50.0, 95.0, 99.0)
+        result = summarize([0.01] * 9, errors=1, elapsed=0.5)
+        assert result["requests"] == 10 and result["p99_ms"] == 10.0 and result["throughput_rps"] == 18.0
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.cache import FallbackCache, MemoryCache, RedisCache, parse_sentinels
+
+
+class BrokenCache:
+    """模拟不可用的 Redis"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def _fail(self, *args, **kwargs):
+        self.calls += 1
+        raise ConnectionError("redis down")
+
+    aget = aset = adelete = adelete_prefix = _fail
+
+
+class TestMemoryCache:
+    """测试进程内缓存"""
+
+    def test_ttl_and_lru_eviction(self):
+        cache = MemoryCache(max_entries=2)
+        cache.set("a", "1", ttl=60)
+        cache.set("b", "2", ttl=60)
+        assert cache.get("a") == "1"
+        cache.set("c", "3", ttl=60)  # b 最久未使用，被淘汰
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"
+
+        cache.set("d", "4", ttl=0.01)
+        time.sleep(0.02)
+        assert cache.get("d") is None
+        assert cache.hits == 2 and cache.misses == 2
+
+    def test_delete_prefix(self):
+        cache = MemoryCache()
+        asyncio.run(cache.aset("diagnosis:WO-1:1:1", "x", 60))
+        asyncio.run(cache.aset("diagnosis:WO-2:1:1", "y", 60))
+        asyncio.run(cache.adelete_prefix("diagnosis:WO-1:"))
+        assert cache.get("diagnosis:WO-1:1:1") is None
+        assert cache.get("diagnosis:WO-2:1:1") == "y"
+
+
+class TestFallbackCache:
+    """测试 Redis 不可用时的降级"""
+
+    def test_falls_back_and_skips_primary_while_down(self):
+        primary = BrokenCache()
+        cache = FallbackCache(primary, MemoryCache(), retry_interval=60)
+
+        async def run():
+            await cache.aset("k", "v", 60)
+            assert await cache.aget("k") == "v"
+            await cache.adelete("k")
+            assert await cache.aget("k") is None
+
+        asyncio.run(run())
+        assert primary.calls == 1
+        assert not cache.primary_available
+
+    def test_parse_sentinels(self):
+        assert parse_sentinels("127.0.0.1:26379, redis-sentinel:26380") == [("127.0.0.1", 26379), ("redis-sentinel", 26380)]
+
+
+@pytest.mark.skipif(not os.getenv("TEST_REDIS_URL"), reason="未配置 TEST_REDIS_URL")
+class TestRedisCache:
+    """使用本地 Redis 测试，例如 TEST_REDIS_URL=redis://127.0.0.1:6379/15"""
+
+    def test_round_trip_and_prefix_delete(self):
+        import redis.asyncio as aioredis
+
+        async def run():
+            client = aioredis.from_url(os.environ["TEST_REDIS_URL"], decode_responses=True)
+            cache = RedisCache(client)
+            await cache.aset("gdcm-test:a:1", "1", 60)
+            await cache.aset("gdcm-test:a:2", "2", 60)
+            assert await cache.aget("gdcm-test:a:1") == "1"
+            await cache.adelete_prefix("gdcm-test:a:")
+            assert await cache.aget("gdcm-test:a:2") is None
+            await client.aclose()
+
+        asyncio.run(run())
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import database
+from app.config import settings
+from app.database import (
+    Base,
+    ReadReplica,
+    ReadRouter,
+    TimedQueuePool,
+    create_async_db_engine,
+    pool_options,
+    pool_stats,
+)
+
+
+class TestPoolOptions:
+    """测试按数据库类型生成连接池参数"""
+
+    def test_vendor_defaults_and_overrides(self, monkeypatch):
+        assert pool_options("sqlite:///x.db") == {}
+        assert pool_options("mysql+pymysql://u:p@h/db")["pool_recycle"] == database.POOL_DEFAULTS["mysql"]["pool_recycle"]
+
+        monkeypatch.setattr(settings, "db_pool_size", 3)
+        monkeypatch.setattr(settings, "db_pool_timeout", 1.5)
+        options = pool_options("postgresql+psycopg://u:p@h/db")
+        assert options["pool_size"] == 3 and options["pool_timeout"] == 1.5
+        assert options["max_overflow"] == database.POOL_DEFAULTS["postgresql"]["max_overflow"]
+
+    def test_timed_pool_reports_saturation_and_timeouts(self, tmp_path):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05,
+        )
+        with engine.connect():
+            stats = pool_stats("test", engine)
+            assert stats["checked_out"] == 1 and stats["saturation"] == 1.0
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+        stats = pool_stats("test", engine)
+        assert stats["checkouts"] == 1 and stats["timeouts"] == 1 and stats["saturation"] == 0.0
+
+        # dispose 重建连接池后统计保留
+        engine.dispose()
+        assert pool_stats("test", engine)["checkouts"] == 1
+
+
+class TestReadRouter:
+    """测试只读副本路由与回退主库"""
+
+    def test_round_robin_and_fallback(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(database, "_engines", {})
+        for name in ("primary", "replica"):
+            with create_engine(f"sqlite:///{tmp_path / name}.db").begin() as conn:
+                conn.execute(text("CREATE TABLE source (name TEXT)"))
+                conn.execute(text("INSERT INTO source VALUES (:name)"), {"name": name})
+
+        primary = async_sessionmaker(bind=create_async_db_engine(f"sqlite:///{tmp_path / 'primary'}.db"))
+        good = ReadReplica("replica-0", f"sqlite:///{tmp_path / 'replica'}.db", retry_interval=60)
+        bad = ReadReplica("replica-1", f"sqlite:///{tmp_path / 'missing' / 'x'}.db", retry_interval=60)
+        router = ReadRouter([good, bad], primary, connect_timeout=1.0)
+
+        async def read():
+            session = await router.session()
+            async with session:
+                return (await session.execute(text("SELECT name FROM source"))).scalar()
+
+        async def run():
+            return [await read() for _ in range(4)]
+
+        assert asyncio.run(run()) == ["replica"] * 4
+        assert not bad.healthy and bad.failures == 1
+        assert good.sessions == 4 and router.fallbacks == 0
+
+        # 副本全部不可用时回退主库
+        good.mark_down(float("inf"))
+        assert asyncio.run(read()) == "primary"
+        assert router.stats()["primary_fallbacks"] == 1
+        assert [stats["name"] for stats in database.db_stats()] == ["replica-0", "replica-1"]
+
+
+class TestSchemaBootstrap:
+    """测试 create_all 建表时的前置 DDL"""
+
+    def test_pg_trgm_created_before_search_index(self):
+        from sqlalchemy import create_mock_engine
+
+        from app.models import WorkOrder
+
+        statements = []
+        engine = create_mock_engine("postgresql+psycopg://", lambda sql, *args, **kwargs: statements.append(
+            str(sql.compile(dialect=engine.dialect)).strip()
+        ))
+        Base.metadata.create_all(engine, tables=[WorkOrder.__table__], checkfirst=False)
+
+        extension = statements.index("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        index = next(i for i, sql in enumerate(statements) if "ix_work_order_id_search" in sql)
+        assert extension < index
@@ -1,3 +1,6 @@
+import json
+from types import SimpleNamespace
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
@@ -65,4 +68,163 @@ class WorkOrderDianosisTestService:
             assert len(results) == param.rule_id 
             item = results[param.rule_id - 1]
             assert item.conclusion == param.conclustion
-            assert item.solution_code == param.solution_code
\ No newline at end of file
+            assert item.solution_code == param.solution_code
+
+class TestDiagnosisBatch:
+    """测试批量诊断的分组与逐条结果"""
+
+    def test_batch_results_keep_request_order(self):
+        from types import SimpleNamespace
+        from app.schemas import DiagnosisBatchItem
+        from app.services.data_service import _diagnose_batch
+
+        orders = {
+            "WO-1": SimpleNamespace(work_order_id="WO-1", GJ00008="基站退服", GJ00010="", GJ00011="", GJ00014="", ne_name=""),
+            "WO-2": SimpleNamespace(work_order_id="WO-2", GJ00008="小区退服", GJ00010="", GJ00011="", GJ00014="", ne_name=""),
+        }
+        items = [
+            DiagnosisBatchItem(work_order_id="WO-2", rule_index=4, err_index=2),
+            DiagnosisBatchItem(work_order_id="WO-X"),
+            DiagnosisBatchItem(work_order_id="WO-1", rule_index=3, err_index=2),
+        ]
+        results = _diagnose_batch(items, orders)
+
+        assert [r.work_order_id for r in results] == ["WO-2", "WO-X", "WO-1"]
+        assert results[0].success and results[0].data[-1].conclusion == "频点配置错误"
+        assert not results[1].success
+        assert results[2].data[-1].solution_code == "FA00006"
+
+    def test_async_batch_runs_inference_off_the_event_loop(self, monkeypatch):
+        """推理在线程池中执行，且能读取事件循环中预加载的光功率数据"""
+        import asyncio
+        import threading
+        from app.schemas import DiagnosisBatchItem
+        from app.services import data_service, optical_power_service
+
+        order = SimpleNamespace(work_order_id="WO-1", GJ00008="基站退服", GJ00010="", GJ00011="", GJ00014="", ne_name="NE-1")
+
+        class FakeSession:
+            async def execute(self, stmt):
+                return SimpleNamespace(scalars=lambda: [order])
+
+        async def fake_load_optical_power(db, orders, rule_set):
+            return {"NE-1": "readings"}
+
+        seen = {}
+
+        def fake_diagnose_batch(items, orders, rule_set):
+            seen["thread"] = threading.get_ident()
+            seen["readings"] = optical_power_service.get_preloaded("NE-1")
+            return []
+
+        async def run():
+            seen["loop_thread"] = threading.get_ident()
+            return await data_service.aexec_batch([DiagnosisBatchItem(work_order_id="WO-1")], FakeSession())
+
+        monkeypatch.setattr(data_service, "aload_optical_power", fake_load_optical_power)
+        monkeypatch.setattr(data_service, "_diagnose_batch", fake_diagnose_batch)
+        assert asyncio.run(run()) == []
+        assert seen["thread"] != seen["loop_thread"]
+        assert seen["readings"] == (True, "readings")
+
+
+class TestDiagnosisEndpoint:
+    """测试诊断接口每次按数据库中的工单推理，工单被外部修改后不返回旧结果"""
+
+    def test_out_of_band_update_is_not_stale(self, monkeypatch):
+        from app.database import get_async_read_db
+        from app.services import data_service
+
+        order = SimpleNamespace(work_order_id="WO-3", GJ00008="小区退服", GJ00010="", GJ00011="", GJ00014="", ne_name="")
+
+        async def fake_db():
+            yield None
+
+        async def fake_get_work_order(db, work_order_id):
+            return order
+
+        async def fake_load_optical_power(db, items, rule_set):
+            return {}
+
+        monkeypatch.setattr(data_service, "aget_work_order", fake_get_work_order)
+        monkeypatch.setattr(data_service, "aload_optical_power", fake_load_optical_power)
+        app.dependency_overrides[get_async_read_db] = fake_db
+        try:
+            params = {"work_order_id": "WO-3", "rule_index": 4, "err_index": 1}
+            first = client.get("/api/v1/diagnosis", params=params).json()
+            # 模拟外部系统直接修改数据库，未调用任何失效接口
+            order.GJ00008 = "基站退服"
+            second = client.get("/api/v1/diagnosis", params=params).json()
+        finally:
+            app.dependency_overrides.pop(get_async_read_db, None)
+
+        assert first["data"][-1]["conclusion"] == "LICENSE资源不足"
+        assert second["data"][-1]["conclusion"] == "传输光缆故障"
+
+
+class TestDiagnosisStream:
+    """测试流式诊断接口的 NDJSON / SSE 分帧与结束、错误事件"""
+
+    @pytest.fixture
+    def fake_orders(self, monkeypatch):
+        from app.database import get_async_read_db
+        from app.services import data_service
+
+        orders = {
+            "WO-2": SimpleNamespace(work_order_id="WO-2", GJ00008="小区退服", GJ00010="", GJ00011="", GJ00014="", ne_name="NE-1"),
+        }
+
+        async def fake_db():
+            yield None
+
+        async def fake_get_work_order(db, work_order_id):
+            return orders.get(work_order_id)
+
+        async def fake_load_optical_power(db, items, rule_set):
+            return {}
+
+        monkeypatch.setattr(data_service, "aget_work_order", fake_get_work_order)
+        monkeypatch.setattr(data_service, "aload_optical_power", fake_load_optical_power)
+        app.dependency_overrides[get_async_read_db] = fake_db
+        yield
+        app.dependency_overrides.pop(get_async_read_db, None)
+
+    def test_ndjson_one_object_per_line(self, fake_orders):
+        response = client.get("/api/v1/diagnosis/stream", params={"work_order_id": "WO-2", "rule_index": 4, "err_index": 2})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert [event["event"] for event in events] == ["inference"] * 4 + ["end"]
+        assert events[3]["data"]["conclusion"] == "频点配置错误"
+        assert events[-1]["data"]["count"] == 4 and events[-1]["data"]["rule_version"]
+
+    def test_sse_frames(self, fake_orders):
+        response = client.get(
+            "/api/v1/diagnosis/stream", params={"work_order_id": "WO-2", "rule_index": 2, "format": "sse"}
+        )
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        frames = [frame for frame in response.text.split("\n\n") if frame]
+        assert len(frames) == 3
+        for frame in frames:
+            event, data = frame.split("\n")
+            assert event.startswith("event: ") and data.startswith("data: ")
+            json.loads(data[len("data: "):])
+        assert frames[-1].startswith("event: end\n")
+
+    def test_error_event_terminates_stream(self, fake_orders, monkeypatch):
+        from app.services import data_service
+
+        def failing_iter_diagnosis(*args):
+            yield from ()
+            raise ValueError("规则执行失败")
+
+        monkeypatch.setattr(data_service, "iter_diagnosis", failing_iter_diagnosis)
+        response = client.get("/api/v1/diagnosis/stream", params={"work_order_id": "WO-2"})
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events == [{"event": "error", "data": {"error": "规则执行失败"}}]
+
+    def test_unknown_work_order_returns_404(self, fake_orders):
+        response = client.get("/api/v1/diagnosis/stream", params={"work_order_id": "WO-X"})
+        assert response.status_code == 404
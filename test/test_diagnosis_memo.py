@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+from app.services import data_service
+from app.services.diagnosis_memo import DiagnosisMemo
+
+
+def _work_order(**overrides):
+    fields = dict(work_order_id="W1", GJ00008="基站退服告警", GJ00010="机房A", GJ00011="华为",
+                  GJ00014="对象X", ne_name="NE1", GJ00017=None)
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+class TestDiagnosisMemo:
+    """测试诊断结果缓存的命中与失效"""
+
+    def _setup(self, monkeypatch):
+        memo = DiagnosisMemo(max_entries=100, ttl=60)
+        monkeypatch.setattr(data_service, "diagnosis_memo", memo)
+        monkeypatch.setattr(data_service.settings, "diagnosis_memo_enabled", True)
+        calls = []
+        original = data_service._iter_plan
+
+        def counting_iter_plan(*args):
+            calls.append(args[1].work_order_id)
+            return original(*args)
+
+        monkeypatch.setattr(data_service, "_iter_plan", counting_iter_plan)
+        return memo, calls
+
+    def test_hit_returns_same_result(self, monkeypatch):
+        memo, calls = self._setup(monkeypatch)
+        first = data_service.digonisis(_work_order(), 1, 1, "TF-001")
+        second = data_service.digonisis(_work_order(), 1, 1, "TF-001")
+        assert first == second
+        assert len(calls) == 1
+        assert memo.stats()["hits"] == 1 and memo.stats()["misses"] == 1
+
+    def test_rule_family_and_revision_are_part_of_key(self, monkeypatch):
+        memo, calls = self._setup(monkeypatch)
+        data_service.digonisis(_work_order(), 1, 1, "TF-001")
+        data_service.digonisis(_work_order(), 1, 1, "TF-002")
+        data_service.digonisis(_work_order(GJ00010="机房B"), 1, 1, "TF-001")
+        assert len(calls) == 3
+
+    def test_invalidate_ne_and_work_order(self, monkeypatch):
+        memo, calls = self._setup(monkeypatch)
+        data_service.digonisis(_work_order(), 1, 1, "TF-001")
+        memo.invalidate_ne(["NE1"])
+        data_service.digonisis(_work_order(), 1, 1, "TF-001")
+        assert len(calls) == 2
+
+        memo.invalidate_work_order("W1")
+        assert memo.stats()["entries"] == 0
+        data_service.digonisis(_work_order(), 1, 1, "TF-001")
+        assert len(calls) == 3
+        assert memo.stats()["invalidations"] == 2
+
+    def test_details_change_revision(self, monkeypatch):
+        memo, calls = self._setup(monkeypatch)
+        data_service.digonisis(_work_order(details="告警网管：OMC"), 1, 1, "TF-001")
+        data_service.digonisis(_work_order(details="告警网管：FMC"), 1, 1, "TF-001")
+        assert len(calls) == 2
+
+    def test_ne_generations_are_bounded(self, monkeypatch):
+        memo, calls = self._setup(monkeypatch)
+        data_service.digonisis(_work_order(), 1, 1, "TF-001")
+        memo.invalidate_ne(["NE1", "NE2"])
+        first = memo.generation("NE1")
+        memo.invalidate_ne(["NE1"])
+        # 代数全进程递增，不会回到用过的值
+        assert memo.generation("NE1") > max(first, memo.generation("NE2"))
+
+        # 记录数超过上限时清空全部结果与代数
+        memo.invalidate_ne(f"NE-{i}" for i in range(memo._entries.max_entries + 1))
+        assert memo.stats()["entries"] == 0 and len(memo._ne_generations) == 0
+
+        # 超过 ttl 的记录被删除，此前的结果届时均已过期
+        expiring = DiagnosisMemo(max_entries=100, ttl=0)
+        expiring.invalidate_ne(["NE1", "NE2"])
+        assert len(expiring._ne_generations) == 0 and expiring.generation("NE1") == 0
@@ -0,0 +1,79 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import OpticalPower, WorkOrder
+from app.services.diagnosis_memo import diagnosis_memo
+from app.services.ingest_service import after_ingest, ingest_file, new_result
+
+
+def make_engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[WorkOrder.__table__, OpticalPower.__table__])
+    return engine
+
+
+class TestIngest:
+    """测试工单与光功率批量导入"""
+
+    def test_csv_work_orders_upsert(self):
+        engine = make_engine()
+        csv_data = (
+            "work_order_id,created_time,GJ00008,details\n"
+            "WO-1,2025-06-28 08:00:00,小区退服告警,告警网管：FMC\n"
+            "WO-2,2025-06-28 09:00:00,机框风扇故障,无法解析\n"
+            ",2025-06-28 10:00:00,缺少工单号,\n"
+            "WO-1,2025-06-28 08:00:00,基站退服告警,告警网管：OMC\n"
+        ).encode("utf-8")
+        result = ingest_file(engine, "work-orders", io.BytesIO(csv_data), "csv", batch_size=2)
+        assert (result.rows, result.skipped, result.batches) == (3, 1, 2)
+
+        # 再次导入同一工单号时整行更新
+        update = json.dumps({"work_order_id": "WO-2", "GJ00008": "小区退服告警", "details": "告警名称：小区退服"})
+        ingest_file(engine, "work-orders", io.BytesIO(update.encode("utf-8")), "jsonl")
+
+        with Session(engine) as db:
+            orders = {order.work_order_id: order for order in db.execute(select(WorkOrder)).scalars()}
+        assert len(orders) == 2
+        assert orders["WO-1"].GJ00008 == "基站退服告警" and orders["WO-1"].rule_family == "TF-001"
+        assert orders["WO-1"].details_json == {"告警网管": "OMC"}
+        assert orders["WO-2"].is_outage and orders["WO-2"].rule_family == "TF-002"
+        assert orders["WO-2"].details_json == {"告警名称": "小区退服"} and orders["WO-2"].GJ00010 == ""
+
+    def test_optical_power_replaces_readings_per_ne(self):
+        engine = make_engine()
+
+        def load(readings):
+            body = "\n".join(json.dumps(reading) for reading in readings).encode("utf-8")
+            return ingest_file(engine, "optical-power", io.BytesIO(body), "jsonl", batch_size=1)
+
+        load([{"ne_name": "NE-A", "port": "P0", "input_power": -500}, {"ne_name": "NE-B", "port": "P0"}])
+        result = load([{"ne_name": "NE-A", "port": "P1", "input_power": -1500},
+                       {"ne_name": "NE-A", "port": "P2", "input_power": -600}])
+        assert result.rows == 2
+
+        with Session(engine) as db:
+            rows = db.execute(select(OpticalPower.ne_name, OpticalPower.port, OpticalPower.input_power)).all()
+        assert sorted(rows) == [("NE-A", "P1", "-1500"), ("NE-A", "P2", "-600"), ("NE-B", "P0", "")]
+
+    def test_non_object_line_fails_with_partial_result(self):
+        """非对象的 JSON 行抛出 ValueError（接口返回 400），已提交批次的统计仍可用于清除缓存"""
+        engine = make_engine()
+        body = "\n".join([json.dumps({"ne_name": "NE-A", "port": "P0"}), "[1, 2]"]).encode("utf-8")
+        result = new_result("optical-power")
+        with pytest.raises(ValueError, match="第 2 行"):
+            ingest_file(engine, "optical-power", io.BytesIO(body), "jsonl", batch_size=1, result=result)
+        assert (result.table, result.rows, result.ne_names) == ("optical_power", 1, {"NE-A"})
+
+        generation = diagnosis_memo.generation("NE-A")
+        asyncio.run(after_ingest(result))
+        assert diagnosis_memo.generation("NE-A") != generation
+
+        with pytest.raises(ValueError):
+            new_result("unknown")
@@ -0,0 +1,62 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app import lifecycle as lifecycle_module
+from app.lifecycle import Lifecycle
+from app.main import app
+
+
+class TestLifecycle:
+    """测试预热、就绪状态与排空"""
+
+    def test_ready_endpoint_follows_warmup_and_drain(self, monkeypatch):
+        state = Lifecycle()
+        monkeypatch.setattr(lifecycle_module, "lifecycle", state)
+        monkeypatch.setattr("app.routers.api.lifecycle", state)
+        client = TestClient(app)
+
+        assert client.get("/api/v1/ready").status_code == 503
+        assert client.get("/api/v1/health").status_code == 200
+
+        calls = []
+
+        async def flaky_warm_up():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ConnectionError("数据库未就绪")
+
+        monkeypatch.setattr(lifecycle_module, "warm_up", flaky_warm_up)
+        asyncio.run(lifecycle_module.warm_up_until_ready(retry_interval=0.01))
+        assert len(calls) == 2 and state.warmup_error is None
+        assert client.get("/api/v1/ready").json()["ready"] is True
+
+        state.begin_drain()
+        response = client.get("/api/v1/ready")
+        assert response.status_code == 503 and response.json()["draining"] is True
+
+    def test_drain_waits_for_in_flight_diagnoses(self):
+        state = Lifecycle()
+
+        async def diagnose():
+            async with state.track():
+                await asyncio.sleep(0.1)
+
+        async def run():
+            task = asyncio.create_task(diagnose())
+            await asyncio.sleep(0.01)
+            assert state.in_flight == 1
+            drained = await state.drain(timeout=2)
+            return drained, task.done()
+
+        assert asyncio.run(run()) == (True, True)
+        assert state.in_flight == 0
+
+    def test_drain_times_out(self):
+        state = Lifecycle()
+
+        async def run():
+            async with state.track():
+                return await state.drain(timeout=0.05)
+
+        assert asyncio.run(run()) is False
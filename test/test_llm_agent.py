@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.llm import agent
+from app.llm.limits import ProviderLimiter, TokenBucket, get_limiter, provider_of, reset_limiters
+from app.services.data_service import fetch_static_data
+from app.services.mock_service import mock_numerical_value, mock_string_value
+
+
+class FakeChatModel(GenericFakeChatModel):
+    """本地假模型，按顺序返回预设回复，不访问网络"""
+
+    calls: int = 0
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, *args, **kwargs):
+        self.calls += 1
+        return super()._generate(*args, **kwargs)
+
+
+class SlowChatModel(FakeChatModel):
+    """模拟响应缓慢的服务商"""
+
+    delay: float = 1.0
+
+    async def _agenerate(self, *args, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._generate(*args, **kwargs)
+
+
+class TestAgentPool:
+    """测试 agent 池化与推理结果缓存"""
+
+    def setup_method(self):
+        self.models = {}
+
+        def factory(model):
+            self.models[model] = FakeChatModel(messages=iter([AIMessage(content=f"{model}-{i}") for i in range(5)]))
+            return self.models[model]
+
+        agent.set_chat_model_factory(factory)
+
+    def teardown_method(self):
+        agent.set_chat_model_factory(None)
+
+    def run(self, prompt, **kwargs):
+        result = agent.inference(prompt, fetch_static_data, mock_numerical_value, mock_string_value, **kwargs)
+        return result["messages"][-1].content
+
+    def test_agents_are_pooled_per_model_and_tools(self):
+        tools = [fetch_static_data, mock_numerical_value]
+        assert agent.get_agent(tools) is agent.get_agent(list(tools))
+        assert agent.get_agent(tools) is not agent.get_agent(tools, model=agent.GEMINI_2_5_FLASH)
+        assert agent.get_agent(tools[:1]) is not agent.get_agent(tools)
+        assert set(self.models) == {agent.DEEPSEEK_CHAT, agent.GEMINI_2_5_FLASH}
+
+    def test_response_cache_uses_normalized_prompt(self):
+        assert self.run("基站退服\n  请给出处理建议", rule_version="v1") == "deepseek-chat-0"
+        assert self.run("  基站退服 请给出处理建议 ", rule_version="v1") == "deepseek-chat-0"
+        assert self.models[agent.DEEPSEEK_CHAT].calls == 1
+
+        # 规则版本或模型不同时不复用
+        assert self.run("基站退服 请给出处理建议", rule_version="v2") == "deepseek-chat-1"
+        assert self.run("基站退服 请给出处理建议", rule_version="v1", model=agent.GEMINI_2_5_PRO) == "gemini-2.5-pro-0"
+
+
+    def test_ainference_shares_cache_with_inference(self):
+        result = asyncio.run(agent.ainference(
+            "小区退服", fetch_static_data, mock_numerical_value, mock_string_value, rule_version="v1"
+        ))
+        assert result["messages"][-1].content == "deepseek-chat-0"
+        assert self.run("小区退服", rule_version="v1") == "deepseek-chat-0"
+        assert self.models[agent.DEEPSEEK_CHAT].calls == 1
+        reset_limiters()
+
+class TestLimits:
+    """测试大模型调用的并发、限流与超时"""
+
+    def teardown_method(self):
+        agent.set_chat_model_factory(None)
+        reset_limiters()
+
+    def test_provider_of(self):
+        assert provider_of(agent.GEMINI_2_5_FLASH) == "gemini"
+        assert provider_of(agent.DEEPSEEK_CHAT) == "deepseek"
+
+    def test_token_bucket_limits_rate(self):
+        async def run():
+            bucket = TokenBucket(rate=20, capacity=1)
+            start = time.monotonic()
+            for _ in range(3):
+                await bucket.acquire()
+            return time.monotonic() - start
+
+        assert asyncio.run(run()) >= 0.09
+
+    def test_semaphore_reports_queue_depth(self):
+        limiter = ProviderLimiter("deepseek", max_concurrency=1, rate=0, burst=1)
+
+        async def call(release):
+            async with limiter.slot():
+                await release.wait()
+
+        async def run():
+            release = asyncio.Event()
+            tasks = [asyncio.create_task(call(release)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            stats = limiter.stats()
+            release.set()
+            await asyncio.gather(*tasks)
+            return stats
+
+        stats = asyncio.run(run())
+        assert stats["in_flight"] == 1 and stats["waiting"] == 2
+        assert limiter.stats()["completed"] == 3 and limiter.waiting == 0
+
+    def test_ainference_deadline(self):
+        agent.set_chat_model_factory(lambda model: SlowChatModel(messages=iter([AIMessage(content="late")])))
+
+        with pytest.raises(TimeoutError):
+            asyncio.run(agent.ainference(
+                "光功率过低", fetch_static_data, mock_numerical_value, mock_string_value,
+                model=agent.GEMINI_2_5_FLASH, rule_version="v1", timeout=0.05,
+            ))
+        assert get_limiter("gemini").stats()["timeouts"] == 1
@@ -0,0 +1,64 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app import metrics
+from app.metrics import Counter, Histogram
+
+
+class TestMetrics:
+    """测试指标采集与 Prometheus 文本导出"""
+
+    def test_histogram_exports_cumulative_buckets(self):
+        histogram = Histogram("demo_seconds", "示例", ("step",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, "fetch")
+        counter = Counter("demo_total", "示例", ("result",))
+        counter.inc("hit", amount=2)
+
+        lines = []
+        for name, kind, _, samples in (histogram.collect(), counter.collect()):
+            lines += [f"{name}{suffix}{metrics._format_labels(labels)} {metrics._format_value(value)}"
+                      for suffix, labels, value in samples]
+        assert lines == [
+            'demo_seconds_bucket{step="fetch",le="0.1"} 2',
+            'demo_seconds_bucket{step="fetch",le="1.0"} 3',
+            'demo_seconds_bucket{step="fetch",le="+Inf"} 4',
+            'demo_seconds_sum{step="fetch"} 3.65',
+            'demo_seconds_count{step="fetch"} 4',
+            'demo_total{result="hit"} 2',
+        ]
+
+    def test_timer_is_noop_when_disabled(self, monkeypatch):
+        monkeypatch.setattr(metrics, "ENABLED", False)
+        histogram = Histogram("noop_seconds", "示例")
+        with metrics.timer(histogram):
+            pass
+        assert histogram.count() == 0
+
+    def test_request_route_and_sql_counts(self, monkeypatch):
+        monkeypatch.setattr(metrics, "ENABLED", True)
+        for metric in metrics.METRICS:
+            metric.clear()
+        engine = create_engine("sqlite://")
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        def item(item_id: int) -> dict:
+            with engine.connect() as conn:
+                for _ in range(item_id):
+                    conn.execute(text("SELECT 1"))
+            metrics.record_cache("item", item_id > 1)
+            return {"id": item_id}
+
+        metrics.install(app)
+        client = TestClient(app)
+        client.get("/items/3")
+        client.get("/items/1")
+        body = client.get("/metrics").text
+
+        route = ("GET", "/items/{item_id}", "200")
+        assert metrics.REQUEST_DURATION.count(*route) == 2
+        assert 'http_request_db_queries_sum{route="/items/{item_id}"} 4.0' in body
+        assert 'cache_hit_ratio{cache="item"} 0.5' in body
+        assert metrics.DB_QUERY_DURATION.count("SELECT") >= 4
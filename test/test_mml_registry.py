@@ -0,0 +1,91 @@
+import math
+from types import SimpleNamespace
+
+from app.rule_data import parse_sources
+from app.schemas import MmlContent, MmlNumSetting, MmlStrSetting
+from app.services import data_service
+from app.services.mml_registry import UNSET_CONTENT, MmlRegistry, evaluate_numeric, range_violations
+from app.services.mock_service import mock_numerical_value, mock_string_value
+from app.services.rule_registry import RuleRegistry
+from app.services.static_data_service import fetch_static_data
+
+setting = MmlNumSetting(key="DT00099", low=-10, high=10, normal="FA00007", err="FA00001")
+
+
+class TestMmlRegistry:
+    """测试按 DT 编号索引的 MML 配置"""
+
+    def test_lookup_keeps_first_setting(self):
+        first = MmlStrSetting(key="DT1", contents=[MmlContent(id=1, conclusion="a", solution="FA1"),
+                                                    MmlContent(id=2, conclusion="b", solution="FA2")])
+        second = MmlStrSetting(key="DT1", contents=[MmlContent(id=1, conclusion="c", solution="FA3")])
+        mml = MmlRegistry([setting], [first, second, MmlStrSetting(key="DT2", contents=[])])
+        assert mml.num_setting("DT00099") is setting and mml.num_setting("DT00000") is None
+        assert mml.content("DT1", 0).conclusion == ""
+        assert mml.content("DT1", 2).conclusion == "b"
+        assert mml.content("DT1", 99).conclusion == "b"
+        assert mml.content("DT1", -1).conclusion == "a"
+        assert mml.content("DT2", 1) is UNSET_CONTENT
+        assert mml.content("DT3", 1) is UNSET_CONTENT
+
+    def test_evaluate_scalar_and_array(self):
+        assert evaluate_numeric(0, setting).solution == "FA00007"
+        assert evaluate_numeric(-11, setting).solution == "FA00001"
+        assert evaluate_numeric([math.nan, 5.0], setting).solution == "FA00007"
+
+        result = evaluate_numeric([0.0, 12.5, -20.0], setting, labels=["p1:", "p2:", "p3:"])
+        assert result.solution == "FA00001"
+        assert "p2:12.5 高于上限 10" in result.conclusion
+        assert "p3:-20 低于下限 -10" in result.conclusion
+        assert "p1:" not in result.conclusion
+
+    def test_range_violations_with_single_bound(self):
+        """光功率两路读数各自只有下限"""
+        _, below, above = range_violations([-15.0, -5.0, math.nan], low=-10)
+        assert below.tolist() == [True, False, False]
+        assert not above.any()
+
+
+class TestMockValues:
+    """测试模拟数据按 MML 配置取值"""
+
+    def _rule_set(self):
+        data = parse_sources()
+        data.mml_num.append(setting)
+        return RuleRegistry(fetch_static_data, loader=lambda: ("v1", data)).current
+
+    def test_numerical_value_uses_range(self):
+        rule_set = self._rule_set()
+        assert mock_numerical_value("DT00099", 0, None, rule_set).solution == "FA00007"
+        assert mock_numerical_value("DT00099", 1, None, rule_set).solution == "FA00001"
+        above = mock_numerical_value("DT00099", 2, None, rule_set)
+        assert above.solution == "FA00001" and "11 高于上限 10" in above.conclusion
+        assert mock_numerical_value("DT09999", 2, None, rule_set) is UNSET_CONTENT
+
+    def test_string_value_matches_contents(self):
+        rule_set = self._rule_set()
+        contents = rule_set.mml.contents("DT00005")
+        assert mock_string_value("DT00005", 2, None, rule_set) == contents[1]
+        assert mock_string_value("DT00005", 0, None, rule_set).solution == ""
+
+    def test_numeric_step_is_precomputed(self, monkeypatch):
+        data = parse_sources()
+        data.mml_num.append(setting)
+        family = next(family for family in data.diagnosis_rules if family.name == "TF-002")
+        family.rules[-1].mock.type = "num"
+        family.rules[-1].mock.name = "DT00099"
+        rule_set = RuleRegistry(fetch_static_data, loader=lambda: ("v1", data)).current
+        matrix = rule_set.matrices["TF-002"]
+        assert matrix.widths[-1] == 2
+        assert "低于下限" in matrix.lookup(5, 1)[-1].conclusion
+        assert "高于上限" in matrix.lookup(5, 3)[-1].conclusion
+        assert matrix.lookup(5, 0)[-1].solution_code == "FA00007"
+
+        # 非整数 err_index 不查矩阵，实时计算的结果应与矩阵一致
+        monkeypatch.setattr(data_service.settings, "diagnosis_memo_enabled", False)
+        order = SimpleNamespace(work_order_id="W1", GJ00008="小区退服告警", GJ00010="机房A", GJ00011="华为",
+                                GJ00014="对象X", ne_name="NE1", GJ00017=None)
+        assert data_service.digonisis(order, 5, 1.5, "TF-002", rule_set) == \
+            data_service.digonisis(order, 5, 1, "TF-002", rule_set)
+        assert data_service.digonisis(order, 5, 2.5, "TF-002", rule_set) == \
+            data_service.digonisis(order, 5, 2, "TF-002", rule_set)
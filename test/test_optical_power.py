@@ -0,0 +1,78 @@
+import math
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import OpticalPower, WorkOrder
+from app.rule_data import parse_sources
+from app.services import data_service
+from app.services.optical_power_service import evaluate_optical_power, load_readings, parse_power
+from app.services.rule_registry import RuleRegistry
+from app.services.static_data_service import fetch_static_data
+
+
+setting = next(setting for setting in settings.mml_num_list if setting.key == "DT00008")
+
+
+class TestOpticalPower:
+    """测试光功率批量加载与向量化判定"""
+
+    def test_parse_power_falls_back_on_bad_values(self):
+        values = parse_power(["-1500", None, "n/a", "-700.5"])
+        assert values[0] == -1500 and values[3] == -700.5
+        assert math.isnan(values[1]) and math.isnan(values[2])
+
+    def test_load_and_evaluate_many_ne(self):
+        """一次加载多个网元，按 DT00008 的 low/high 判定"""
+        engine = create_engine("sqlite://")
+        OpticalPower.__table__.create(engine)
+        with Session(engine) as db:
+            db.add_all([
+                OpticalPower(ne_name="NE-A", slot_id="1", board_name="UMPT", port="P0", input_power="-1500", output_power="-300"),
+                OpticalPower(ne_name="NE-A", slot_id="2", board_name="UMPT", port="P1", input_power="-500", output_power="-900"),
+                OpticalPower(ne_name="NE-B", slot_id="1", board_name="UBBP", port="P0", input_power="-500", output_power="abc"),
+            ])
+            db.commit()
+            readings = load_readings(db, ["NE-A", "NE-B", "NE-C"])
+
+        assert set(readings) == {"NE-A", "NE-B"}
+
+        result = evaluate_optical_power(readings["NE-A"], 1, setting)
+        assert result.solution == setting.err
+        assert "P0UMPT1> 输入光功率过低-1500.0dBm" in result.conclusion
+        assert "P1UMPT2> 输出光功率过低-900.0dBm" in result.conclusion
+
+        assert evaluate_optical_power(readings["NE-B"], 1, setting).solution == setting.normal
+
+    def test_evaluate_without_readings(self):
+        """无读数时按 status 选择默认结论"""
+        assert evaluate_optical_power(None, 0, setting).solution == setting.normal
+        assert evaluate_optical_power(None, 1, setting).solution == setting.err
+
+    def test_exec_preloads_readings_in_the_same_session(self, monkeypatch):
+        """单条诊断随工单一起加载光功率读数，推理过程中不再单独查询"""
+        data = parse_sources()
+        family = next(family for family in data.diagnosis_rules if family.name == "TF-001")
+        family.rules[5].mock.type = "num"
+        rule_set = RuleRegistry(fetch_static_data, loader=lambda: ("v1", data)).current
+        monkeypatch.setattr(data_service.settings, "diagnosis_memo_enabled", False)
+
+        engine = create_engine("sqlite://")
+        WorkOrder.__table__.create(engine)
+        OpticalPower.__table__.create(engine)
+        with Session(engine) as db:
+            fields = {c.key: "" for c in WorkOrder.__table__.columns if not c.computed}
+            fields.update(work_order_id="W1", GJ00008="基站退服", ne_name="NE-A")
+            db.add(WorkOrder(**fields))
+            db.add(OpticalPower(ne_name="NE-A", slot_id="1", board_name="UMPT", port="P0",
+                                input_power="-1500", output_power="-300"))
+            db.commit()
+            results = data_service.exec("W1", 6, 1, db, rule_set)
+            order = db.get(WorkOrder, "W1")
+
+        assert results[-1].solution_code == setting.err
+        assert "输入光功率过低-1500.0dBm" in results[-1].conclusion
+        with pytest.raises(RuntimeError):
+            data_service.digonisis(order, 6, 1, "TF-001", rule_set)
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from app.rule_data import parse_sources
+from app.services import data_service, optical_power_service
+from app.services.rule_registry import RuleRegistry
+from app.services.static_data_service import fetch_static_data
+
+
+def _work_order():
+    return SimpleNamespace(work_order_id="W1", GJ00008="小区退服告警", GJ00010="机房A", GJ00011="华为",
+                           GJ00014="对象X", ne_name="NE1", GJ00017=None)
+
+
+def _rule_set(num_step: bool = False):
+    data = parse_sources()
+    if num_step:
+        # TF-002 最后一条规则改为数值型光功率判定，需在诊断时实时计算
+        family = next(family for family in data.diagnosis_rules if family.name == "TF-002")
+        family.rules[-1].mock.type = "num"
+        family.rules[-1].mock.name = "DT00008"
+    return RuleRegistry(fetch_static_data, loader=lambda: ("v1", data)).current
+
+
+class TestOutcomeMatrix:
+    """测试规则加载时预先计算的结论矩阵"""
+
+    def test_columns_follow_mml_clamping(self):
+        matrix = _rule_set().matrices["TF-002"]
+        width = matrix.widths[3]
+        assert width == 5
+        assert matrix.column(4, 0) == 0
+        assert matrix.column(4, 99) == width
+        assert matrix.column(4, -3) == 1
+        assert matrix.column(4, 1.5) is None
+
+    def test_empty_family_falls_back_to_live_evaluation(self, monkeypatch):
+        """规则族没有规则时矩阵宽度为空，查找返回 None 而不是抛出 IndexError"""
+        monkeypatch.setattr(data_service.settings, "diagnosis_memo_enabled", False)
+        data = parse_sources()
+        next(family for family in data.diagnosis_rules if family.name == "TF-002").rules.clear()
+        rule_set = RuleRegistry(fetch_static_data, loader=lambda: ("v1", data)).current
+        matrix = rule_set.matrices["TF-002"]
+        assert matrix.widths == ()
+        assert matrix.column(0, 1) is None and matrix.lookup(0, 0) is None
+        with optical_power_service.preloaded({}):
+            assert data_service.digonisis(_work_order(), 1, 1, "TF-002", rule_set) == []
+
+    def test_dynamic_step_is_not_precomputed(self):
+        matrix = _rule_set(num_step=True).matrices["TF-002"]
+        assert matrix.widths[-1] == 1
+        assert matrix.lookup(5, 1)[-1] is None
+        assert all(outcome is not None for outcome in matrix.lookup(5, 1)[:-1])
+
+    def test_what_if_matches_single_diagnoses(self, monkeypatch):
+        monkeypatch.setattr(data_service.settings, "diagnosis_memo_enabled", False)
+        rule_set = _rule_set(num_step=True)
+        order = _work_order()
+        with optical_power_service.preloaded({}):
+            cells = data_service.what_if(order, "TF-002", rule_set)
+            assert len(cells) == sum(rule_set.matrices["TF-002"].widths)
+            for cell in cells:
+                expected = data_service.digonisis(order, cell.rule_index, cell.err_index, "TF-002", rule_set)
+                assert cell.data == expected
+        assert data_service.what_if(order, None, rule_set) == []
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from app import profiling
+from app.config import settings
+
+
+def busy_work(seconds: float) -> int:
+    total = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+class TestProfiling:
+    """测试按需剖析单个请求"""
+
+    def _client(self, monkeypatch, tmp_path) -> TestClient:
+        monkeypatch.setattr(settings, "admin_token", "secret")
+        monkeypatch.setattr(settings, "profiling_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "profiling_interval", 0.001)
+        engine = create_engine("sqlite://")
+        app = FastAPI()
+
+        @app.get("/api/v1/work-orders")
+        async def work_orders() -> dict:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT :value"), {"value": 42})
+            await asyncio.sleep(0.02)
+            return {"count": busy_work(0.05)}
+
+        profiling.install(app)
+        return TestClient(app)
+
+    def test_profiled_request_records_stacks_and_sql(self, monkeypatch, tmp_path):
+        client = self._client(monkeypatch, tmp_path)
+        response = client.get("/api/v1/work-orders", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-Id"]
+
+        profile = asyncio.run(profiling.load_profile(profile_id))
+        assert profile["status"] == 200 and profile["sql_count"] == 1
+        assert profile["sql"][0]["statement"] == "SELECT ?" and "42" in profile["sql"][0]["parameters"]
+        stacks = dict(line.rsplit(" ", 1) for line in profile["folded"].splitlines())
+        assert any("busy_work" in stack for stack in stacks)
+        assert any(stack.endswith(profiling.SUSPENDED) for stack in stacks)
+        # 剖析结束后移除 SQL 监听
+        assert not event.contains(Engine, "before_cursor_execute", profiling._before_cursor_execute)
+
+    def test_unprofiled_and_unauthorized_requests(self, monkeypatch, tmp_path):
+        client = self._client(monkeypatch, tmp_path)
+        assert "X-Profile-Id" not in client.get("/api/v1/work-orders").headers
+        response = client.get("/api/v1/work-orders", params={"profile": 1}, headers={"X-Admin-Token": "wrong"})
+        assert response.status_code == 401
+
+    def test_profiles_are_shared_through_the_spool_directory(self, monkeypatch, tmp_path):
+        """结果保存在剖析目录中，其他 worker（不共享进程内缓存）也能读取；过期与非法编号视为不存在"""
+        monkeypatch.setattr(settings, "profiling_dir", str(tmp_path))
+        asyncio.run(profiling.store_profile("0123456789abcdef", {"id": "0123456789abcdef", "folded": ""}))
+        assert (tmp_path / "0123456789abcdef.json").exists()
+        assert asyncio.run(profiling.load_profile("0123456789abcdef"))["id"] == "0123456789abcdef"
+
+        assert asyncio.run(profiling.load_profile("../../etc/passwd")) is None
+        assert asyncio.run(profiling.load_profile("fedcba9876543210")) is None
+
+        expired = time.time() - profiling.PROFILE_TTL - 1
+        os.utime(tmp_path / "0123456789abcdef.json", (expired, expired))
+        assert asyncio.run(profiling.load_profile("0123456789abcdef")) is None
+        asyncio.run(profiling.store_profile("fedcba9876543210", {"id": "fedcba9876543210", "folded": ""}))
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["fedcba9876543210.json"]
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from app.config import settings
+from app.services.data_service import digonisis, fetch_static_data, replace_text_codes, resolve_rule_name
+from app.services.rule_compiler import compile_rules, compile_template
+
+
+work_order = SimpleNamespace(
+    work_order_id="CMCC-GD-GZCL-20250515-008248",
+    GJ00008="基站退服告警",
+    GJ00010="南头机房无线1",
+    GJ00011="华为",
+    GJ00014="南头站皮飞DE-HLW",
+    ne_name="南头站皮飞DE-HLW",
+)
+
+
+class TestRuleCompiler:
+    """测试规则编译器"""
+
+    def test_compile_template_splits_literals_and_fields(self):
+        """GJ 占位符保留为字段，JT 占位符在编译期替换"""
+        template = compile_template("厂家:GJ00011,站点:GJ00014,站址:JT00012", fetch_static_data)
+
+        assert template.fields == ("GJ00011", "GJ00014")
+        assert len(template.literals) == 3
+        assert "JT00012" not in template.literals[-1]
+        assert template.render(work_order) == replace_text_codes(work_order, "厂家:GJ00011,站点:GJ00014,站址:JT00012")
+        assert template.render(work_order).startswith("厂家:华为,站点:南头站皮飞DE-HLW,站址:")
+
+    def test_compile_template_ignores_embedded_codes(self):
+        """与数字或大写字母相连的编码不视为占位符"""
+        template = compile_template("XGJ00011 GJ000111", fetch_static_data)
+        assert template.fields == ()
+        assert template.render(work_order) == "XGJ00011 GJ000111"
+
+    def test_compile_rules_indexes_families_by_name(self):
+        """规则族按名称索引，规则数与 rules.json 一致"""
+        plans = compile_rules(settings.diagnosis_rule_list, fetch_static_data)
+        for family in settings.diagnosis_rule_list:
+            assert len(plans[family.name].steps) == len(family.rules)
+
+    def test_digonisis_clamps_rule_index(self):
+        """rule_index 超出规则数时按最后一条规则处理"""
+        results = digonisis(work_order, 99, 1, "TF-002")
+        assert len(results) == 5
+        assert results[-1].descriptions.startswith("厂家:华为,站点:南头站皮飞DE-HLW")
+        assert digonisis(work_order, 1, 1, "TF-XXX") == []
+
+    def test_resolve_rule_name(self):
+        """基站优先于小区，与 work_order.rule_family 生成列一致"""
+        assert resolve_rule_name("基站退服告警") == "TF-001"
+        assert resolve_rule_name("小区不可用告警(小区退服)") == "TF-002"
+        assert resolve_rule_name("基站下小区退服") == "TF-001"
+        assert resolve_rule_name("机框风扇故障") is None
+        assert resolve_rule_name(None) is None
@@ -0,0 +1,36 @@
+import hashlib
+import json
+
+from app import rule_data
+from app.rule_data import load_versioned_rule_data, parse_sources, source_digest
+
+
+class TestRuleData:
+    """测试规则与 MML 配置的加载与版本校验值"""
+
+    def test_load_returns_digest_and_parsed_sources(self):
+        digest, data = load_versioned_rule_data()
+        assert digest == source_digest()
+        assert data == parse_sources()
+        assert data.diagnosis_rules and data.mml_num and data.mml_str
+
+    def test_digest_follows_source_content(self, tmp_path, monkeypatch):
+        """源文件内容变化时校验值（规则版本）随之变化"""
+        rules = tmp_path / "rules.json"
+        rules.write_text(rule_data.RULES_FILE.read_text(encoding="utf-8"), encoding="utf-8")
+        monkeypatch.setattr(rule_data, "SOURCE_FILES", (rules, rule_data.MML_NUM_FILE, rule_data.MML_STR_FILE))
+        before = source_digest()
+
+        items = json.loads(rules.read_text(encoding="utf-8"))
+        items.pop()
+        rules.write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+        assert source_digest() != before
+
+    def test_digest_covers_only_source_files(self):
+        """校验值只由 JSON 源文件决定，与 pydantic 版本、模型代码无关"""
+        expected = hashlib.sha256(b"".join(path.read_bytes() for path in rule_data.SOURCE_FILES)).hexdigest()
+        assert source_digest() == expected
+
+    def test_import_does_not_write_into_package(self):
+        rules_dir = rule_data.RULES_FILE.parent
+        assert not any(path.suffix == ".pickle" for path in rules_dir.iterdir())
@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.rule_data import parse_sources
+from app.services.rule_registry import RuleRegistry, rule_registry
+from app.services.static_data_service import fetch_static_data
+
+
+client = TestClient(app)
+
+
+class FakeLoader:
+    """可控的规则加载器，digest 变化表示规则文件内容变化"""
+
+    def __init__(self):
+        self.digest = "v1"
+        self.data = parse_sources()
+        self.error = None
+
+    def __call__(self):
+        if self.error is not None:
+            raise self.error
+        return self.digest, self.data
+
+
+class TestRuleRegistry:
+    """测试规则热加载与原子切换"""
+
+    def test_reload_switches_only_on_change(self):
+        loader = FakeLoader()
+        registry = RuleRegistry(fetch_static_data, loader=loader)
+        first = registry.current
+        assert first.version == 1 and "TF-001" in first.plans
+
+        assert registry.reload() == (first, False)
+
+        loader.digest = "v2"
+        loader.data.diagnosis_rules.pop()
+        rule_set, reloaded = registry.reload()
+        assert reloaded and rule_set.version == 2 and registry.current is rule_set
+        # 旧版本保持不变，进行中的诊断不受影响
+        assert len(first.plans) == len(rule_set.plans) + 1
+
+    def test_failed_reload_keeps_current_version(self):
+        loader = FakeLoader()
+        registry = RuleRegistry(fetch_static_data, loader=loader)
+        current = registry.current
+
+        loader.error = ValueError("rules.json 格式错误")
+        with pytest.raises(ValueError):
+            registry.reload(force=True)
+        assert registry.current is current
+
+
+class TestAdminRulesAPI:
+    """测试规则管理接口"""
+
+    def test_requires_admin_token(self, monkeypatch):
+        monkeypatch.setattr(settings, "admin_token", None)
+        assert client.get("/api/v1/admin/rules").status_code == 403
+
+        monkeypatch.setattr(settings, "admin_token", "secret")
+        assert client.get("/api/v1/admin/rules", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+        response = client.post("/api/v1/admin/rules/reload", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rule_version"] == rule_registry.current.tag
+        assert data["reloaded"] is False
@@ -0,0 +1,81 @@
+import os
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.solution_store import SolutionStore, is_not_modified
+
+
+client = TestClient(app)
+
+
+class TestSolutionStore:
+    """测试解决方案文档缓存"""
+
+    def test_load_and_refresh_on_mtime_change(self, tmp_path):
+        """文件 mtime 变化后重新加载，删除后返回 None"""
+        file_path = tmp_path / "FA00001.md"
+        file_path.write_text("# v1", encoding="utf-8")
+        store = SolutionStore(tmp_path, check_interval=0)
+
+        first = store.get("FA00001")
+        assert first.content == "# v1"
+        assert store.codes() == ["FA00001"]
+
+        file_path.write_text("# v2", encoding="utf-8")
+        os.utime(file_path, ns=(first.mtime_ns + 10**9, first.mtime_ns + 10**9))
+        second = store.get("FA00001")
+        assert second.content == "# v2"
+        assert second.etag != first.etag
+
+        file_path.unlink()
+        assert store.get("FA00001") is None
+
+    def test_rejects_paths_outside_directory(self, tmp_path):
+        """文档编号不能包含路径"""
+        store = SolutionStore(tmp_path, check_interval=0)
+        assert store.get("../FA00001") is None
+
+    def test_unknown_codes_do_not_grow_memory(self, tmp_path):
+        """任意编号的请求不会无限占用内存：格式不符的不记录，不存在的编号进入有上限的 LRU"""
+        (tmp_path / "FA00001.md").write_text("# doc", encoding="utf-8")
+        store = SolutionStore(tmp_path, check_interval=60, max_missing=10)
+
+        for index in range(100):
+            assert store.get(f"random-{index}") is None
+            assert store.get(f"FA9{index:04d}") is None
+        assert len(store._missing) == 10
+        assert set(store._documents) == set(store._checked_at) == {"FA00001"}
+
+        # 新增的文档在负缓存过期前不可见，过期后加载
+        (tmp_path / "FA90099.md").write_text("# new", encoding="utf-8")
+        assert store.get("FA90099") is None
+        store._missing.clear()
+        assert store.get("FA90099").content == "# new"
+
+    def test_conditional_headers(self, tmp_path):
+        """If-None-Match 优先于 If-Modified-Since"""
+        (tmp_path / "FA00002.md").write_text("# doc", encoding="utf-8")
+        document = SolutionStore(tmp_path).get("FA00002")
+
+        assert is_not_modified(document, {"if-none-match": document.etag})
+        assert not is_not_modified(document, {"if-none-match": '"other"', "if-modified-since": document.last_modified})
+        assert is_not_modified(document, {"if-modified-since": document.last_modified})
+        assert not is_not_modified(document, {})
+
+
+class TestSolutionAPI:
+    """测试解决方案接口的条件请求"""
+
+    def test_api_solution_etag(self):
+        response = client.get("/api/v1/solution", params={"code": "FA00006"})
+        assert response.status_code == 200
+        assert isinstance(response.json(), str)
+        etag = response.headers["etag"]
+
+        response = client.get("/api/v1/solution", params={"code": "FA00006"}, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+    def test_api_solution_not_found(self):
+        response = client.get("/api/v1/solution", params={"code": "FA99999"})
+        assert response.status_code == 404
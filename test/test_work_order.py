@@ -1,9 +1,18 @@
+import json
+
 import pytest
+from fastapi.encoders import jsonable_encoder
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.services.data_service import get_work_orders
+from sqlalchemy import create_engine
+from app.services.data_service import (
+    get_work_orders, get_work_orders_by_cursor, encode_cursor, decode_cursor, resolve_fields, WORK_ORDER_SUMMARY_FIELDS,
+)
 from app.main import app
+from app.routers.api import _dump_page
+from app.models import WorkOrder
+from app.schemas import PaginatedResponse, WorkOrderDTO
 
 
 client = TestClient(app)
@@ -131,6 +140,78 @@ class TestWorkOrdersService:
                 pass
 
 
+class TestWorkOrderCursor:
+    """测试工单列表游标编解码"""
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor("2025-06-28 08:11:58", "CMCC-GD-GZCL-20250628-000781")
+        assert decode_cursor(cursor) == ("2025-06-28 08:11:58", "CMCC-GD-GZCL-20250628-000781")
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+
+class TestWorkOrderDetails:
+    """测试 details 在写入时解析并持久化"""
+
+    def test_details_json_synced_on_write(self):
+        order = WorkOrder(work_order_id="WO-1", details='告警网管：FMC\n告警原文：{"alarmId": "1", "addInfo": "Cause:307;deployment:LTE"}')
+        assert order.details_json == {"告警网管": "FMC", "告警原文": {"alarmId": "1", "addInfo": {"Cause": "307", "deployment": "LTE"}}}
+        assert WorkOrderDTO.model_validate(order).details == order.details_json
+
+        order.details = "无法解析的纯文本"
+        assert order.details_json is None
+        assert WorkOrderDTO.model_validate(order).details == "无法解析的纯文本"
+
+
+class TestWorkOrderFields:
+    """测试工单列表字段投影"""
+
+    def test_resolve_fields(self):
+        assert resolve_fields(None) is None
+        assert resolve_fields("summary") == WORK_ORDER_SUMMARY_FIELDS
+        assert resolve_fields("GJ00008, details") == ("work_order_id", "GJ00008", "details")
+        with pytest.raises(ValueError):
+            resolve_fields("GJ00008,no_such_field")
+
+    def test_projection_returns_only_requested_columns(self):
+        engine = create_engine("sqlite://")
+        WorkOrder.__table__.create(engine)
+        with Session(engine) as db:
+            for i in range(3):
+                # 其余非空列填充空串
+                values = {column.name: "" for column in WorkOrder.__table__.columns if not column.computed}
+                values.update(
+                    work_order_id=f"WO-{i}", created_time=f"2025-06-2{i} 08:00:00", GJ00008="小区退服告警",
+                    details="告警网管：FMC",
+                )
+                values.pop("details_json")
+                db.add(WorkOrder(**values))
+            db.commit()
+
+            total, items = get_work_orders(db, limit=2, fields=resolve_fields("GJ00008,details"))
+            assert total == 3
+            assert items[0] == {"work_order_id": "WO-0", "GJ00008": "小区退服告警", "details": {"告警网管": "FMC"}}
+
+            _, items, next_cursor = get_work_orders_by_cursor(db, limit=2, fields=resolve_fields("GJ00008"))
+            assert [item["work_order_id"] for item in items] == ["WO-2", "WO-1"]
+            assert set(items[0]) == {"work_order_id", "GJ00008"}
+            _, items, _ = get_work_orders_by_cursor(db, limit=2, cursor=next_cursor, fields=resolve_fields("GJ00008"))
+            assert [item["work_order_id"] for item in items] == ["WO-0"]
+
+
+class TestFastJson:
+    """测试单次序列化路径与 FastAPI 默认序列化结果一致"""
+
+    def test_dump_page_matches_default_encoding(self):
+        order = WorkOrder(work_order_id="WO-1", created_time="2025-06-28 08:11:58", GJ00008="小区退服告警",
+                          details="告警网管：FMC")
+        result = {"total": 1, "page": 1, "size": 10, "total_pages": 1, "items": [order]}
+        expected = jsonable_encoder(PaginatedResponse.model_validate(result))
+        assert json.loads(_dump_page(result, None)) == expected
+
+
 class TestWorkOrdersAPI:
     """测试工单列表API接口"""
     